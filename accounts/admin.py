@@ -1,6 +1,11 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+from .bulk import import_roster
+from .forms import RosterImportForm
 from .models import UserProfile
 
 
@@ -18,6 +23,41 @@ class UserAdmin(BaseUserAdmin):
     def get_role(self, obj):
         return obj.profile.get_role_display() if hasattr(obj, 'profile') else '-'
     get_role.short_description = 'Role'
+    
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name='auth_user_import'),
+        ] + super().get_urls()
+    
+    def import_view(self, request):
+        """Create accounts from an uploaded roster CSV, reporting the skipped rows"""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        
+        report = None
+        form = RosterImportForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            try:
+                # No process pool inside a web server, the form keeps the hashing short
+                report = import_roster(form.cleaned_data['roster'], processes=0)
+            except ValueError as error:
+                form.add_error('roster', str(error))
+            else:
+                self.message_user(
+                    request,
+                    f'Created {report.created} users, skipped {len(report.duplicates)} duplicates '
+                    f'and {len(report.errors)} invalid rows.',
+                    messages.SUCCESS if not report.errors else messages.WARNING,
+                )
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import roster',
+            'form': form,
+            'report': report,
+        }
+        return TemplateResponse(request, 'admin/auth/user/import_roster.html', context)
 
 
 # Unregister the original User admin and register our custom one
@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+UserModel = get_user_model()
+
+
+class ProfileBackend(ModelBackend):
+    """
+    ModelBackend loading the user's profile with the user.
+
+    Navigation and role checks read request.user.profile on nearly every
+    page, so the profile comes in the same query as the user instead of
+    a second one.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('profile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        try:
+            user = await UserModel._default_manager.select_related('profile').aget(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
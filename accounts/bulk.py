@@ -0,0 +1,179 @@
+import csv
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+from django.contrib.auth import password_validation
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import UserProfile
+
+
+# Rows per INSERT statement
+BULK_BATCH_SIZE = 1000
+
+# Columns of a roster CSV; only username is required
+ROSTER_FIELDS = ('username', 'email', 'first_name', 'last_name', 'role', 'password')
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords, processes=None, chunksize=64):
+    """
+    Hash passwords in a pool of worker processes.
+
+    Password hashing is deliberately slow and CPU bound, so it dominates
+    the creation of many users; a pool spreads it over all cores. With
+    processes=0 the passwords are hashed in this process.
+    """
+    passwords = list(passwords)
+    if processes == 0 or len(passwords) < chunksize:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+@transaction.atomic
+def bulk_create_users(users, roles, batch_size=BULK_BATCH_SIZE):
+    """
+    Insert unsaved users and their profiles with bulk INSERTs.
+
+    bulk_create() does not send post_save, so the profile signal is
+    skipped and the profiles are inserted in bulk instead. roles holds the
+    profile role of each user. Passwords must already be hashed. Returns
+    the created users.
+    """
+    users = User.objects.bulk_create(users, batch_size=batch_size)
+    UserProfile.objects.bulk_create(
+        [UserProfile(user=user, role=role) for user, role in zip(users, roles)],
+        batch_size=batch_size,
+    )
+    return users
+
+
+@dataclass
+class RosterProblem:
+    line: int
+    username: str
+    message: str
+
+
+@dataclass
+class RosterReport:
+    created: int = 0
+    duplicates: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    @property
+    def problems(self):
+        return sorted(self.duplicates + self.errors, key=lambda problem: problem.line)
+
+    def write_csv(self, file):
+        """Write the skipped rows as CSV, without their passwords"""
+        writer = csv.writer(file)
+        writer.writerow(['line', 'username', 'problem'])
+        for problem in self.problems:
+            writer.writerow([problem.line, problem.username, problem.message])
+
+
+def _roster_user(row):
+    """Validated (unsaved user, role, password) of a roster row, raising ValidationError"""
+    values = {name: (row.get(name) or '').strip() for name in ROSTER_FIELDS}
+    user = User()
+    for name in ('username', 'email', 'first_name', 'last_name'):
+        try:
+            setattr(user, name, User._meta.get_field(name).clean(values[name], user))
+        except ValidationError as error:
+            raise ValidationError(f'{name}: {" ".join(error.messages)}')
+
+    role = values['role'].lower() or 'student'
+    if role not in dict(UserProfile.ROLE_CHOICES):
+        raise ValidationError(f'role: unknown role "{values["role"]}"')
+
+    # Without a password the account cannot log in until one is set
+    password = values['password'] or None
+    if password is not None:
+        try:
+            password_validation.validate_password(password, user)
+        except ValidationError as error:
+            raise ValidationError(f'password: {" ".join(error.messages)}')
+    return user, role, password
+
+
+def _roster_batches(reader, batch_size):
+    batch = []
+    for row in reader:
+        batch.append((reader.line_num, row))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_roster(file, processes=None, batch_size=BULK_BATCH_SIZE, log=None):
+    """
+    Create the users of a roster CSV with ROSTER_FIELDS columns.
+
+    The file is read batch by batch. Rows with an existing username, or
+    one used earlier in the file, are skipped as duplicates and invalid
+    rows as errors. Passwords are hashed in a pool of processes
+    (processes=0 hashes in this one); the next batch is hashed while the
+    previous one is inserted with bulk_create_users(). Returns a
+    RosterReport.
+    """
+    reader = csv.DictReader(file)
+    if 'username' not in (reader.fieldnames or []):
+        raise ValueError('The roster has no username column.')
+    log = log or (lambda message: None)
+    report = RosterReport()
+    seen = {}
+
+    def insert(users, roles, hashed):
+        for user, password in zip(users, hashed):
+            user.password = password
+        bulk_create_users(users, roles, batch_size=batch_size)
+        report.created += len(users)
+        log(f'Created {report.created} users')
+
+    pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) if processes != 0 else nullcontext()
+    with pool as executor:
+        hash_all = functools.partial(executor.map, chunksize=16) if executor else map
+        pending = None
+        for batch in _roster_batches(reader, batch_size):
+            existing = set(User.objects.filter(
+                username__in=[(row.get('username') or '').strip() for _, row in batch]
+            ).values_list('username', flat=True))
+            users, roles, passwords = [], [], []
+            for line, row in batch:
+                try:
+                    user, role, password = _roster_user(row)
+                except ValidationError as error:
+                    report.errors.append(RosterProblem(line, (row.get('username') or '').strip(), error.messages[0]))
+                    continue
+                if user.username in existing:
+                    report.duplicates.append(RosterProblem(line, user.username, 'username already exists'))
+                    continue
+                if user.username in seen:
+                    report.duplicates.append(RosterProblem(line, user.username, f'duplicate of line {seen[user.username]}'))
+                    continue
+                seen[user.username] = line
+                users.append(user)
+                roles.append(role)
+                passwords.append(password)
+
+            # The pool starts hashing right away, while the previous batch is inserted
+            hashed = hash_all(make_password, passwords)
+            if pending:
+                insert(*pending)
+            pending = (users, roles, hashed)
+        if pending:
+            insert(*pending)
+    return report
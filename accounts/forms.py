@@ -1,3 +1,6 @@
+import csv
+import io
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
@@ -74,7 +77,34 @@ class UserProfileForm(forms.ModelForm):
             user.first_name = self.cleaned_data['first_name']
             user.last_name = self.cleaned_data['last_name']
             user.email = self.cleaned_data['email']
-            user.save()
             profile.save()
+            user.save()
         
         return profile
+
+
+class RosterImportForm(forms.Form):
+    """
+    Roster CSV upload in the admin, see accounts.bulk.import_roster.
+
+    The upload is imported within the request, hashing one password after
+    the other, so rosters with more than MAX_PASSWORDS passwords are sent
+    to manage.py import_users instead. Cleans to the decoded CSV text.
+    """
+    # Roughly half a second of hashing each
+    MAX_PASSWORDS = 25
+
+    roster = forms.FileField(help_text='CSV with a header row: username, email, first_name, last_name, role, password')
+
+    def clean_roster(self):
+        try:
+            text = self.cleaned_data['roster'].read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise forms.ValidationError('The roster is not UTF-8 encoded.')
+        passwords = sum(1 for row in csv.DictReader(io.StringIO(text, newline='')) if (row.get('password') or '').strip())
+        if passwords > self.MAX_PASSWORDS:
+            raise forms.ValidationError(
+                f'The roster sets {passwords} passwords, too many to hash within a web request '
+                f'(at most {self.MAX_PASSWORDS}). Import it with manage.py import_users instead.'
+            )
+        return io.StringIO(text, newline='')
@@ -0,0 +1,46 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.bulk import BULK_BATCH_SIZE, ROSTER_FIELDS, import_roster
+
+
+class Command(BaseCommand):
+    help = f'Create student and teacher accounts from a roster CSV with columns {", ".join(ROSTER_FIELDS)}'
+
+    def add_arguments(self, parser):
+        parser.add_argument('roster', help='CSV file with a header row, - for standard input')
+        parser.add_argument('--processes', type=int, help='Password hashing processes (default: one per core, 0: none)')
+        parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE, help='Rows per bulk insert')
+        parser.add_argument('--errors', help='Write the skipped rows to this CSV file')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            if options['roster'] == '-':
+                report = self.run(sys.stdin, options)
+            else:
+                with open(options['roster'], newline='', encoding='utf-8-sig') as file:
+                    report = self.run(file, options)
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+
+        for problem in report.problems[:20]:
+            self.stderr.write(f'line {problem.line} ({problem.username or "no username"}): {problem.message}')
+        if len(report.problems) > 20:
+            self.stderr.write(f'... and {len(report.problems) - 20} more')
+        if options['errors']:
+            with open(options['errors'], 'w', newline='') as file:
+                report.write_csv(file)
+            self.stdout.write(f'Skipped rows written to {options["errors"]}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {report.created} users in {time.monotonic() - started:.1f}s, skipped '
+            f'{len(report.duplicates)} duplicates and {len(report.errors)} invalid rows'
+        ))
+
+    def run(self, file, options):
+        return import_roster(
+            file, processes=options['processes'], batch_size=options['batch_size'], log=self.stdout.write,
+        )
@@ -19,6 +19,28 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.get_role_display()}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        profile = super().from_db(db, field_names, values)
+        profile._saved_values = profile._tracked_values()
+        return profile
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._saved_values = self._tracked_values()
+    
+    def _tracked_values(self):
+        # Loaded fields other than the timestamps, files by name
+        return {
+            field.attname: field.value_to_string(self)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__ and field.name not in ('created_at', 'updated_at')
+        }
+    
+    def has_changed(self):
+        """Whether the profile differs from what was last loaded or saved"""
+        return self._tracked_values() != getattr(self, '_saved_values', None)
+    
     class Meta:
         verbose_name = 'User Profile'
         verbose_name_plural = 'User Profiles'
@@ -13,6 +13,12 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
-    """Save UserProfile when User is saved"""
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
+    """
+    Save the UserProfile along with the User when it was changed.
+
+    A profile that was never loaded cannot have changed, so saves like the
+    last_login update on login neither read nor write it.
+    """
+    profile = User.profile.related.get_cached_value(instance, default=None)
+    if profile is not None and profile.has_changed():
+        profile.save()
@@ -1,3 +1,199 @@
-from django.test import TestCase
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from quizzes.testing import complete_attempt, make_user, seed
+from .bulk import import_roster
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """Account pages stay within their query budget, however much data there is"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.student = make_user('student')
+        cls.quiz = seed(cls.teacher, quizzes=1, questions=4, students=1, categories=1)[0]
+
+    def grow(self):
+        seed(self.teacher, quizzes=6, questions=10, students=10, categories=3)
+        for _ in range(5):
+            complete_attempt(self.student, self.quiz)
+
+    def request(self, method, name, data=None, user=None):
+        if user:
+            self.client.force_login(user)
+        else:
+            self.client.logout()
+        url = reverse(f'accounts:{name}')
+        response = getattr(self.client, method)(url, data or {})
+        self.assertIn(response.status_code, (200, 302), url)
+        self.assertIsNotNone(getattr(resolve(url).func, 'query_budget', None), f'{url} has no query budget')
+        return int(response['X-Query-Count'])
+
+    def measure(self):
+        """Query count of every page in accounts/urls.py, failing for pages over their budget"""
+        return {
+            'register': self.request('get', 'register'),
+            'login': self.request('get', 'login'),
+            'login_post': self.request('post', 'login', {'username': 'student', 'password': 'secret-pass-123'}),
+            'logout': self.request('post', 'logout', user=self.student),
+            'profile': self.request('get', 'profile', user=self.student),
+            'profile_post': self.request(
+                'post', 'profile', {'first_name': 'Sam', 'last_name': 'Student', 'bio': 'Hi', 'role': 'student'},
+                user=self.student,
+            ),
+        }
+
+    def test_query_counts_do_not_grow_with_data(self):
+        before = self.measure()
+        self.grow()
+        self.assertEqual(before, self.measure())
+
+    def test_register(self):
+        data = {
+            'username': 'newcomer', 'email': 'newcomer@example.com', 'first_name': 'New', 'last_name': 'Comer',
+            'password1': 'a-Long-secret-42', 'password2': 'a-Long-secret-42', 'role': 'teacher',
+        }
+        self.request('post', 'register', data)
+        self.assertEqual(User.objects.get(username='newcomer').profile.role, 'teacher')
+
+
+class ProfileTests(TestCase):
+    """The profile comes with the user and is only written when it changed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+
+    def profile_queries(self, queries):
+        return [query['sql'] for query in queries if 'accounts_userprofile' in query['sql']]
+
+    def test_login_does_not_touch_the_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('accounts:login'), {'username': 'teacher', 'password': 'secret-pass-123'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.profile_queries(queries), [])
+
+    def test_profile_is_loaded_with_the_user(self):
+        self.client.force_login(self.teacher)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('quizzes:quiz_create'))
+        self.assertEqual(response.status_code, 200)
+        profile_queries = self.profile_queries(queries)
+        self.assertEqual(len(profile_queries), 1)
+        self.assertIn('auth_user', profile_queries[0])
+
+    def test_sessions_of_the_old_backend_stay_logged_in(self):
+        self.client.force_login(self.teacher, backend='django.contrib.auth.backends.ModelBackend')
+        response = self.client.get(reverse('quizzes:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.user, self.teacher)
+
+    def test_user_save_writes_changed_profiles_only(self):
+        user = User.objects.select_related('profile').get(pk=self.teacher.pk)
+        with self.assertNumQueries(1):
+            user.save()
+
+        user.profile.bio = 'Teaches maths'
+        with self.assertNumQueries(2):
+            user.save()
+        self.assertEqual(User.objects.get(pk=user.pk).profile.bio, 'Teaches maths')
+
+        with self.assertNumQueries(1):
+            user.save()
+
+
+ROSTER = """username,email,first_name,last_name,role,password
+ada,ada@example.com,Ada,Lovelace,teacher,Analytical-Engine-1843
+alan,,Alan,Turing,,Enigma-Bombe-1940
+teacher,t@example.com,Taken,Name,student,Another-Pass-99
+alan,,Alan,Again,student,Enigma-Bombe-1940
+bad name,,,,student,
+grace,,Grace,Hopper,admiral,
+,,No,Username,student,
+linus,,Linus,T,student,123
+edsger,,Edsger,Dijkstra,Student,
+"""
+
+
+class RosterImportTests(TestCase):
+    """Roster CSVs create users and profiles in bulk, skipping what they cannot create"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+
+    def assertImported(self, report):
+        self.assertEqual(report.created, 3)
+        self.assertEqual([(problem.line, problem.username) for problem in report.duplicates], [(4, 'teacher'), (5, 'alan')])
+        self.assertEqual([problem.line for problem in report.errors], [6, 7, 8, 9])
+        self.assertIn('role', report.errors[1].message)
+        self.assertIn('password', report.errors[3].message)
+
+        ada = User.objects.select_related('profile').get(username='ada')
+        self.assertEqual((ada.email, ada.last_name, ada.profile.role), ('ada@example.com', 'Lovelace', 'teacher'))
+        self.assertTrue(ada.check_password('Analytical-Engine-1843'))
+        self.assertEqual(User.objects.get(username='alan').profile.role, 'student')
+        # No password, no login until one is set
+        self.assertFalse(User.objects.get(username='edsger').has_usable_password())
+        self.assertEqual(User.objects.get(username='teacher').last_name, '')
+
+    def test_import(self):
+        self.assertImported(import_roster(io.StringIO(ROSTER), processes=0, batch_size=2))
+
+    def test_import_hashes_in_a_pool(self):
+        self.assertImported(import_roster(io.StringIO(ROSTER), processes=2))
+
+    def test_roster_without_usernames(self):
+        with self.assertRaises(ValueError):
+            import_roster(io.StringIO('email,role\nada@example.com,teacher\n'), processes=0)
+
+    def test_command_writes_an_error_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            roster, errors = Path(directory, 'roster.csv'), Path(directory, 'errors.csv')
+            roster.write_text(ROSTER)
+            call_command('import_users', str(roster), processes=0, errors=str(errors), stdout=io.StringIO(), stderr=io.StringIO())
+            lines = errors.read_text().splitlines()
+        self.assertEqual(lines[0], 'line,username,problem')
+        self.assertEqual(len(lines), 7)
+        self.assertNotIn('Enigma', ''.join(lines))
+        self.assertTrue(User.objects.filter(username='ada').exists())
+
+    def test_admin_upload(self):
+        admin_user = User.objects.create_superuser('admin', password='secret-pass-123')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:auth_user_changelist'))
+        self.assertContains(response, reverse('admin:auth_user_import'))
+
+        with mock.patch('accounts.bulk.ProcessPoolExecutor') as pool:
+            response = self.client.post(reverse('admin:auth_user_import'), {
+                'roster': SimpleUploadedFile('roster.csv', ROSTER.encode(), content_type='text/csv'),
+            })
+        pool.assert_not_called()
+        self.assertContains(response, 'Created 3 users')
+        self.assertContains(response, 'duplicate of line 3')
+        self.assertEqual(User.objects.get(username='ada').profile.role, 'teacher')
+
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('admin:auth_user_import'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_admin_refuses_rosters_with_many_passwords(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='secret-pass-123'))
+        rows = ''.join(f'user{number},,,,student,Long-Enough-Password-{number}\n' for number in range(26))
+        response = self.client.post(reverse('admin:auth_user_import'), {
+            'roster': SimpleUploadedFile('roster.csv', (ROSTER.splitlines(keepends=True)[0] + rows).encode(), content_type='text/csv'),
+        })
+        self.assertContains(response, 'manage.py import_users instead')
+        self.assertFalse(User.objects.filter(username='user0').exists())
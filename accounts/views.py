@@ -1,10 +1,13 @@
+from django.conf import settings
 from django.shortcuts import render, redirect
-from django.contrib.auth import login, logout, authenticate
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from quiz_platform.query_budget import query_budget
 from .forms import UserRegistrationForm, UserLoginForm, UserProfileForm
 
 
+@query_budget(12)
 def register_view(request):
     """User registration view"""
     if request.user.is_authenticated:
@@ -14,7 +17,8 @@ def register_view(request):
         form = UserRegistrationForm(request.POST)
         if form.is_valid():
             user = form.save()
-            login(request, user)
+            # Several backends are configured, new accounts use the first
+            login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
             messages.success(request, f'Welcome {user.username}! Your account has been created.')
             return redirect('quizzes:dashboard')
     else:
@@ -23,6 +27,7 @@ def register_view(request):
     return render(request, 'accounts/register.html', {'form': form})
 
 
+@query_budget(9)
 def login_view(request):
     """User login view"""
     if request.user.is_authenticated:
@@ -31,20 +36,19 @@ def login_view(request):
     if request.method == 'POST':
         form = UserLoginForm(request, data=request.POST)
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(username=username, password=password)
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Welcome back, {user.username}!')
-                next_url = request.GET.get('next', 'quizzes:dashboard')
-                return redirect(next_url)
+            # The form already authenticated the user
+            user = form.get_user()
+            login(request, user)
+            messages.success(request, f'Welcome back, {user.username}!')
+            next_url = request.GET.get('next', 'quizzes:dashboard')
+            return redirect(next_url)
     else:
         form = UserLoginForm()
     
     return render(request, 'accounts/login.html', {'form': form})
 
 
+@query_budget(4)
 def logout_view(request):
     """User logout view"""
     logout(request)
@@ -53,6 +57,7 @@ def logout_view(request):
 
 
 @login_required
+@query_budget(6)
 def profile_view(request):
     """User profile view and edit"""
     profile = request.user.profile
@@ -0,0 +1,46 @@
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError
+
+
+logger = logging.getLogger(__name__)
+
+LOCK_RETRY_ATTEMPTS = getattr(settings, 'QUIZ_LOCK_RETRY_ATTEMPTS', 4)
+
+# Seconds of the first backoff, doubled for every further try up to the maximum
+LOCK_RETRY_DELAY = 0.05
+LOCK_RETRY_MAX_DELAY = 1.0
+
+# Messages of the errors SQLite raises when it gave up waiting for a lock
+LOCK_ERROR_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def is_lock_error(error):
+    return isinstance(error, OperationalError) and any(message in str(error) for message in LOCK_ERROR_MESSAGES)
+
+
+def retry_on_lock(func):
+    """
+    Run func again when it fails on a locked database.
+
+    Each retry waits a random time of up to twice the previous maximum, so
+    requests that collided in a burst spread out instead of colliding
+    again. Wrap whole transactions: inside an atomic block a retry would
+    run in the transaction that already failed.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(1, LOCK_RETRY_ATTEMPTS + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                if attempt == LOCK_RETRY_ATTEMPTS or not is_lock_error(error):
+                    raise
+                delay = random.uniform(0, min(LOCK_RETRY_MAX_DELAY, LOCK_RETRY_DELAY * 2 ** attempt))
+                logger.warning('%s found the database locked, try %d in %.0fms', func.__qualname__, attempt + 1, delay * 1000)
+                time.sleep(delay)
+    return wrapper
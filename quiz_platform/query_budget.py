@@ -0,0 +1,104 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    """Declare the most SQL queries a view may run per request"""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+class QueryRecorder:
+    """Database execute wrapper counting queries and their total time"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class QueryBudgetMiddleware:
+    """
+    Record the number of SQL queries and their total time for every view.
+
+    Active with DEBUG or QUERY_BUDGET_ENABLED (the test suite). The numbers
+    are logged and returned in X-Query-Count and X-Query-Time headers. A
+    view running more queries than its @query_budget logs a warning, or
+    raises QueryBudgetExceeded with QUERY_BUDGET_STRICT. Works for sync and
+    async views, without moving async requests to a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def enabled():
+        return settings.DEBUG or getattr(settings, 'QUERY_BUDGET_ENABLED', False)
+
+    @staticmethod
+    def record(stack, recorder):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled():
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            self.record(stack, recorder)
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        if not self.enabled():
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            # The async ORM runs its queries on the request's sync thread, so the wrappers go there
+            await sync_to_async(self.record)(stack, recorder)
+            response = await self.get_response(request)
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        match = getattr(request, 'resolver_match', None)
+        view_name = f'{match.func.__module__}.{match.func.__name__}' if match else request.path
+        budget = getattr(match.func, 'query_budget', None) if match else None
+        response['X-Query-Count'] = str(recorder.count)
+        response['X-Query-Time'] = f'{recorder.duration * 1000:.1f}ms'
+        logger.debug('%s ran %d queries in %.1fms', view_name, recorder.count, recorder.duration * 1000)
+
+        if budget is not None and recorder.count > budget:
+            message = f'{view_name} ran {recorder.count} queries, its budget is {budget}'
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,191 @@
+import functools
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+# Sessions, users and their profiles decide who is logged in and what they
+# may do, so a changed password or a deactivated account must never be read
+# stale. They are always read from the primary, also for request.user.
+PRIMARY_ONLY_APPS = {'sessions', 'auth', 'accounts'}
+
+# Set on the responses to writes, holding the time of the write
+RECENT_WRITE_COOKIE = 'recent_write'
+
+# Seconds a measured replica lag is trusted before measuring again
+LAG_CHECK_INTERVAL = 1.0
+
+_reading_from = ContextVar('quiz_replica', default=None)
+
+# alias -> (time.monotonic() of the check, lag in seconds)
+_lag_checks = {}
+
+
+def replicas():
+    return getattr(settings, 'QUIZ_READ_REPLICAS', [])
+
+
+def sticky_seconds():
+    return getattr(settings, 'QUIZ_REPLICA_STICKY_SECONDS', 15)
+
+
+def max_lag():
+    return getattr(settings, 'QUIZ_REPLICA_MAX_LAG', 5)
+
+
+def _sqlite_lag(primary_name, replica_name):
+    """
+    Lag of a SQLite copy of the primary, as kept by sync_replicas.
+
+    The copy is as old as its file, so it lags by however long the primary
+    (or its WAL) has been written to since.
+    """
+    def modified(name):
+        return max(
+            (os.path.getmtime(path) for path in (name, f'{name}-wal') if os.path.exists(path)),
+            default=0,
+        )
+    return max(0.0, modified(primary_name) - os.path.getmtime(replica_name))
+
+
+def replica_lag(alias):
+    """Seconds the replica is behind the primary, 0 when that cannot be told"""
+    connection = connections[alias]
+    if connection.vendor == 'sqlite':
+        return _sqlite_lag(connections[DEFAULT_DB_ALIAS].settings_dict['NAME'], connection.settings_dict['NAME'])
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            # A standby that replayed everything it received is up to date however old its last transaction is
+            cursor.execute(
+                'SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+                'THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+            )
+            lag = cursor.fetchone()[0]
+        return float(lag or 0)
+    return 0.0
+
+
+def _lag(alias):
+    now = time.monotonic()
+    checked = _lag_checks.get(alias)
+    if checked is None or now - checked[0] > LAG_CHECK_INTERVAL:
+        try:
+            lag = replica_lag(alias)
+        except (DatabaseError, OSError):
+            # An unreachable replica is as good as infinitely behind
+            lag = float('inf')
+        checked = _lag_checks[alias] = (now, lag)
+    return checked[1]
+
+
+def pick_replica():
+    """A replica within QUIZ_REPLICA_MAX_LAG of the primary, or None"""
+    healthy = [alias for alias in replicas() if _lag(alias) <= max_lag()]
+    return random.choice(healthy) if healthy else None
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Send the reads in the block to one replica.
+
+    Reads stay on the primary when no replica is configured, all of them
+    lag too far behind or enabled is false. Writes always go to the
+    primary. One replica serves the whole block, so its reads are
+    consistent with each other.
+    """
+    token = _reading_from.set(pick_replica() if enabled and replicas() else None)
+    try:
+        yield
+    finally:
+        _reading_from.reset(token)
+
+
+def wrote_recently(request):
+    """Whether the request comes from someone who wrote within QUIZ_REPLICA_STICKY_SECONDS"""
+    try:
+        written_at = float(request.COOKIES[RECENT_WRITE_COOKIE])
+    except (KeyError, ValueError):
+        return False
+    return 0 <= time.time() - written_at < sticky_seconds()
+
+
+def read_replica(view_func):
+    """
+    Serve a read-only view from a replica.
+
+    Visitors who wrote recently keep reading from the primary, so they
+    see their own submissions.
+    """
+    if iscoroutinefunction(view_func):
+        @functools.wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            with replica_reads(not wrote_recently(request)):
+                return await view_func(request, *args, **kwargs)
+    else:
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with replica_reads(not wrote_recently(request)):
+                return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Route reads inside replica_reads() to its replica, everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        return _reading_from.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        return False if db in replicas() else None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Mark visitors who just wrote, so read_replica views serve them from the
+    primary until the replicas have caught up.
+
+    Any request with an unsafe method counts as a write. Does nothing
+    without QUIZ_READ_REPLICAS.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.mark(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.mark(request, await self.get_response(request))
+
+    def mark(self, request, response):
+        if replicas() and request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(
+                RECENT_WRITE_COOKIE, f'{time.time():.3f}',
+                max_age=sticky_seconds(), httponly=True, samesite='Lax',
+            )
+        return response
@@ -50,6 +50,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'quiz_platform.replicas.ReplicaStickinessMiddleware',
+    'quiz_platform.query_budget.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'quiz_platform.urls'
@@ -79,9 +81,37 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # High-concurrency SQLite for exam bursts: with WAL readers never wait for the writer,
+        # write transactions take the write lock when they begin instead of failing to upgrade
+        # a read lock halfway through, and wait up to 20 seconds for it
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=268435456'
+            ),
+        },
     }
 }
 
+# Read replicas for the reporting pages, see quiz_platform/replicas.py. Add each replica
+# to DATABASES and list its alias in QUIZ_READ_REPLICAS, e.g. locally a second SQLite
+# file kept up to date with manage.py sync_replicas:
+# DATABASES['replica'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': BASE_DIR / 'db.replica.sqlite3',
+#     'TEST': {'MIRROR': 'default'},
+# }
+# QUIZ_READ_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['quiz_platform.replicas.ReplicaRouter']
+QUIZ_READ_REPLICAS = []
+# Seconds visitors keep reading from the primary after a write
+QUIZ_REPLICA_STICKY_SECONDS = 15
+# Replicas further behind than this many seconds are skipped
+QUIZ_REPLICA_MAX_LAG = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -126,6 +156,31 @@ MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 # Authentication
+# The profile is loaded with the user, see accounts/backends.py
+# Sessions remember the backend that logged them in, so ModelBackend stays listed until
+# every session from before ProfileBackend has expired (SESSION_COOKIE_AGE, two weeks).
+# Until then failed logins are checked by both backends.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.ProfileBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 LOGIN_URL = 'accounts:login'
 LOGIN_REDIRECT_URL = 'quizzes:dashboard'
 LOGOUT_REDIRECT_URL = 'quizzes:home'
+
+# Query budgets, see quiz_platform/query_budget.py. Counting is always on with DEBUG.
+QUERY_BUDGET_ENABLED = False
+QUERY_BUDGET_STRICT = False
+
+# Tries of a quiz submission that hits a locked database, see quiz_platform/locking.py
+QUIZ_LOCK_RETRY_ATTEMPTS = 4
+
+# Buffer autosaved answers in the cache, see quizzes/autosave.py. By default only with a
+# cache shared between processes, such as Redis or Memcached, else they go straight to the
+# database. Set True for a single process with the local memory cache.
+QUIZ_AUTOSAVE_BUFFER = None
+
+# URL names served by the async views in quizzes/async_views.py, worth it under ASGI, e.g.
+# ['home', 'quiz_list', 'quiz_detail', 'leaderboard', 'quiz_leaderboard', 'quiz_result'].
+# Read once when the URLs load, so it is a deploy-time choice that takes a restart.
+QUIZ_ASYNC_VIEWS = []
@@ -1,12 +1,14 @@
 from django.contrib import admin
-from .models import Category, Quiz, Question, Answer, QuizAttempt, UserAnswer
+from django.utils import timezone
+from .models import Category, Quiz, Question, Answer, QuizAttempt, UserAnswer, Job, RegradeRun, LeaderboardEntry, QuizStats
+from .jobs import queue_stats
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'description', 'color', 'created_at')
     search_fields = ('name', 'description')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'updated_at')
 
 
 class AnswerInline(admin.TabularInline):
@@ -24,10 +26,10 @@ class QuestionInline(admin.TabularInline):
 
 @admin.register(Quiz)
 class QuizAdmin(admin.ModelAdmin):
-    list_display = ('title', 'category', 'difficulty', 'creator', 'is_active', 'is_public', 'created_at')
+    list_display = ('title', 'category', 'difficulty', 'creator', 'question_count', 'total_points', 'is_active', 'is_public', 'created_at')
     list_filter = ('difficulty', 'is_active', 'is_public', 'category', 'created_at')
     search_fields = ('title', 'description')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('question_count', 'total_points', 'created_at', 'updated_at')
     inlines = [QuestionInline]
     
     fieldsets = (
@@ -38,13 +40,13 @@ class QuizAdmin(admin.ModelAdmin):
             'fields': ('time_limit', 'passing_score', 'max_attempts', 'is_active', 'is_public')
         }),
         ('Display Settings', {
-            'fields': ('show_correct_answers', 'randomize_questions', 'randomize_answers')
+            'fields': ('show_correct_answers', 'randomize_questions', 'randomize_answers', 'questions_per_page')
         }),
         ('Schedule', {
             'fields': ('start_date', 'end_date')
         }),
         ('Metadata', {
-            'fields': ('created_at', 'updated_at'),
+            'fields': ('question_count', 'total_points', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
@@ -117,3 +119,47 @@ class UserAnswerAdmin(admin.ModelAdmin):
     def question_preview(self, obj):
         return obj.question.text[:50] + '...' if len(obj.question.text) > 50 else obj.question.text
     question_preview.short_description = 'Question'
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'status', 'attempts', 'max_attempts', 'run_at', 'started_at', 'finished_at', 'locked_by')
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'last_error')
+    readonly_fields = ('attempts', 'locked_by', 'created_at', 'started_at', 'finished_at', 'last_error')
+    actions = ['retry_jobs']
+    
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context['queue_stats'] = queue_stats()
+        return super().changelist_view(request, extra_context=extra_context)
+    
+    @admin.action(description='Retry selected jobs')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status='running').update(
+            status='queued', attempts=0, run_at=timezone.now(), last_error=''
+        )
+        self.message_user(request, f'{updated} job(s) queued again.')
+
+
+@admin.register(RegradeRun)
+class RegradeRunAdmin(admin.ModelAdmin):
+    list_display = ('quiz', 'phase', 'answers_processed', 'answers_changed', 'attempts_processed', 'started_at', 'finished_at')
+    list_filter = ('phase',)
+    search_fields = ('quiz__title',)
+    readonly_fields = ('started_at', 'updated_at', 'finished_at')
+
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'quiz', 'window', 'period_start', 'attempts', 'avg_score', 'best_score', 'quizzes_completed')
+    list_filter = ('window', 'period_start')
+    search_fields = ('user__username', 'quiz__title')
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(QuizStats)
+class QuizStatsAdmin(admin.ModelAdmin):
+    list_display = ('quiz', 'attempt_count', 'pass_count', 'mean_score', 'score_stddev', 'updated_at')
+    search_fields = ('quiz__title',)
+    readonly_fields = ('updated_at',)
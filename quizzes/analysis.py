@@ -0,0 +1,242 @@
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import QuizAttempt, UserAnswer
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Attempts read from the database per query
+CHUNK_SIZE = 5000
+
+# Share of attempts with the highest and lowest scores compared in the distractor analysis
+GROUP_FRACTION = 0.27
+
+# New attempts only show up once a cached analysis expires, regrades invalidate it right away
+CACHE_TIMEOUT = getattr(settings, 'QUIZ_ITEM_ANALYSIS_CACHE_TIMEOUT', 5 * 60)
+
+
+@dataclass(frozen=True)
+class ChoiceStats:
+    """How often one answer choice was selected"""
+    answer_id: int
+    text: str
+    is_correct: bool
+    selection_rate: float
+    upper_rate: float
+    lower_rate: float
+
+
+@dataclass(frozen=True)
+class ItemStats:
+    """Quality statistics of one question"""
+    question_id: int
+    text: str
+    question_type: str
+    difficulty: float
+    discrimination: float
+    choices: tuple
+
+
+@dataclass(frozen=True)
+class ItemAnalysis:
+    """Item statistics of every question of one version of a quiz"""
+    quiz_id: int
+    version: int
+    attempt_count: int
+    items: tuple
+
+
+def available():
+    """Item analysis needs NumPy, installed with the analysis extra"""
+    return np is not None
+
+
+def cache_key(quiz_id, version):
+    return f'quizzes:item_analysis:{quiz_id}:{version}'
+
+
+def invalidate(quiz):
+    cache.delete(cache_key(quiz.pk, quiz.content_version))
+
+
+def _rate(counts, total):
+    return float(counts) / total if total else 0.0
+
+
+def _load_scores(quiz):
+    """Primary keys and scores of all completed attempts, ordered by primary key"""
+    attempt_ids = []
+    scores = []
+    last_pk = 0
+    while True:
+        rows = list(
+            QuizAttempt.objects.filter(quiz=quiz, status='completed', pk__gt=last_pk)
+            .order_by('pk').values_list('pk', 'score')[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        for pk, score in rows:
+            attempt_ids.append(pk)
+            scores.append(float(score or 0))
+        last_pk = rows[-1][0]
+    return np.array(attempt_ids, dtype=np.int64), np.array(scores, dtype=np.float64)
+
+
+def _lookup(ids):
+    """Sorted ids and their positions in ids, for finding many of them at once with _positions()"""
+    ids = np.asarray(ids, dtype=np.int64)
+    order = np.argsort(ids, kind='stable')
+    return ids[order], order
+
+
+def _positions(lookup, values):
+    """Positions of values in the ids of a _lookup(), and a mask of the values that are there"""
+    sorted_ids, order = lookup
+    if not len(sorted_ids):
+        return np.zeros(0, dtype=np.int64), np.zeros(len(values), dtype=bool)
+    found = np.minimum(np.searchsorted(sorted_ids, values), len(sorted_ids) - 1)
+    known = sorted_ids[found] == values
+    return order[found[known]], known
+
+
+def _corrected_point_biserial(correct, points):
+    """
+    Correlation of each question's correctness with the score on the other questions.
+
+    Leaving the question itself out of the total keeps it from inflating
+    its own discrimination. Columns without variance give NaN.
+    """
+    earned = correct * points
+    rest = earned.sum(axis=1, keepdims=True) - earned
+    x_mean = correct.mean(axis=0)
+    y_mean = rest.mean(axis=0)
+    covariance = (correct * rest).mean(axis=0) - x_mean * y_mean
+    x_std = correct.std(axis=0)
+    y_std = rest.std(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where((x_std > 0) & (y_std > 0), covariance / (x_std * y_std), np.nan)
+
+
+def compute_item_analysis(quiz):
+    """
+    Compute difficulty, discrimination and distractor statistics of every question.
+
+    Attempts are streamed from the database in chunks of CHUNK_SIZE into an
+    attempts x questions correctness matrix and into per-choice selection
+    counts for all attempts and for the upper and lower score groups. All
+    statistics are then computed column-wise with NumPy.
+    """
+    if not available():
+        raise ImportError('Item analysis requires NumPy')
+
+    answer_key = quiz.answer_key
+    questions = list(quiz.questions.prefetch_related('answers'))
+    question_lookup = _lookup([question.id for question in questions])
+    answers = [answer for question in questions for answer in question.answers.all()]
+    answer_index = {answer.id: index for index, answer in enumerate(answers)}
+    answer_lookup = _lookup([answer.id for answer in answers])
+    points = np.array([answer_key[question.id].points for question in questions], dtype=np.float32)
+
+    attempt_ids, scores = _load_scores(quiz)
+    attempt_count = len(attempt_ids)
+    attempt_lookup = _lookup(attempt_ids)
+    correct = np.zeros((attempt_count, len(questions)), dtype=np.float32)
+
+    # Upper and lower groups by score, at least one attempt each
+    group_size = max(int(round(attempt_count * GROUP_FRACTION)), 1)
+    order = np.argsort(scores, kind='stable')
+    group = np.zeros(attempt_count, dtype=np.int8)
+    if attempt_count >= 2:
+        group[order[:group_size]] = -1
+        group[order[-group_size:]] = 1
+
+    selected = np.zeros(len(answers), dtype=np.int64)
+    selected_upper = np.zeros(len(answers), dtype=np.int64)
+    selected_lower = np.zeros(len(answers), dtype=np.int64)
+    SelectedAnswer = UserAnswer.selected_answers.through
+
+    for start in range(0, attempt_count, CHUNK_SIZE):
+        first_pk = int(attempt_ids[start])
+        last_pk = int(attempt_ids[min(start + CHUNK_SIZE, attempt_count) - 1])
+
+        rows = np.array(
+            list(
+                UserAnswer.objects.filter(
+                    attempt__quiz=quiz, attempt__status='completed',
+                    attempt_id__gte=first_pk, attempt_id__lte=last_pk, is_correct=True,
+                ).values_list('attempt_id', 'question_id')
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        # Attempts completed after the scores were loaded fall in the pk range too, leave them out
+        attempt_rows, loaded = _positions(attempt_lookup, rows[:, 0])
+        question_cols, known = _positions(question_lookup, rows[loaded, 1])
+        if len(question_cols):
+            correct[attempt_rows[known], question_cols] = 1
+
+        choices = np.array(
+            list(
+                SelectedAnswer.objects.filter(
+                    useranswer__attempt__quiz=quiz, useranswer__attempt__status='completed',
+                    useranswer__attempt_id__gte=first_pk, useranswer__attempt_id__lte=last_pk,
+                ).values_list('useranswer__attempt_id', 'answer_id')
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        attempt_rows, loaded = _positions(attempt_lookup, choices[:, 0])
+        answer_cols, known = _positions(answer_lookup, choices[loaded, 1])
+        if len(answer_cols):
+            attempt_rows = attempt_rows[known]
+            selected += np.bincount(answer_cols, minlength=len(answers))
+            selected_upper += np.bincount(answer_cols[group[attempt_rows] == 1], minlength=len(answers))
+            selected_lower += np.bincount(answer_cols[group[attempt_rows] == -1], minlength=len(answers))
+
+    if attempt_count:
+        difficulty = correct.mean(axis=0)
+        discrimination = _corrected_point_biserial(correct, points)
+    else:
+        difficulty = discrimination = np.full(len(questions), np.nan)
+
+    upper_count = int((group == 1).sum())
+    lower_count = int((group == -1).sum())
+    items = []
+    for column, question in enumerate(questions):
+        choices = tuple(
+            ChoiceStats(
+                answer_id=answer.id,
+                text=answer.text,
+                is_correct=answer.id in answer_key[question.id].correct_ids,
+                selection_rate=_rate(selected[answer_index[answer.id]], attempt_count),
+                upper_rate=_rate(selected_upper[answer_index[answer.id]], upper_count),
+                lower_rate=_rate(selected_lower[answer_index[answer.id]], lower_count),
+            )
+            for answer in question.answers.all()
+        ) if question.question_type != 'text' else ()
+        items.append(ItemStats(
+            question_id=question.id,
+            text=question.text,
+            question_type=question.question_type,
+            difficulty=None if np.isnan(difficulty[column]) else round(float(difficulty[column]), 3),
+            discrimination=None if np.isnan(discrimination[column]) else round(float(discrimination[column]), 3),
+            choices=choices,
+        ))
+
+    return ItemAnalysis(
+        quiz_id=quiz.pk, version=quiz.content_version, attempt_count=attempt_count, items=tuple(items)
+    )
+
+
+def get_item_analysis(quiz):
+    """Item analysis of the quiz's current content version, computed at most once per CACHE_TIMEOUT"""
+    key = cache_key(quiz.pk, quiz.content_version)
+    analysis = cache.get(key)
+    if analysis is None:
+        analysis = compute_item_analysis(quiz)
+        cache.set(key, analysis, CACHE_TIMEOUT)
+    return analysis
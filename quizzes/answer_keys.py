@@ -0,0 +1,135 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Answer, Question, Quiz
+
+
+# How many compiled keys each process keeps in memory
+LOCAL_CACHE_SIZE = getattr(settings, 'QUIZ_ANSWER_KEY_CACHE_SIZE', 256)
+
+# Keys are immutable per version, so the shared cache can hold them for long
+SHARED_CACHE_TIMEOUT = getattr(settings, 'QUIZ_ANSWER_KEY_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+@dataclass(frozen=True)
+class QuestionKey:
+    """Grading data for one question"""
+    question_type: str
+    points: int
+    correct_ids: frozenset
+    answer_ids: frozenset
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """Compiled answer key for one version of a quiz"""
+    quiz_id: int
+    version: int
+    questions: dict
+    total_points: int
+
+    def __contains__(self, question_id):
+        return question_id in self.questions
+
+    def __getitem__(self, question_id):
+        return self.questions[question_id]
+
+
+class LRUCache:
+    """Small thread-safe least-recently-used mapping"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local_keys = LRUCache(LOCAL_CACHE_SIZE)
+
+
+def cache_key(quiz_id, version):
+    return f'quizzes:answer_key:{quiz_id}:{version}'
+
+
+def bump_content_version(quiz_id):
+    """
+    Invalidate every cached artefact derived from the quiz content.
+
+    quiz_id may also be a subquery selecting it. Question changes bump the
+    version through counters.adjust_quiz instead, together with the counters.
+    """
+    Quiz.objects.filter(pk=quiz_id).update(content_version=F('content_version') + 1)
+
+
+def compile_answer_key(quiz_id, version):
+    """Build the answer key for a quiz straight from the database"""
+    questions = {}
+    for question_id, question_type, points in Question.objects.filter(
+        quiz_id=quiz_id
+    ).values_list('id', 'question_type', 'points'):
+        questions[question_id] = (question_type, points, set(), set())
+
+    for answer_id, question_id, is_correct in Answer.objects.filter(
+        question__quiz_id=quiz_id
+    ).values_list('id', 'question_id', 'is_correct'):
+        _, _, correct_ids, answer_ids = questions[question_id]
+        answer_ids.add(answer_id)
+        if is_correct:
+            correct_ids.add(answer_id)
+
+    compiled = {
+        question_id: QuestionKey(question_type, points, frozenset(correct_ids), frozenset(answer_ids))
+        for question_id, (question_type, points, correct_ids, answer_ids) in questions.items()
+    }
+    return AnswerKey(
+        quiz_id=quiz_id,
+        version=version,
+        questions=compiled,
+        total_points=sum(question.points for question in compiled.values()),
+    )
+
+
+def get_answer_key(quiz):
+    """
+    Return the compiled answer key for the quiz's current content version.
+
+    Looks in the process-local LRU first, then the shared Django cache, and
+    only compiles from the database when neither has this version.
+    """
+    key = cache_key(quiz.pk, quiz.content_version)
+
+    answer_key = _local_keys.get(key)
+    if answer_key is not None:
+        return answer_key
+
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = compile_answer_key(quiz.pk, quiz.content_version)
+        cache.set(key, answer_key, SHARED_CACHE_TIMEOUT)
+
+    _local_keys.set(key, answer_key)
+    return answer_key
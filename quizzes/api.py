@@ -0,0 +1,218 @@
+from functools import wraps
+
+from django.db.models import Prefetch, Q
+from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from quiz_platform.query_budget import query_budget
+from .models import Answer, Category, Quiz, QuizAttempt, UserAnswer
+from .pagination import paginate
+
+
+# Objects per response without and at most with ?limit=
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+class ApiError(Exception):
+    """A bad request, answered with status 400 and the message"""
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'separators': (',', ':')})
+
+
+def api_view(view_func):
+    """
+    JSON endpoint: GET only, gzipped, answering errors and anonymous
+    requests with JSON instead of redirects.
+    """
+    @require_GET
+    @gzip_page
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _json({'error': 'Authentication required.'}, status=401)
+        try:
+            return view_func(request, *args, **kwargs)
+        except ApiError as error:
+            return _json({'error': str(error)}, status=400)
+    return wrapper
+
+
+def _int(request, name):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f'{name} must be an integer.')
+
+
+def _fields(request, serializers):
+    """Names of the fields to return, all without ?fields=, the id always"""
+    requested = [name for name in request.GET.get('fields', '').split(',') if name]
+    unknown = sorted(set(requested) - set(serializers))
+    if unknown:
+        raise ApiError(f'Unknown fields: {", ".join(unknown)}.')
+    if not requested:
+        return list(serializers)
+    return ['id'] + [name for name in requested if name != 'id']
+
+
+def _listing(request, queryset, serializers, fields):
+    """
+    One page of a queryset ordered by id, serialized with the requested fields.
+
+    ?ids=1,2,3 fetches the given objects in bulk. Other pages follow the
+    next URL, whose cursor keeps the filters and the fields.
+    """
+    ids = request.GET.get('ids')
+    if ids:
+        try:
+            ids = [int(pk) for pk in ids.split(',') if pk]
+        except ValueError:
+            raise ApiError('ids must be a comma separated list of integers.')
+        if len(ids) > MAX_LIMIT:
+            raise ApiError(f'At most {MAX_LIMIT} ids per request.')
+        queryset = queryset.filter(pk__in=ids)
+
+    limit = _int(request, 'limit') or DEFAULT_LIMIT
+    if not 0 < limit <= MAX_LIMIT:
+        raise ApiError(f'limit must be between 1 and {MAX_LIMIT}.')
+
+    page = paginate(request, queryset, ('id',), per_page=limit)
+    return _json({
+        'results': [{name: serializers[name](obj) for name in fields} for obj in page.items],
+        'next': request.build_absolute_uri(f'{request.path}?{page.next_query}') if page.next_query else None,
+    })
+
+
+def _score(attempt):
+    return float(attempt.score) if attempt.score is not None else None
+
+
+CATEGORY_FIELDS = {
+    'id': lambda category: category.pk,
+    'name': lambda category: category.name,
+    'description': lambda category: category.description,
+    'color': lambda category: category.color,
+}
+
+QUIZ_FIELDS = {
+    'id': lambda quiz: quiz.pk,
+    'title': lambda quiz: quiz.title,
+    'description': lambda quiz: quiz.description,
+    'category': lambda quiz: quiz.category_id,
+    'creator': lambda quiz: quiz.creator.username,
+    'difficulty': lambda quiz: quiz.difficulty,
+    'time_limit': lambda quiz: quiz.time_limit,
+    'passing_score': lambda quiz: quiz.passing_score,
+    'max_attempts': lambda quiz: quiz.max_attempts,
+    'question_count': lambda quiz: quiz.question_count,
+    'total_points': lambda quiz: quiz.total_points,
+    'is_active': lambda quiz: quiz.is_active,
+    'is_public': lambda quiz: quiz.is_public,
+    'start_date': lambda quiz: quiz.start_date,
+    'end_date': lambda quiz: quiz.end_date,
+    'created_at': lambda quiz: quiz.created_at,
+    'updated_at': lambda quiz: quiz.updated_at,
+}
+
+ATTEMPT_FIELDS = {
+    'id': lambda attempt: attempt.pk,
+    'quiz': lambda attempt: attempt.quiz_id,
+    'user': lambda attempt: attempt.user.username,
+    'status': lambda attempt: attempt.status,
+    'start_time': lambda attempt: attempt.start_time,
+    'end_time': lambda attempt: attempt.end_time,
+    'score': _score,
+    'points_earned': lambda attempt: attempt.points_earned,
+    'total_points': lambda attempt: attempt.total_points,
+    'passed': lambda attempt: attempt.is_passed,
+}
+
+RESULT_FIELDS = {
+    **ATTEMPT_FIELDS,
+    'answers': lambda attempt: [
+        {
+            'question': user_answer.question_id,
+            'selected': sorted(answer.pk for answer in user_answer.selected_answers.all()),
+            'text': user_answer.text_answer,
+            'correct': user_answer.is_correct,
+            'points': user_answer.points_earned,
+        }
+        for user_answer in attempt.user_answers.all()
+    ],
+}
+
+
+def _visible_quizzes(user):
+    return Quiz.objects.filter(Q(is_active=True, is_public=True) | Q(creator=user))
+
+
+def _readable_attempts(request):
+    """Attempts of the user and attempts at the user's quizzes, filtered by ?quiz="""
+    attempts = QuizAttempt.objects.filter(Q(user=request.user) | Q(quiz__creator=request.user))
+    quiz_id = _int(request, 'quiz')
+    if quiz_id is not None:
+        attempts = attempts.filter(quiz_id=quiz_id)
+    return attempts
+
+
+@api_view
+@query_budget(4)
+def category_list_view(request):
+    """Categories"""
+    return _listing(request, Category.objects.all(), CATEGORY_FIELDS, _fields(request, CATEGORY_FIELDS))
+
+
+@api_view
+@query_budget(4)
+def quiz_list_view(request):
+    """Public quizzes and the user's own, filtered by ?category= and ?difficulty="""
+    fields = _fields(request, QUIZ_FIELDS)
+    quizzes = _visible_quizzes(request.user)
+    if 'creator' in fields:
+        quizzes = quizzes.select_related('creator')
+    category_id = _int(request, 'category')
+    if category_id is not None:
+        quizzes = quizzes.filter(category_id=category_id)
+    if request.GET.get('difficulty'):
+        quizzes = quizzes.filter(difficulty=request.GET['difficulty'])
+    return _listing(request, quizzes, QUIZ_FIELDS, fields)
+
+
+@api_view
+@query_budget(4)
+def attempt_list_view(request):
+    """Attempts, filtered by ?quiz= and ?status="""
+    fields = _fields(request, ATTEMPT_FIELDS)
+    attempts = _readable_attempts(request)
+    if request.GET.get('status'):
+        attempts = attempts.filter(status=request.GET['status'])
+    if 'user' in fields:
+        attempts = attempts.select_related('user')
+    if 'passed' in fields:
+        attempts = attempts.select_related('quiz')
+    return _listing(request, attempts, ATTEMPT_FIELDS, fields)
+
+
+@api_view
+@query_budget(6)
+def result_list_view(request):
+    """Completed attempts with their answers, filtered by ?quiz="""
+    fields = _fields(request, RESULT_FIELDS)
+    attempts = _readable_attempts(request).filter(status='completed')
+    if 'user' in fields:
+        attempts = attempts.select_related('user')
+    if 'passed' in fields:
+        attempts = attempts.select_related('quiz')
+    if 'answers' in fields:
+        attempts = attempts.prefetch_related(
+            Prefetch('user_answers', queryset=UserAnswer.objects.order_by('question_id', 'id')),
+            Prefetch('user_answers__selected_answers', queryset=Answer.objects.only('id')),
+        )
+    return _listing(request, attempts, RESULT_FIELDS, fields)
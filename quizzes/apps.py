@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class QuizzesConfig(AppConfig):
     name = 'quizzes'
+    
+    def ready(self):
+        import quizzes.signals
+        import quizzes.tasks
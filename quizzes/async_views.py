@@ -0,0 +1,222 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from quiz_platform.query_budget import query_budget
+from quiz_platform.replicas import read_replica
+from . import search as search_index
+from .answer_keys import get_answer_key
+from .forms import QuizFilterForm
+from .fragments import arender_fragments, awith_fragments
+from .leaderboards import arank_of, board, period_start
+from .models import Category, LeaderboardEntry, Quiz, QuizAttempt
+from .pagination import PAGE_SIZE, apaginate, paginate_ranked, ranked_offset
+from .stats import astats_for
+
+
+# URL names with an async version here, served by it when listed in QUIZ_ASYNC_VIEWS
+ASYNC_URL_NAMES = ('home', 'quiz_list', 'quiz_detail', 'leaderboard', 'quiz_leaderboard', 'quiz_result')
+
+
+async def _list(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _load_user(request):
+    """
+    The request's user with the profile the navigation shows.
+
+    Templates cannot query the database from async code, so everything
+    base.html reads from the user is loaded before rendering.
+    """
+    user = await request.auser()
+    # accounts.backends.ProfileBackend already loaded it, other backends do not
+    if user.is_authenticated and not User.profile.related.is_cached(user):
+        profile = await UserProfile.objects.filter(user=user).afirst()
+        if profile is not None:
+            user.profile = profile
+    request.user = user
+    return user
+
+
+async def _quiz_or_none(pk):
+    return await aget_object_or_404(Quiz, pk=pk) if pk else None
+
+
+def _filter_form(params, categories):
+    """QuizFilterForm rendering its category choices from the loaded categories"""
+    form = QuizFilterForm(params)
+    field = form.fields['category']
+    field.choices = [('', field.empty_label)] + [(category.pk, category.name) for category in categories]
+    return form
+
+
+@query_budget(5)
+async def home_view(request):
+    """Homepage with featured quizzes, see views.home_view"""
+    featured_quizzes, categories, _ = await asyncio.gather(
+        _list(Quiz.objects.filter(is_active=True, is_public=True).select_related('category')[:6]),
+        _list(Category.objects.all()),
+        _load_user(request),
+    )
+
+    context = {
+        'featured_quizzes': await awith_fragments('quizzes/fragments/home_card.html', featured_quizzes),
+        'categories': categories,
+    }
+    return render(request, 'quizzes/home.html', context)
+
+
+@query_budget(7)
+async def quiz_list_view(request):
+    """Browse all available quizzes, see views.quiz_list_view"""
+    quizzes = Quiz.objects.filter(is_active=True, is_public=True).select_related('category')
+    ranked = None
+    categories, _ = await asyncio.gather(_list(Category.objects.all()), _load_user(request))
+
+    # Apply filters; only a selected category needs a query to validate
+    filter_form = _filter_form(request.GET, categories)
+    if request.GET.get('category'):
+        is_valid = await sync_to_async(filter_form.is_valid)()
+    else:
+        is_valid = filter_form.is_valid()
+    if is_valid:
+        category = filter_form.cleaned_data.get('category')
+        difficulty = filter_form.cleaned_data.get('difficulty')
+        search = filter_form.cleaned_data.get('search')
+
+        if category:
+            quizzes = quizzes.filter(category=category)
+        if difficulty:
+            quizzes = quizzes.filter(difficulty=difficulty)
+        if search and search_index.available():
+            ids = await sync_to_async(search_index.find)(
+                search, category, difficulty, limit=PAGE_SIZE + 1, offset=ranked_offset(request)
+            )
+            positions = {pk: position for position, pk in enumerate(ids)}
+            ranked = sorted(await _list(quizzes.filter(pk__in=ids)), key=lambda quiz: positions[quiz.pk])
+        elif search:
+            quizzes = quizzes.filter(Q(title__icontains=search) | Q(description__icontains=search))
+
+    if ranked is not None:
+        page = paginate_ranked(request, ranked)
+    else:
+        page = await apaginate(request, quizzes, ('-created_at', '-id'))
+
+    context = {
+        'quizzes': await awith_fragments('quizzes/fragments/list_card.html', page.items),
+        'page': page,
+        'filter_form': filter_form,
+    }
+    return render(request, 'quizzes/quiz_list.html', context)
+
+
+@query_budget(8)
+async def quiz_detail_view(request, pk):
+    """Quiz detail page, see views.quiz_detail_view"""
+    quiz, user = await asyncio.gather(
+        aget_object_or_404(Quiz.objects.select_related('category'), pk=pk),
+        _load_user(request),
+    )
+
+    user_attempts = None
+    attempts_left = quiz.max_attempts
+    if user.is_authenticated:
+        fragments, user_attempts = await asyncio.gather(
+            arender_fragments('quizzes/fragments/detail_summary.html', [quiz]),
+            _list(QuizAttempt.objects.filter(user=user, quiz=quiz, status='completed').select_related('quiz')),
+        )
+        attempts_left = quiz.max_attempts - len(user_attempts)
+    else:
+        fragments = await arender_fragments('quizzes/fragments/detail_summary.html', [quiz])
+    quiz.fragment = fragments[0]
+
+    context = {
+        'quiz': quiz,
+        'user_attempts': user_attempts,
+        'attempts_left': attempts_left,
+        'can_attempt': attempts_left > 0 if user.is_authenticated else False,
+    }
+    return render(request, 'quizzes/quiz_detail.html', context)
+
+
+@login_required
+@query_budget(12)
+async def quiz_result_view(request, pk, attempt_pk):
+    """View quiz results, see views.quiz_result_view"""
+    attempt, user = await asyncio.gather(
+        aget_object_or_404(QuizAttempt.objects.select_related('quiz'), pk=attempt_pk, quiz_id=pk),
+        _load_user(request),
+    )
+    quiz = attempt.quiz
+
+    # Check ownership
+    if user.pk not in (attempt.user_id, quiz.creator_id):
+        messages.error(request, 'You do not have permission to view this result.')
+        return redirect('quizzes:dashboard')
+
+    user_answers, answer_key, stats = await asyncio.gather(
+        _list(attempt.user_answers.all().select_related('question').prefetch_related(
+            'selected_answers', 'question__answers'
+        )),
+        sync_to_async(get_answer_key)(quiz),
+        astats_for(quiz),
+    )
+
+    # Pick the correct answers from the compiled key instead of the is_correct flags
+    for user_answer in user_answers:
+        correct_ids = answer_key[user_answer.question_id].correct_ids
+        user_answer.correct_answers = [
+            answer for answer in user_answer.question.answers.all() if answer.id in correct_ids
+        ]
+
+    context = {
+        'quiz': quiz,
+        'attempt': attempt,
+        'user_answers': user_answers,
+        'show_answers': quiz.show_correct_answers,
+        'stats': stats,
+        'percentile': stats.percentile_rank(attempt.score),
+    }
+    return render(request, 'quizzes/quiz_result.html', context)
+
+
+@read_replica
+@query_budget(7)
+async def leaderboard_view(request, pk=None):
+    """View leaderboard for a quiz or overall, see views.leaderboard_view"""
+    window = request.GET.get('window', 'all')
+    if window not in dict(LeaderboardEntry.WINDOW_CHOICES):
+        window = 'all'
+
+    period = period_start(window, timezone.now())
+    quiz, user = await asyncio.gather(_quiz_or_none(pk), _load_user(request))
+
+    # Where the current user stands, even outside the top 10
+    my_entry = my_rank = None
+    if user.is_authenticated:
+        entries, my_entry = await asyncio.gather(
+            _list(board(quiz, window, period)[:10]),
+            LeaderboardEntry.objects.filter(quiz=quiz, window=window, period_start=period, user=user).afirst(),
+        )
+        if my_entry:
+            my_rank = await arank_of(my_entry)
+    else:
+        entries = await _list(board(quiz, window, period)[:10])
+
+    context = {
+        'quiz': quiz,
+        'entries': entries,
+        'window': window,
+        'windows': LeaderboardEntry.WINDOW_CHOICES,
+        'my_entry': my_entry,
+        'my_rank': my_rank,
+    }
+    return render(request, 'quizzes/leaderboard.html', context)
@@ -0,0 +1,170 @@
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+
+from .grading import parse_responses, store_responses
+from .models import QuizAttempt
+
+
+# Deltas arriving within this many seconds of the last write are buffered and merged
+FLUSH_INTERVAL = getattr(settings, 'QUIZ_AUTOSAVE_FLUSH_INTERVAL', 10)
+
+# Buffered deltas outlive any reasonable quiz
+BUFFER_TIMEOUT = getattr(settings, 'QUIZ_AUTOSAVE_BUFFER_TIMEOUT', 60 * 60 * 6)
+
+# A buffer lock left behind by a crashed request expires after this many seconds
+LOCK_TIMEOUT = 10
+
+
+def buffer_key(attempt_id):
+    return f'quizzes:autosave:{attempt_id}'
+
+
+def buffering():
+    """
+    Whether deltas are buffered in the cache instead of written straight
+    to the database.
+
+    The buffer of an attempt must be visible to every worker that may
+    submit it, so by default it is only used with a cache shared between
+    processes. QUIZ_AUTOSAVE_BUFFER = True forces it, e.g. for a single
+    process, False turns it off.
+    """
+    forced = getattr(settings, 'QUIZ_AUTOSAVE_BUFFER', None)
+    if forced is not None:
+        return forced
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+@contextmanager
+def _buffer_lock(attempt_id):
+    """Hold the attempt's buffer while reading, merging and writing it back"""
+    key = f'{buffer_key(attempt_id)}:lock'
+    while not cache.add(key, 1, LOCK_TIMEOUT):
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        cache.delete(key)
+
+
+def _empty_buffer(attempt):
+    return {'seq': attempt.autosave_seq, 'responses': {}, 'flushed_at': 0}
+
+
+def record_autosave(attempt, answer_key, raw_answers, seq=None):
+    """
+    Merge a delta of changed answers into the attempt's autosave buffer.
+
+    Deltas carry an increasing sequence number from the browser; a delta
+    that is not newer than what was already accepted is ignored, which
+    makes retried requests harmless. The buffer is written to the database
+    at most once per FLUSH_INTERVAL, coalescing frequent saves into one
+    bulk upsert. Without buffering() every delta is written right away.
+    Returns (accepted, flushed).
+    """
+    responses = parse_responses(answer_key, raw_answers)
+    if not buffering():
+        accepted = _store_delta(attempt, responses, seq)
+        return accepted, accepted
+
+    key = buffer_key(attempt.pk)
+    with _buffer_lock(attempt.pk):
+        buffered = cache.get(key) or _empty_buffer(attempt)
+
+        if seq is not None:
+            if seq <= max(buffered['seq'], attempt.autosave_seq):
+                return False, False
+            buffered['seq'] = seq
+
+        buffered['responses'].update(responses)
+
+        now = time.time()
+        flushed = now - buffered['flushed_at'] >= FLUSH_INTERVAL
+        if flushed:
+            flushed = _flush(attempt, buffered)
+            buffered['responses'] = {}
+            buffered['flushed_at'] = now
+        cache.set(key, buffered, BUFFER_TIMEOUT)
+    return True, flushed
+
+
+def flush_autosave(attempt):
+    """Write any buffered autosave deltas of the attempt to the database"""
+    key = buffer_key(attempt.pk)
+    with _buffer_lock(attempt.pk):
+        buffered = cache.get(key)
+        if buffered and buffered['responses']:
+            _flush(attempt, buffered)
+        cache.delete(key)
+
+
+def save_page(attempt, responses):
+    """
+    Store the responses of one page of a paged attempt right away.
+
+    Buffered autosave deltas are written first, so they cannot overwrite
+    the page when they are flushed later.
+    """
+    flush_autosave(attempt)
+    store_responses(attempt, responses)
+
+
+@transaction.atomic
+def _flush(attempt, buffered):
+    """Write a buffer to the database, False when the attempt was submitted meanwhile"""
+    autosave_seq = max(attempt.autosave_seq, buffered['seq'])
+    last_saved_at = timezone.now()
+    # Only attempts still being answered take the answers, a graded one keeps its own
+    if not QuizAttempt.objects.filter(pk=attempt.pk, status='in_progress').update(
+        autosave_seq=autosave_seq,
+        last_saved_at=last_saved_at,
+    ):
+        return False
+    attempt.autosave_seq, attempt.last_saved_at = autosave_seq, last_saved_at
+    store_responses(attempt, buffered['responses'])
+    return True
+
+
+@transaction.atomic
+def _store_delta(attempt, responses, seq):
+    """Write one delta straight to the database, False when it is not newer than the last one"""
+    attempt.last_saved_at = timezone.now()
+    changed = {'last_saved_at': attempt.last_saved_at}
+    rows = QuizAttempt.objects.filter(pk=attempt.pk, status='in_progress')
+    if seq is not None:
+        # Checking and moving the sequence in one UPDATE keeps concurrent deltas apart
+        rows = rows.filter(autosave_seq__lt=seq)
+        changed['autosave_seq'] = seq
+    if not rows.update(**changed):
+        return False
+    attempt.autosave_seq = changed.get('autosave_seq', attempt.autosave_seq)
+    store_responses(attempt, responses)
+    return True
+
+
+def saved_responses(attempt, question_ids=None):
+    """
+    Stored answers of the attempt as question id -> (selected answer ids,
+    text answer), only for question_ids when given.
+    """
+    user_answers = attempt.user_answers.all()
+    SelectedAnswer = attempt.user_answers.model.selected_answers.through
+    selections = SelectedAnswer.objects.filter(useranswer__attempt=attempt)
+    if question_ids is not None:
+        user_answers = user_answers.filter(question_id__in=question_ids)
+        selections = selections.filter(useranswer__question_id__in=question_ids)
+
+    responses = {
+        question_id: (set(), text_answer)
+        for question_id, text_answer in user_answers.values_list('question_id', 'text_answer')
+    }
+    for question_id, answer_id in selections.values_list('useranswer__question_id', 'answer_id'):
+        responses[question_id][0].add(answer_id)
+    return responses
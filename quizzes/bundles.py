@@ -0,0 +1,130 @@
+import hashlib
+import json
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .answer_keys import LOCAL_CACHE_SIZE, SHARED_CACHE_TIMEOUT, LRUCache
+from .models import Question
+
+
+# Quizzes with more questions are taken page by page even without questions_per_page
+PAGED_TAKE_THRESHOLD = getattr(settings, 'QUIZ_PAGED_TAKE_THRESHOLD', 100)
+DEFAULT_QUESTIONS_PER_PAGE = getattr(settings, 'QUIZ_QUESTIONS_PER_PAGE', 10)
+
+_local_bundles = LRUCache(LOCAL_CACHE_SIZE)
+
+
+def cache_key(quiz_id, version):
+    return f'quizzes:take_bundle:{quiz_id}:{version}'
+
+
+def build_bundle(quiz_id):
+    """Questions and answers of a quiz as shown while taking it, without the correct answers"""
+    questions = Question.objects.filter(quiz_id=quiz_id).prefetch_related('answers')
+    return [
+        {
+            'id': question.id,
+            'question_type': question.question_type,
+            'text': question.text,
+            'points': question.points,
+            'image_url': question.image.url if question.image else '',
+            'answers': [{'id': answer.id, 'text': answer.text} for answer in question.answers.all()],
+        }
+        for question in questions
+    ]
+
+
+def get_bundle(quiz):
+    """
+    Return the take bundle of the quiz's current content version.
+
+    Like answer keys, bundles are looked up in the process-local LRU, then
+    in the shared cache, which holds them as JSON, and only built from
+    the database when neither has this version. The bundle is shared, so
+    callers must not modify it.
+    """
+    key = cache_key(quiz.pk, quiz.content_version)
+
+    bundle = _local_bundles.get(key)
+    if bundle is not None:
+        return bundle
+
+    serialized = cache.get(key)
+    if serialized is None:
+        bundle = build_bundle(quiz.pk)
+        cache.set(key, json.dumps(bundle, separators=(',', ':')), SHARED_CACHE_TIMEOUT)
+    else:
+        bundle = json.loads(serialized)
+
+    _local_bundles.set(key, bundle)
+    return bundle
+
+
+def _shuffled(items, seed, salt):
+    """
+    items in a pseudo-random order fixed by seed.
+
+    Each item is ranked by a hash of the seed and its id, so the order
+    survives reloads and stays the same for the remaining items when
+    others are added or removed.
+    """
+    def rank(item):
+        return hashlib.blake2b(f'{seed}:{salt}:{item["id"]}'.encode(), digest_size=8).digest()
+    return sorted(items, key=rank)
+
+
+def ordered_questions(quiz, attempt, page=None):
+    """
+    Bundle questions in the attempt's order, only those of one page when
+    page is given.
+    """
+    questions = get_bundle(quiz)
+    if quiz.randomize_questions:
+        questions = _shuffled(questions, attempt.shuffle_seed, 'questions')
+    if page is not None:
+        start = (page - 1) * attempt.page_size
+        questions = questions[start:start + attempt.page_size]
+    return questions
+
+
+def arrange(quiz, attempt, saved=None, questions=None):
+    """
+    Questions of the quiz's bundle for one attempt.
+
+    Questions and answers are shuffled by the attempt's shuffle_seed when
+    the quiz randomizes them, and carry the attempt's saved responses as
+    saved_answer_ids and saved_text. questions limits this to part of
+    ordered_questions(), e.g. one page.
+    """
+    if questions is None:
+        questions = ordered_questions(quiz, attempt)
+    saved = saved or {}
+    arranged = []
+    for question in questions:
+        answers = question['answers']
+        if quiz.randomize_answers and question['question_type'] != 'truefalse':
+            answers = _shuffled(answers, attempt.shuffle_seed, question['id'])
+        saved_answer_ids, saved_text = saved.get(question['id'], (set(), ''))
+        arranged.append({
+            **question,
+            'answers': answers,
+            'saved_answer_ids': saved_answer_ids,
+            'saved_text': saved_text,
+        })
+    return arranged
+
+
+def page_size_for(quiz):
+    """Questions per page for a new attempt at the quiz, None to show them all on one page"""
+    if quiz.questions_per_page:
+        return quiz.questions_per_page
+    if quiz.question_count > PAGED_TAKE_THRESHOLD:
+        return DEFAULT_QUESTIONS_PER_PAGE
+    return None
+
+
+def page_count(quiz, attempt):
+    """Number of pages of a paged attempt, at least one"""
+    return max(1, math.ceil(len(get_bundle(quiz)) / attempt.page_size))
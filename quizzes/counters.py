@@ -0,0 +1,56 @@
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Quiz, Question
+
+
+def adjust_quiz(quiz_id, questions=0, points=0):
+    """Apply question count / points deltas and bump the content version in one UPDATE"""
+    Quiz.objects.filter(pk=quiz_id).update(
+        content_version=F('content_version') + 1,
+        question_count=F('question_count') + questions,
+        total_points=F('total_points') + points,
+    )
+
+
+def _actual_totals():
+    """Subqueries computing the real question count and points of the outer quiz"""
+    questions = Question.objects.filter(quiz=OuterRef('pk')).order_by().values('quiz')
+    actual_count = Coalesce(
+        Subquery(questions.annotate(total=Count('id')).values('total')), Value(0)
+    )
+    actual_points = Coalesce(
+        Subquery(questions.annotate(total=Sum('points')).values('total')), Value(0)
+    )
+    return actual_count, actual_points
+
+
+def find_drift(quizzes=None):
+    """Return quizzes whose stored counters differ from their questions"""
+    if quizzes is None:
+        quizzes = Quiz.objects.all()
+    actual_count, actual_points = _actual_totals()
+    return quizzes.annotate(
+        actual_question_count=actual_count,
+        actual_total_points=actual_points,
+    ).exclude(
+        question_count=F('actual_question_count'),
+        total_points=F('actual_total_points'),
+    )
+
+
+def recount(quizzes=None):
+    """
+    Recompute stored counters with one set-based UPDATE.
+
+    Use after writes that bypass model signals, such as bulk_create of
+    questions. Also bumps the content version of the affected quizzes.
+    """
+    if quizzes is None:
+        quizzes = Quiz.objects.all()
+    actual_count, actual_points = _actual_totals()
+    return quizzes.update(
+        question_count=actual_count,
+        total_points=actual_points,
+        content_version=F('content_version') + 1,
+    )
@@ -10,7 +10,7 @@ class QuizForm(forms.ModelForm):
             'title', 'description', 'category', 'difficulty',
             'time_limit', 'passing_score', 'max_attempts',
             'is_active', 'is_public', 'show_correct_answers',
-            'randomize_questions', 'randomize_answers',
+            'randomize_questions', 'randomize_answers', 'questions_per_page',
             'start_date', 'end_date'
         ]
         widgets = {
@@ -26,6 +26,7 @@ class QuizForm(forms.ModelForm):
             'show_correct_answers': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
             'randomize_questions': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
             'randomize_answers': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+            'questions_per_page': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
             'start_date': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
             'end_date': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
         }
@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+
+# Keys change with every version, so stale fragments are never read and just expire
+FRAGMENT_TIMEOUT = getattr(settings, 'QUIZ_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+HITS_KEY = 'quizzes:fragments:hits'
+MISSES_KEY = 'quizzes:fragments:misses'
+
+
+def quiz_version(quiz):
+    """
+    Changes whenever a fragment of the quiz may render differently.
+
+    updated_at moves with every save of the quiz and content_version with
+    every change of its questions and answers (quizzes.signals); the
+    category's updated_at covers renamed categories.
+    """
+    category = f'{quiz.category.updated_at.timestamp():.6f}' if quiz.category_id else '-'
+    return f'{quiz.updated_at.timestamp():.6f}.{quiz.content_version}.{category}'
+
+
+def cache_key(template_name, quiz):
+    return f'quizzes:fragment:{template_name}:{quiz.pk}:{quiz_version(quiz)}'
+
+
+def _count(key, amount):
+    if not amount:
+        return
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # The counter does not exist yet, or expired
+        if not cache.add(key, amount, None):
+            cache.incr(key, amount)
+
+
+async def _acount(key, amount):
+    if not amount:
+        return
+    try:
+        await cache.aincr(key, amount)
+    except ValueError:
+        if not await cache.aadd(key, amount, None):
+            await cache.aincr(key, amount)
+
+
+def _render(template_name, keys, quizzes, cached):
+    """HTML of each quiz, from cached or rendered, and the renderings to store"""
+    missing = {}
+    fragments = []
+    for key, quiz in zip(keys, quizzes):
+        html = cached.get(key)
+        if html is None:
+            html = missing[key] = render_to_string(template_name, {'quiz': quiz})
+        fragments.append(mark_safe(html))
+    return fragments, missing
+
+
+def render_fragments(template_name, quizzes):
+    """
+    Render template_name for each quiz, reusing cached renderings.
+
+    All fragments are looked up with one get_many() and the missing ones
+    stored with one set_many(). The fragments only see the quiz, so they
+    must not show anything specific to the visitor. Returns the HTML of
+    each quiz in order.
+    """
+    quizzes = list(quizzes)
+    keys = [cache_key(template_name, quiz) for quiz in quizzes]
+    fragments, missing = _render(template_name, keys, quizzes, cache.get_many(keys))
+    if missing:
+        cache.set_many(missing, FRAGMENT_TIMEOUT)
+
+    _count(HITS_KEY, len(quizzes) - len(missing))
+    _count(MISSES_KEY, len(missing))
+    return fragments
+
+
+async def arender_fragments(template_name, quizzes):
+    """Async version of render_fragments(), for quizzes that are already loaded"""
+    keys = [cache_key(template_name, quiz) for quiz in quizzes]
+    fragments, missing = _render(template_name, keys, quizzes, await cache.aget_many(keys))
+    if missing:
+        await cache.aset_many(missing, FRAGMENT_TIMEOUT)
+
+    await _acount(HITS_KEY, len(quizzes) - len(missing))
+    await _acount(MISSES_KEY, len(missing))
+    return fragments
+
+
+def with_fragments(template_name, quizzes):
+    """Quizzes with their rendered fragment in quiz.fragment, for templates"""
+    quizzes = list(quizzes)
+    for quiz, html in zip(quizzes, render_fragments(template_name, quizzes)):
+        quiz.fragment = html
+    return quizzes
+
+
+async def awith_fragments(template_name, quizzes):
+    """Async version of with_fragments(), for quizzes that are already loaded"""
+    for quiz, html in zip(quizzes, await arender_fragments(template_name, quizzes)):
+        quiz.fragment = html
+    return quizzes
+
+
+def stats():
+    """(hits, misses, hit ratio) of the fragment cache since the last reset"""
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    return hits, misses, hits / (hits + misses) if hits + misses else None
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,189 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UserAnswer
+
+
+# Rows per INSERT statement when writing answers in bulk
+BULK_BATCH_SIZE = 500
+
+
+def grade(question_key, selected_ids):
+    """Grade a single response against its QuestionKey, returning (is_correct, points_earned)"""
+    if question_key.question_type == 'text':
+        # Text answers need manual grading
+        return False, 0
+    if question_key.question_type in ('single', 'truefalse'):
+        is_correct = len(selected_ids) == 1 and selected_ids[0] in question_key.correct_ids
+    else:
+        # Multiple choice - all correct answers must be selected
+        is_correct = frozenset(selected_ids) == question_key.correct_ids
+    return is_correct, question_key.points if is_correct else 0
+
+
+def calculate_percentage(points_earned, total_points):
+    """Score as a percentage rounded to the precision of QuizAttempt.score"""
+    if total_points <= 0:
+        return Decimal('0.00')
+    return round(Decimal(points_earned) * 100 / Decimal(total_points), 2)
+
+
+def parse_responses(answer_key, raw_answers):
+    """
+    Validate raw answers against the answer key.
+
+    raw_answers maps question ids to a list of answer ids (choice questions)
+    or a string (text questions). Returns a dict of question id ->
+    (selected answer ids, text answer). Unknown questions and answer IDs
+    that do not belong to their question are silently dropped.
+    """
+    responses = {}
+    for raw_question_id, raw_value in raw_answers.items():
+        try:
+            question_id = int(raw_question_id)
+        except (TypeError, ValueError):
+            continue
+        if question_id not in answer_key:
+            continue
+        question_key = answer_key[question_id]
+
+        if question_key.question_type == 'text':
+            if isinstance(raw_value, (list, tuple)):
+                raw_value = raw_value[0] if raw_value else ''
+            responses[question_id] = ([], str(raw_value or ''))
+            continue
+
+        if not isinstance(raw_value, (list, tuple)):
+            raw_value = [raw_value] if raw_value not in (None, '') else []
+        selected = []
+        for raw_id in raw_value:
+            try:
+                answer_id = int(raw_id)
+            except (TypeError, ValueError):
+                continue
+            if answer_id in question_key.answer_ids and answer_id not in selected:
+                selected.append(answer_id)
+
+        if question_key.question_type != 'multiple':
+            # Single choice or true/false - only one answer counts
+            selected = selected[:1]
+        responses[question_id] = (selected, '')
+    return responses
+
+
+def parse_submission(answer_key, data, question_ids=None):
+    """
+    Read a quiz form, treating every question of the quiz, or of
+    question_ids when given, as answered or cleared.
+    """
+    raw_answers = {}
+    for question_id in answer_key.questions if question_ids is None else question_ids:
+        question_key = answer_key.questions.get(question_id)
+        if question_key is None:
+            continue
+        field_name = f'question_{question_id}'
+        if question_key.question_type == 'text':
+            raw_answers[question_id] = data.get(field_name, '')
+        else:
+            raw_answers[question_id] = data.getlist(field_name)
+    return parse_responses(answer_key, raw_answers)
+
+
+@transaction.atomic
+def store_responses(attempt, responses):
+    """
+    Idempotently upsert responses for an attempt.
+
+    One bulk upsert writes the UserAnswer rows, then the selected answers
+    of the touched rows are replaced with one delete and one bulk insert.
+    Grading fields are left alone; grade_attempt() fills them in.
+    """
+    if not responses:
+        return
+    user_answers = UserAnswer.objects.bulk_create(
+        [
+            UserAnswer(attempt=attempt, question_id=question_id, text_answer=text_answer)
+            for question_id, (_, text_answer) in responses.items()
+        ],
+        batch_size=BULK_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['attempt', 'question'],
+        update_fields=['text_answer'],
+    )
+
+    SelectedAnswer = UserAnswer.selected_answers.through
+    SelectedAnswer.objects.filter(useranswer__in=[ua.pk for ua in user_answers]).delete()
+    SelectedAnswer.objects.bulk_create(
+        [
+            SelectedAnswer(useranswer_id=user_answer.pk, answer_id=answer_id)
+            for user_answer in user_answers
+            for answer_id in responses[user_answer.question_id][0]
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+
+@transaction.atomic
+def grade_attempt(attempt, answer_key):
+    """
+    Grade everything stored for the attempt and complete it.
+
+    Reads the stored answers and selections with two queries, grades in
+    memory and writes the results back in bulk, so the number of queries
+    does not depend on the number of questions. Questions without a stored
+    answer get an empty one so they still show up in the review.
+    """
+    user_answers = list(UserAnswer.objects.filter(attempt=attempt).only('id', 'question_id'))
+    selections = {}
+    SelectedAnswer = UserAnswer.selected_answers.through
+    for useranswer_id, answer_id in SelectedAnswer.objects.filter(
+        useranswer__attempt=attempt
+    ).values_list('useranswer_id', 'answer_id'):
+        selections.setdefault(useranswer_id, []).append(answer_id)
+
+    answered = {user_answer.question_id for user_answer in user_answers}
+    UserAnswer.objects.bulk_create(
+        [
+            UserAnswer(attempt=attempt, question_id=question_id)
+            for question_id in answer_key.questions
+            if question_id not in answered
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+    points_earned = 0
+    graded = []
+    for user_answer in user_answers:
+        if user_answer.question_id not in answer_key:
+            # Question was removed from the quiz since it was answered
+            continue
+        selected = sorted(selections.get(user_answer.pk, []))
+        user_answer.is_correct, user_answer.points_earned = grade(
+            answer_key[user_answer.question_id], selected
+        )
+        points_earned += user_answer.points_earned
+        graded.append(user_answer)
+    UserAnswer.objects.bulk_update(graded, ['is_correct', 'points_earned'], batch_size=BULK_BATCH_SIZE)
+
+    attempt.status = 'completed'
+    attempt.end_time = timezone.now()
+    attempt.points_earned = points_earned
+    attempt.total_points = answer_key.total_points
+    attempt.score = calculate_percentage(points_earned, answer_key.total_points)
+    attempt.save(update_fields=['status', 'end_time', 'points_earned', 'total_points', 'score'])
+    return attempt
+
+
+@transaction.atomic
+def submit_attempt(attempt, answer_key, data=None):
+    """
+    Complete an attempt, optionally storing a full quiz form first.
+
+    Answers already saved through autosave are kept, so a submission
+    without form data only has to grade what is stored.
+    """
+    if data is not None:
+        store_responses(attempt, parse_submission(answer_key, data))
+    return grade_attempt(attempt, answer_key)
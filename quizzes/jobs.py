@@ -0,0 +1,233 @@
+import logging
+import os
+import socket
+import time
+import traceback
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds before the first retry of a failed job, doubled on every further attempt
+RETRY_DELAY = getattr(settings, 'QUIZ_JOB_RETRY_DELAY', 10)
+
+# Running jobs started, or last sending a heartbeat(), longer ago than this are
+# assumed to belong to a dead worker
+STALE_AFTER = getattr(settings, 'QUIZ_JOB_STALE_AFTER', 15 * 60)
+
+# Registered task functions by name
+TASKS = {}
+
+# The job run_job() is running
+_current_job = ContextVar('quiz_job', default=None)
+
+# Tasks enqueued for every completed attempt, see enqueue_attempt_followups()
+ATTEMPT_TASKS = []
+
+# Tasks enqueued after all attempts of a quiz were regraded, see enqueue_quiz_followups()
+QUIZ_TASKS = []
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def task(name, on_attempt_completed=False, on_quiz_regraded=False):
+    """
+    Register a function as a background task.
+
+    Task functions receive the job payload as keyword arguments. With
+    on_attempt_completed=True the task is also enqueued with an
+    ``attempt_id`` for every attempt that has been fully graded, and with
+    on_quiz_regraded=True with a ``quiz_id`` after a bulk regrade.
+    """
+    def decorator(func):
+        TASKS[name] = func
+        if on_attempt_completed:
+            ATTEMPT_TASKS.append(name)
+        if on_quiz_regraded:
+            QUIZ_TASKS.append(name)
+        return func
+    return decorator
+
+
+def enqueue(task_name, payload=None, delay=0, max_attempts=3):
+    """Queue a task; inside a transaction the job only becomes visible on commit"""
+    if task_name not in TASKS:
+        raise UnknownTask(task_name)
+    return Job.objects.create(
+        task=task_name,
+        payload=payload or {},
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue_attempt_followups(attempt):
+    """Queue the statistics and leaderboard tasks for a fully graded attempt"""
+    Job.objects.bulk_create([
+        Job(task=task_name, payload={'attempt_id': attempt.pk})
+        for task_name in ATTEMPT_TASKS
+    ])
+
+
+def enqueue_quiz_followups(quiz):
+    """Queue the tasks that rebuild quiz-wide rollups after a regrade"""
+    Job.objects.bulk_create([
+        Job(task=task_name, payload={'quiz_id': quiz.pk})
+        for task_name in QUIZ_TASKS
+    ])
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_next(worker_id):
+    """
+    Lock and return the next due job, or None when the queue is empty.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED where the database supports it
+    so concurrent workers never wait on each other. Elsewhere (SQLite) a
+    job is claimed with a conditional UPDATE that only one worker can win.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'id')
+    claim = {
+        'status': 'running',
+        'locked_by': worker_id,
+        'started_at': now,
+        'attempts': F('attempts') + 1,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job_id = due.select_for_update(skip_locked=True).values_list('id', flat=True).first()
+            if job_id is None:
+                return None
+            Job.objects.filter(pk=job_id).update(**claim)
+        return Job.objects.get(pk=job_id)
+
+    for job_id in due.values_list('id', flat=True)[:10]:
+        if Job.objects.filter(pk=job_id, status='queued').update(**claim):
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def _retry_at(attempts):
+    """When to retry a job that failed its attempts-th attempt, with exponential backoff"""
+    return timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def run_job(job):
+    """Run a claimed job, scheduling a retry with exponential backoff if it fails"""
+    token = _current_job.set(job)
+    try:
+        func = TASKS.get(job.task)
+        if func is None:
+            raise UnknownTask(job.task)
+        func(**job.payload)
+    except Exception:
+        logger.exception('Job %s failed', job)
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_at = _retry_at(job.attempts)
+        else:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+    else:
+        job.status = 'done'
+        job.finished_at = timezone.now()
+    finally:
+        _current_job.reset(token)
+    job.locked_by = ''
+    job.save(update_fields=['status', 'run_at', 'finished_at', 'last_error', 'locked_by'])
+    return job.status == 'done'
+
+
+def heartbeat():
+    """
+    Tell requeue_stale() that the running job is still alive.
+
+    Tasks that may run longer than STALE_AFTER call this regularly. Does
+    nothing outside a job.
+    """
+    job = _current_job.get()
+    if job is not None:
+        job.started_at = timezone.now()
+        Job.objects.filter(pk=job.pk, status='running').update(started_at=job.started_at)
+
+
+def requeue_stale(stale_after=STALE_AFTER):
+    """
+    Give jobs of crashed workers back to the queue.
+
+    A lost worker counts as a failed attempt: the job is retried with the
+    same backoff as in run_job(), or fails once it used up max_attempts,
+    so a job that kills its worker does not come back forever. Returns
+    the number of jobs requeued.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = Job.objects.filter(status='running', started_at__lt=cutoff)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', locked_by='', finished_at=timezone.now(), last_error='worker lost',
+    )
+    requeued = 0
+    for job_id, attempts in stale.values_list('id', 'attempts'):
+        # The conditions again, in case the job sent a heartbeat meanwhile
+        requeued += stale.filter(pk=job_id).update(
+            status='queued', locked_by='', run_at=_retry_at(attempts), last_error='worker lost',
+        )
+    return requeued
+
+
+def work(worker_id=None, burst=False, sleep=1.0, max_jobs=None):
+    """
+    Process jobs until stopped.
+
+    With burst=True the worker exits once the queue is empty. Returns the
+    number of jobs processed.
+    """
+    worker_id = worker_id or worker_name()
+    processed = 0
+    last_stale_check = None
+    while max_jobs is None or processed < max_jobs:
+        close_old_connections()
+        if last_stale_check is None or time.monotonic() - last_stale_check > 60:
+            requeue_stale()
+            last_stale_check = time.monotonic()
+
+        job = claim_next(worker_id)
+        if job is None:
+            if burst:
+                break
+            time.sleep(sleep)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def queue_stats():
+    """Queue depth and lag for monitoring"""
+    now = timezone.now()
+    counts = {status: 0 for status, _ in Job.STATUS_CHOICES}
+    for row in Job.objects.order_by().values('status').annotate(total=Count('id')):
+        counts[row['status']] = row['total']
+    oldest_due = Job.objects.filter(status='queued', run_at__lte=now).aggregate(oldest=Min('run_at'))['oldest']
+    return {
+        'queued': counts['queued'],
+        'running': counts['running'],
+        'done': counts['done'],
+        'failed': counts['failed'],
+        'lag_seconds': (now - oldest_due).total_seconds() if oldest_due else 0,
+    }
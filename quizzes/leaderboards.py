@@ -0,0 +1,176 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import LeaderboardEntry, QuizAttempt
+
+
+# period_start of all-time entries
+ALL_TIME_START = date(1970, 1, 1)
+
+WINDOWS = [window for window, _ in LeaderboardEntry.WINDOW_CHOICES]
+
+# Rows per INSERT statement when rebuilding
+BULK_BATCH_SIZE = 1000
+
+
+def period_start(window, moment):
+    """First day of the window's period containing moment"""
+    day = timezone.localtime(moment).date()
+    if window == 'week':
+        return day - timedelta(days=day.weekday())
+    if window == 'month':
+        return day.replace(day=1)
+    return ALL_TIME_START
+
+
+def board(quiz, window, period=None):
+    """Entries of one leaderboard in ranking order"""
+    if period is None:
+        period = period_start(window, timezone.now())
+    entries = LeaderboardEntry.objects.filter(
+        quiz=quiz, window=window, period_start=period
+    ).select_related('user')
+    if quiz is None:
+        return entries.order_by('-avg_score', '-quizzes_completed', 'user_id')
+    return entries.order_by('-best_score', 'best_at', 'user_id')
+
+
+def _ahead_of(entry):
+    """Entries ranked before entry on its leaderboard"""
+    entries = LeaderboardEntry.objects.filter(
+        quiz_id=entry.quiz_id, window=entry.window, period_start=entry.period_start
+    )
+    if entry.quiz_id is None:
+        return entries.filter(
+            Q(avg_score__gt=entry.avg_score)
+            | Q(avg_score=entry.avg_score, quizzes_completed__gt=entry.quizzes_completed)
+            | Q(avg_score=entry.avg_score, quizzes_completed=entry.quizzes_completed, user_id__lt=entry.user_id)
+        )
+    return entries.filter(
+        Q(best_score__gt=entry.best_score)
+        | Q(best_score=entry.best_score, best_at__lt=entry.best_at)
+        | Q(best_score=entry.best_score, best_at=entry.best_at, user_id__lt=entry.user_id)
+    )
+
+
+def rank_of(entry):
+    """
+    1-based rank of an entry, counted over the ranking index.
+
+    The count walks the index range of the entries ahead, so its cost
+    grows with the rank rather than logarithmically. Good enough for the
+    board sizes seen here; a rank tree would be needed beyond that.
+    """
+    return _ahead_of(entry).count() + 1
+
+
+async def arank_of(entry):
+    """Async version of rank_of()"""
+    return await _ahead_of(entry).acount() + 1
+
+
+def _add_score(entry, score, end_time):
+    entry.attempts += 1
+    entry.score_sum += score
+    entry.avg_score = round(entry.score_sum / entry.attempts, 2)
+    if entry.best_at is None or score > entry.best_score:
+        entry.best_score = score
+        entry.best_at = end_time
+
+
+@transaction.atomic
+def record_attempt(attempt):
+    """
+    Add a completed attempt to the quiz and overall leaderboards of every window.
+
+    Each attempt is only ever counted once, so running this twice for the
+    same attempt is harmless. Returns whether anything was updated.
+    """
+    claimed = QuizAttempt.objects.filter(
+        pk=attempt.pk, status='completed', counted_in_leaderboards=False
+    ).update(counted_in_leaderboards=True)
+    if not claimed:
+        return False
+
+    score = attempt.score or Decimal('0')
+    for window in WINDOWS:
+        period = period_start(window, attempt.end_time)
+        quiz_entry, first_in_quiz = LeaderboardEntry.objects.select_for_update().get_or_create(
+            quiz_id=attempt.quiz_id, user_id=attempt.user_id, window=window, period_start=period,
+            defaults={'quizzes_completed': 1},
+        )
+        overall_entry, _ = LeaderboardEntry.objects.select_for_update().get_or_create(
+            quiz=None, user_id=attempt.user_id, window=window, period_start=period,
+        )
+
+        _add_score(quiz_entry, score, attempt.end_time)
+        _add_score(overall_entry, score, attempt.end_time)
+        if first_in_quiz:
+            overall_entry.quizzes_completed += 1
+        quiz_entry.save()
+        overall_entry.save()
+    return True
+
+
+@transaction.atomic
+def rebuild_leaderboards(quiz=None):
+    """
+    Recompute leaderboard entries from completed attempts.
+
+    With a quiz only that quiz's board and the overall rows of its
+    participants are rebuilt, e.g. after a regrade. Attempts on other
+    quizzes that are not counted yet are left to their queued
+    record_attempt(). Returns the number of entries written.
+    """
+    attempts = QuizAttempt.objects.filter(status='completed')
+    quiz_entries = LeaderboardEntry.objects.filter(quiz__isnull=False)
+    overall_entries = LeaderboardEntry.objects.filter(quiz__isnull=True)
+    if quiz is not None:
+        participants = attempts.filter(quiz=quiz).values('user')
+        attempts = attempts.filter(user__in=participants)
+        quiz_entries = quiz_entries.filter(quiz=quiz)
+        overall_entries = overall_entries.filter(user__in=participants)
+
+    entries = {}
+    # Only the attempts added here are marked counted, not ones completed meanwhile
+    uncounted = []
+    rows = attempts.order_by('end_time', 'pk').values_list(
+        'pk', 'quiz_id', 'user_id', 'score', 'end_time', 'counted_in_leaderboards'
+    )
+    for pk, quiz_id, user_id, score, end_time, counted in rows.iterator(chunk_size=5000):
+        if not counted:
+            if quiz is not None and quiz_id != quiz.pk:
+                # Its own queued record_attempt() adds it to both boards
+                continue
+            uncounted.append(pk)
+        score = score or Decimal('0')
+        for window in WINDOWS:
+            period = period_start(window, end_time)
+            quiz_key = (quiz_id, user_id, window, period)
+            overall_key = (None, user_id, window, period)
+            if quiz_key not in entries:
+                entries[quiz_key] = LeaderboardEntry(
+                    quiz_id=quiz_id, user_id=user_id, window=window, period_start=period,
+                    quizzes_completed=1,
+                )
+                entries.setdefault(overall_key, LeaderboardEntry(
+                    user_id=user_id, window=window, period_start=period,
+                ))
+                entries[overall_key].quizzes_completed += 1
+            _add_score(entries[quiz_key], score, end_time)
+            _add_score(entries[overall_key], score, end_time)
+
+    if quiz is not None:
+        # Other quizzes of the participants keep their entries
+        entries = {key: entry for key, entry in entries.items() if key[0] in (None, quiz.pk)}
+
+    quiz_entries.delete()
+    overall_entries.delete()
+    LeaderboardEntry.objects.bulk_create(entries.values(), batch_size=BULK_BATCH_SIZE)
+    for start in range(0, len(uncounted), BULK_BATCH_SIZE):
+        QuizAttempt.objects.filter(pk__in=uncounted[start:start + BULK_BATCH_SIZE]).update(counted_in_leaderboards=True)
+    return len(entries)
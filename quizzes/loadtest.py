@@ -0,0 +1,285 @@
+import asyncio
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from html import unescape
+from urllib.parse import urlencode, urljoin, urlsplit
+
+
+# Session steps in request order
+STEPS = ['login_page', 'login', 'take', 'submit', 'result']
+
+# Text of database errors caused by lock contention, as shown on the
+# server's error page (only with DEBUG, otherwise they are plain 500s)
+LOCK_ERROR_MARKERS = (
+    'database is locked',
+    'database table is locked',
+    'deadlock detected',
+    'could not obtain lock',
+    'lock timeout',
+)
+
+INPUT_RE = re.compile(r'<input type="(radio|checkbox)" name="(question_\d+)" value="(\d+)"')
+TEXTAREA_RE = re.compile(r'<textarea name="(question_\d+)"')
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+def percentile(samples, percent):
+    """Percentile of a list of samples, interpolating between the closest ranks"""
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class LoadTestError(Exception):
+    """A session step that did not get the expected response"""
+
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind = kind
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict
+    body: str
+
+
+class HttpSession:
+    """
+    Minimal HTTP/1.1 client on asyncio streams with a cookie jar.
+
+    Every request opens its own connection, like browsers of different
+    students would, so the server's connection handling is part of the
+    measurement.
+    """
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cookies = {}
+
+    async def request(self, method, path, data=None):
+        url = urlsplit(urljoin(self.base_url, path))
+        target = url.path + (f'?{url.query}' if url.query else '')
+        body = urlencode(data, doseq=True).encode() if data is not None else b''
+        headers = [
+            f'{method} {target} HTTP/1.1',
+            f'Host: {url.netloc}',
+            'Connection: close',
+        ]
+        if self.cookies:
+            headers.append('Cookie: ' + '; '.join(f'{name}={value}' for name, value in self.cookies.items()))
+        if data is not None:
+            headers.append('Content-Type: application/x-www-form-urlencoded')
+            headers.append(f'Content-Length: {len(body)}')
+
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(url.hostname, url.port or 80), self.timeout
+        )
+        try:
+            writer.write('\r\n'.join(headers).encode() + b'\r\n\r\n' + body)
+            await writer.drain()
+            raw = await asyncio.wait_for(reader.read(), self.timeout)
+        finally:
+            writer.close()
+
+        head, _, content = raw.partition(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        response_headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            name, value = name.strip().lower(), value.strip()
+            if name == 'set-cookie':
+                cookie_name, _, cookie_value = value.split(';')[0].partition('=')
+                self.cookies[cookie_name] = cookie_value
+            response_headers[name] = value
+        return Response(int(status_line.split()[1]), response_headers, content.decode('utf-8', 'replace'))
+
+
+@dataclass
+class Sample:
+    step: str
+    start: float
+    duration: float
+    status: int = 0
+    error: str = ''
+
+
+@dataclass
+class LoadTestResult:
+    samples: list = field(default_factory=list)
+    sessions: int = 0
+    completed: int = 0
+    elapsed: float = 0.0
+
+    def summary(self):
+        """Throughput, latency percentiles and error counts overall and per step"""
+        def describe(samples):
+            latencies = [sample.duration * 1000 for sample in samples if not sample.error]
+            errors = {}
+            for sample in samples:
+                if sample.error:
+                    errors[sample.error] = errors.get(sample.error, 0) + 1
+            return {
+                'requests': len(samples),
+                'throughput_rps': round(len(samples) / self.elapsed, 2) if self.elapsed else 0,
+                'p50_ms': round(percentile(latencies, 50), 1) if latencies else None,
+                'p95_ms': round(percentile(latencies, 95), 1) if latencies else None,
+                'p99_ms': round(percentile(latencies, 99), 1) if latencies else None,
+                'max_ms': round(max(latencies), 1) if latencies else None,
+                'error_rate': round(sum(errors.values()) / len(samples), 4) if samples else 0,
+                'errors': errors,
+            }
+
+        return {
+            'sessions': self.sessions,
+            'completed_sessions': self.completed,
+            'elapsed_s': round(self.elapsed, 2),
+            'sessions_per_s': round(self.completed / self.elapsed, 2) if self.elapsed else 0,
+            'total': describe(self.samples),
+            'steps': {
+                step: describe([sample for sample in self.samples if sample.step == step])
+                for step in STEPS
+            },
+        }
+
+
+def arrival_offsets(pattern, count, duration, rng):
+    """
+    Seconds after the start at which each student begins.
+
+    ramp spreads arrivals evenly over duration, spike sends everyone within
+    the first second, and deadline ramps up like ramp (the burst is in the
+    submissions, see submit_offsets).
+    """
+    if pattern == 'spike':
+        return sorted(rng.uniform(0, min(1.0, duration)) for _ in range(count))
+    step = duration / count if count else 0
+    return [index * step for index in range(count)]
+
+
+def submit_offsets(pattern, arrivals, think, duration, burst, rng):
+    """
+    Seconds after the start at which each student submits.
+
+    With deadline everyone submits in the last burst seconds before the
+    time limit ends at duration + think, otherwise each student thinks
+    for between half and one and a half times think.
+    """
+    if pattern == 'deadline':
+        deadline = duration + think
+        return [max(arrival, deadline - rng.uniform(0, burst)) for arrival in arrivals]
+    return [arrival + rng.uniform(0.5, 1.5) * think for arrival in arrivals]
+
+
+def fill_answers(html, rng):
+    """Form data answering every question on a quiz_take page at random"""
+    data = {}
+    options = {}
+    for input_type, name, value in INPUT_RE.findall(html):
+        options.setdefault(name, (input_type, []))[1].append(value)
+    for name, (input_type, values) in options.items():
+        if input_type == 'radio':
+            data[name] = [rng.choice(values)]
+        else:
+            data[name] = rng.sample(values, rng.randint(1, len(values)))
+    for name in TEXTAREA_RE.findall(html):
+        data[name] = ['answer']
+    return data
+
+
+def csrf_token(html):
+    match = CSRF_RE.search(html)
+    if match is None:
+        raise LoadTestError('unexpected_response', 'no CSRF token in page')
+    return unescape(match.group(1))
+
+
+class LoadTest:
+    """
+    Simulate students taking a quiz against a running server.
+
+    Each virtual student logs in, opens the quiz, thinks, submits and
+    views the result. Arrivals and submissions follow the chosen pattern.
+    """
+
+    def __init__(self, base_url, login_path, take_path, credentials, pattern='ramp', duration=60.0, think=30.0,
+                 burst=10.0, timeout=30.0, seed=0):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.login_path = login_path
+        self.take_path = take_path
+        self.credentials = credentials
+        self.pattern = pattern
+        self.duration = duration
+        self.think = think
+        self.burst = burst
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.result = LoadTestResult()
+
+    async def step(self, name, session, method, path, data=None, expect=(200,)):
+        """Send one request, record it and return the response"""
+        start = time.perf_counter()
+        sample = Sample(name, start - self.started, 0.0)
+        self.result.samples.append(sample)
+        try:
+            response = await session.request(method, path, data)
+        except asyncio.TimeoutError:
+            sample.error = 'timeout'
+        except OSError:
+            sample.error = 'connection'
+        else:
+            sample.status = response.status
+            if response.status not in expect:
+                body = response.body.lower()
+                if any(marker in body for marker in LOCK_ERROR_MARKERS):
+                    sample.error = 'db_lock'
+                elif response.status >= 500:
+                    sample.error = 'server_error'
+                else:
+                    sample.error = f'http_{response.status}'
+        sample.duration = time.perf_counter() - start
+        if sample.error:
+            raise LoadTestError(sample.error, f'{name} failed: {sample.error}')
+        return response
+
+    async def student(self, username, password, arrival, submit_at):
+        session = HttpSession(self.base_url, self.timeout)
+        rng = random.Random(self.rng.random())
+        await asyncio.sleep(arrival)
+        try:
+            page = await self.step('login_page', session, 'GET', self.login_path)
+            await self.step('login', session, 'POST', self.login_path, {
+                'csrfmiddlewaretoken': csrf_token(page.body), 'username': username, 'password': password,
+            }, expect=(302,))
+
+            page = await self.step('take', session, 'GET', self.take_path)
+            answers = fill_answers(page.body, rng)
+            answers['csrfmiddlewaretoken'] = csrf_token(page.body)
+
+            await asyncio.sleep(max(0.0, submit_at - (time.perf_counter() - self.started)))
+            response = await self.step('submit', session, 'POST', self.take_path, answers, expect=(302,))
+            await self.step('result', session, 'GET', response.headers['location'])
+        except LoadTestError:
+            return
+        self.result.completed += 1
+
+    async def run(self):
+        count = len(self.credentials)
+        arrivals = arrival_offsets(self.pattern, count, self.duration, self.rng)
+        submits = submit_offsets(self.pattern, arrivals, self.think, self.duration, self.burst, self.rng)
+        self.result.sessions = count
+        self.started = time.perf_counter()
+        await asyncio.gather(*(
+            self.student(username, password, arrival, submit_at)
+            for (username, password), arrival, submit_at in zip(self.credentials, arrivals, submits)
+        ))
+        self.result.elapsed = time.perf_counter() - self.started
+        return self.result
@@ -0,0 +1,208 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from quiz_platform.query_budget import QueryRecorder
+from quizzes import fragments
+from quizzes.leaderboards import rebuild_leaderboards
+from quizzes.loadtest import percentile
+from quizzes.models import QuizAttempt
+from quizzes.sample_data import SampleDataGenerator
+from quizzes.stats import rebuild_stats
+
+
+SCENARIOS = ['quiz_take', 'quiz_submit', 'quiz_result', 'dashboard', 'quiz_list', 'leaderboard', 'quiz_leaderboard']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the main views through the test client and compare against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Scenario to run (repeatable, default: all)')
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per scenario before measuring')
+        parser.add_argument('--cold-cache', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the load_sample_data dataset to use')
+        parser.add_argument('--users', type=int, default=500, help='Users to generate when the dataset does not exist yet')
+        parser.add_argument('--quizzes', type=int, default=20, help='Quizzes to generate when the dataset does not exist yet')
+        parser.add_argument('--attempts', type=int, default=5000, help='Attempts to generate when the dataset does not exist yet')
+        parser.add_argument('--output', default='bench-results.json', help='Where to write the results')
+        parser.add_argument('--baseline', help='Baseline results to compare against')
+        parser.add_argument('--save-baseline', action='store_true', help='Also write the results to the --baseline file')
+        parser.add_argument('--threshold', type=float, default=10.0, help='Allowed p50/p95 latency increase in percent')
+        parser.add_argument('--query-threshold', type=int, default=0, help='Allowed increase in queries per request')
+
+    def handle(self, *args, **options):
+        attempt = self.prepare_dataset(options)
+        student, quiz = attempt.user, attempt.quiz
+
+        client = Client()
+        client.force_login(student)
+        scenarios = self.scenarios(client, student, quiz, attempt)
+
+        results = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'seed': options['seed'],
+                'iterations': options['iterations'],
+                'cold_cache': options['cold_cache'],
+            },
+            'scenarios': {},
+        }
+
+        names = options['scenario'] or SCENARIOS
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name in names:
+                result = self.run_scenario(scenarios[name], options)
+                results['scenarios'][name] = result
+                self.stdout.write(
+                    f'{name:<18} p50 {result["p50_ms"]:8.2f}ms  p95 {result["p95_ms"]:8.2f}ms  '
+                    f'p99 {result["p99_ms"]:8.2f}ms  {result["queries"]:3d} queries  '
+                    f'SQL {result["sql_ms"]:7.2f}ms  peak {result["peak_memory_kb"]:8.1f}KiB'
+                )
+
+        Path(options['output']).write_text(json.dumps(results, indent=2))
+        self.stdout.write(f'Results written to {options["output"]}')
+
+        if options['baseline']:
+            baseline_path = Path(options['baseline'])
+            if options['save_baseline']:
+                baseline_path.write_text(json.dumps(results, indent=2))
+                self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+            elif not baseline_path.exists():
+                raise CommandError(f'Baseline {baseline_path} does not exist, create it with --save-baseline.')
+            else:
+                self.compare(results, json.loads(baseline_path.read_text()), options)
+
+    def prepare_dataset(self, options):
+        """Return a completed attempt of a generated student, generating the dataset first if needed"""
+        generator = SampleDataGenerator(seed=options['seed'], log=self.stdout.write)
+        if not generator.exists():
+            self.stdout.write(f'Generating benchmark dataset for seed {options["seed"]}...')
+            generator.generate(options['users'], options['quizzes'], options['attempts'])
+            rebuild_leaderboards()
+            rebuild_stats()
+
+        attempt = QuizAttempt.objects.filter(
+            user__username__startswith=f'{generator.prefix}_student', status='completed',
+        ).select_related('user', 'quiz').order_by('pk').first()
+        if attempt is None:
+            raise CommandError(f'The dataset of seed {options["seed"]} has no completed attempts.')
+        return attempt
+
+    def scenarios(self, client, student, quiz, attempt):
+        """Request functions of every scenario"""
+        take_url = reverse('quizzes:quiz_take', args=[quiz.pk])
+        # The attempt to submit must exist before measuring
+        QuizAttempt.objects.get_or_create(user=student, quiz=quiz, status='in_progress')
+        answers = {}
+        for question_id, question_key in quiz.answer_key.questions.items():
+            if question_key.question_type == 'text':
+                answers[f'question_{question_id}'] = 'answer'
+            else:
+                answers[f'question_{question_id}'] = sorted(question_key.correct_ids)
+
+        def submit():
+            # Rolled back so every iteration submits the same attempt
+            with transaction.atomic():
+                response = client.post(take_url, answers)
+                transaction.set_rollback(True)
+            return response
+
+        return {
+            'quiz_take': lambda: client.get(take_url),
+            'quiz_submit': submit,
+            'quiz_result': lambda: client.get(reverse('quizzes:quiz_result', args=[quiz.pk, attempt.pk])),
+            'dashboard': lambda: client.get(reverse('quizzes:dashboard')),
+            'quiz_list': lambda: client.get(reverse('quizzes:quiz_list')),
+            'leaderboard': lambda: client.get(reverse('quizzes:leaderboard')),
+            'quiz_leaderboard': lambda: client.get(reverse('quizzes:quiz_leaderboard', args=[quiz.pk])),
+        }
+
+    def request(self, scenario, cold_cache):
+        if cold_cache:
+            cache.clear()
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            start = time.perf_counter()
+            response = scenario()
+            elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise CommandError(f'Request failed with status {response.status_code}')
+        return elapsed, recorder
+
+    def run_scenario(self, scenario, options):
+        for _ in range(options['warmup']):
+            self.request(scenario, options['cold_cache'])
+        fragments.reset_stats()
+
+        latencies, queries, sql_times = [], [], []
+        for _ in range(max(1, options['iterations'])):
+            elapsed, recorder = self.request(scenario, options['cold_cache'])
+            latencies.append(elapsed * 1000)
+            queries.append(recorder.count)
+            sql_times.append(recorder.duration * 1000)
+
+        _, _, fragment_hit_ratio = fragments.stats()
+
+        # tracemalloc slows everything down, so memory is measured in a separate request
+        tracemalloc.start()
+        try:
+            self.request(scenario, options['cold_cache'])
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'queries': max(queries),
+            'sql_ms': round(statistics.fmean(sql_times), 3),
+            'peak_memory_kb': round(peak / 1024, 1),
+            'fragment_hit_ratio': round(fragment_hit_ratio, 3) if fragment_hit_ratio is not None else None,
+        }
+
+    def compare(self, results, baseline, options):
+        """Print the change against the baseline and fail on regressions"""
+        regressions = []
+        for name, result in results['scenarios'].items():
+            before = baseline.get('scenarios', {}).get(name)
+            if before is None:
+                self.stdout.write(f'{name:<18} not in baseline')
+                continue
+
+            changes = []
+            for metric in ('p50_ms', 'p95_ms'):
+                change = (result[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0
+                changes.append(f'{metric[:3]} {change:+.1f}%')
+                if change > options['threshold']:
+                    regressions.append(f'{name} {metric} {before[metric]:.2f} -> {result[metric]:.2f} ({change:+.1f}%)')
+            query_change = result['queries'] - before['queries']
+            changes.append(f'queries {query_change:+d}')
+            if query_change > options['query_threshold']:
+                regressions.append(f'{name} queries {before["queries"]} -> {result["queries"]}')
+            self.stdout.write(f'{name:<18} ' + '  '.join(changes))
+
+        if regressions:
+            raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
@@ -0,0 +1,156 @@
+import asyncio
+import importlib
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import clear_url_caches, reverse
+
+from quizzes import async_views
+from quizzes.loadtest import percentile
+from quizzes.models import QuizAttempt
+from quizzes.sample_data import SampleDataGenerator
+
+
+PAGES = list(async_views.ASYNC_URL_NAMES)
+
+
+@contextmanager
+def serving(url_names):
+    """
+    Serve the async versions of the named URLs for a while, to compare them with the sync ones.
+
+    QUIZ_ASYNC_VIEWS is only read when the URLconfs are imported, so they
+    are reloaded on the way in and out. For benchmarks and tests only.
+    """
+    from quizzes import urls
+
+    def reload():
+        # The root URLconf holds resolvers of the old patterns too
+        importlib.reload(urls)
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    try:
+        with override_settings(QUIZ_ASYNC_VIEWS=list(url_names)):
+            reload()
+            yield
+    finally:
+        reload()
+
+
+async def asgi_get(application, path, headers):
+    """GET path from the ASGI application in process, returning (seconds, status)"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': headers, 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # The client stays connected; Django stops listening once the response is sent
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    start = time.perf_counter()
+    await application(scope, receive, send)
+    return time.perf_counter() - start, status
+
+
+async def run_load(application, path, headers, concurrency, requests):
+    """requests GETs of path, concurrency at a time; returns (latencies in ms, seconds, errors)"""
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            elapsed, status = await asgi_get(application, path, headers)
+            latencies.append(elapsed * 1000)
+            errors += status is None or status >= 400
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start, errors
+
+
+class Command(BaseCommand):
+    help = 'Compare the sync and async versions of the read-heavy pages under concurrent ASGI load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', action='append', choices=PAGES, help='Page to run (repeatable, default: all)')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page and version')
+        parser.add_argument('--seed', type=int, default=0, help='load_sample_data dataset whose student is logged in')
+        parser.add_argument('--output', help='Also write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        generator = SampleDataGenerator(seed=options['seed'])
+        attempt = QuizAttempt.objects.filter(
+            user__username__startswith=f'{generator.prefix}_student', status='completed',
+        ).select_related('user', 'quiz').order_by('pk').first()
+        if attempt is None:
+            raise CommandError(
+                f'The dataset of seed {options["seed"]} has no completed attempts, '
+                f'generate it with load_sample_data --seed {options["seed"]}.'
+            )
+
+        client = Client()
+        client.force_login(attempt.user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        headers = [(b'host', b'testserver'), (b'cookie', cookie.encode())]
+        paths = {
+            'home': reverse('quizzes:home'),
+            'quiz_list': reverse('quizzes:quiz_list'),
+            'quiz_detail': reverse('quizzes:quiz_detail', args=[attempt.quiz_id]),
+            'leaderboard': reverse('quizzes:leaderboard'),
+            'quiz_leaderboard': reverse('quizzes:quiz_leaderboard', args=[attempt.quiz_id]),
+            'quiz_result': reverse('quizzes:quiz_result', args=[attempt.quiz_id, attempt.pk]),
+        }
+
+        application = get_asgi_application()
+        results = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name in options['page'] or PAGES:
+                results[name] = {}
+                for version, url_names in (('sync', []), ('async', [name])):
+                    with serving(url_names):
+                        # Untimed round so caches are warm for both versions
+                        asyncio.run(run_load(application, paths[name], headers, options['concurrency'], options['concurrency']))
+                        latencies, seconds, errors = asyncio.run(
+                            run_load(application, paths[name], headers, options['concurrency'], options['requests'])
+                        )
+                    if errors:
+                        raise CommandError(f'{errors} {version} requests to {paths[name]} failed.')
+                    results[name][version] = {
+                        'p50_ms': round(percentile(latencies, 50), 3),
+                        'p95_ms': round(percentile(latencies, 95), 3),
+                        'requests_per_second': round(len(latencies) / seconds, 1),
+                    }
+                sync, async_ = results[name]['sync'], results[name]['async']
+                self.stdout.write(
+                    f'{name:<18} sync p50 {sync["p50_ms"]:8.2f}ms p95 {sync["p95_ms"]:8.2f}ms '
+                    f'{sync["requests_per_second"]:7.1f}/s   async p50 {async_["p50_ms"]:8.2f}ms '
+                    f'p95 {async_["p95_ms"]:8.2f}ms {async_["requests_per_second"]:7.1f}/s'
+                )
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps({
+                'concurrency': options['concurrency'],
+                'requests': options['requests'],
+                'pages': results,
+            }, indent=2))
+            self.stdout.write(f'Results written to {options["output"]}')
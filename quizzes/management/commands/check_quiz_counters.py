@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from quizzes.counters import find_drift, recount
+from quizzes.models import Quiz
+
+
+class Command(BaseCommand):
+    help = 'Check stored question counts and total points of quizzes, optionally repairing drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help='Limit the check to these quizzes')
+        parser.add_argument('--repair', action='store_true', help='Rewrite drifted counters')
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.all()
+        if options['quiz_ids']:
+            quizzes = quizzes.filter(pk__in=options['quiz_ids'])
+        
+        drifted = list(find_drift(quizzes))
+        for quiz in drifted:
+            self.stdout.write(
+                f'Quiz {quiz.pk} "{quiz.title}": '
+                f'questions {quiz.question_count} != {quiz.actual_question_count} or '
+                f'points {quiz.total_points} != {quiz.actual_total_points}'
+            )
+        
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All quiz counters are correct.'))
+            return
+        
+        if not options['repair']:
+            raise CommandError(f'{len(drifted)} quiz(zes) have drifted counters. Run with --repair to fix them.')
+        
+        repaired = recount(Quiz.objects.filter(pk__in=[quiz.pk for quiz in drifted]))
+        self.stdout.write(self.style.SUCCESS(f'Repaired counters of {repaired} quiz(zes).'))
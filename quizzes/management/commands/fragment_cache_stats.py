@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from quizzes import fragments
+
+
+class Command(BaseCommand):
+    help = 'Show the hit ratio of the quiz fragment cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after showing them')
+
+    def handle(self, *args, **options):
+        hits, misses, ratio = fragments.stats()
+        if ratio is None:
+            self.stdout.write('No fragments rendered since the last reset.')
+        else:
+            self.stdout.write(f'{hits} hits, {misses} misses, hit ratio {ratio:.1%}')
+        
+        if options['reset']:
+            fragments.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
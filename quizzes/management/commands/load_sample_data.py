@@ -1,13 +1,62 @@
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
+from quizzes.leaderboards import rebuild_leaderboards
 from quizzes.models import Category, Quiz, Question, Answer
+from quizzes.sample_data import PASSWORD, SampleDataGenerator
+from quizzes.stats import rebuild_stats
 from accounts.models import UserProfile
 
 
 class Command(BaseCommand):
-    help = 'Load sample data for testing'
+    help = 'Load sample data for testing, optionally with a large synthetic dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=0, help='Number of synthetic users to generate')
+        parser.add_argument('--quizzes', type=int, default=0, help='Number of synthetic quizzes to generate')
+        parser.add_argument('--attempts', type=int, default=0, help='Number of completed attempts to generate')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same dataset')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per bulk insert')
+        parser.add_argument(
+            '--hash-processes', type=int, default=0,
+            help='Hash every password separately in this many processes (default: share one hash)',
+        )
+        parser.add_argument('--skip-rollups', action='store_true', help='Do not rebuild leaderboards and statistics')
+
+    def handle(self, *args, **options):
+        self.load_demo_data()
+        
+        if options['users'] or options['quizzes'] or options['attempts']:
+            self.generate(options)
+
+    def generate(self, options):
+        generator = SampleDataGenerator(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            hash_processes=options['hash_processes'],
+            log=self.stdout.write,
+        )
+        if options['users'] and generator.exists():
+            raise CommandError(f'Users of seed {options["seed"]} already exist, use another --seed.')
+        
+        started = time.monotonic()
+        generator.generate(options['users'], options['quizzes'], options['attempts'])
+        if options['attempts'] and not options['skip_rollups']:
+            self.stdout.write('Rebuilding leaderboards and statistics...')
+            rebuild_leaderboards()
+            rebuild_stats()
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'\nGenerated {options["users"]} users, {options["quizzes"]} quizzes and '
+            f'{options["attempts"]} attempts in {time.monotonic() - started:.1f}s'
+        ))
+        if options['users']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Generated accounts: username=s{options["seed"]}_student1 (or _teacher0), password={PASSWORD}'
+            ))
 
-    def handle(self, *args, **kwargs):
+    def load_demo_data(self):
         self.stdout.write('Creating sample data...')
         
         # Create users
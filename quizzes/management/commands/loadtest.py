@@ -0,0 +1,94 @@
+import asyncio
+import json
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from quizzes.loadtest import STEPS, LoadTest
+from quizzes.models import Quiz
+from quizzes.sample_data import PASSWORD, SampleDataGenerator
+
+
+class Command(BaseCommand):
+    help = 'Simulate students taking a quiz at once against a running server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the running server')
+        parser.add_argument('--students', type=int, default=100, help='Number of virtual students')
+        parser.add_argument('--quiz', type=int, help='Quiz to take (default: the first quiz of the dataset)')
+        parser.add_argument('--seed', type=int, default=0, help='load_sample_data dataset whose students log in')
+        parser.add_argument('--pattern', choices=['ramp', 'spike', 'deadline'], default='ramp', help='Arrival pattern')
+        parser.add_argument('--duration', type=float, default=60.0, help='Seconds over which students arrive')
+        parser.add_argument('--think', type=float, default=30.0, help='Mean seconds between opening and submitting the quiz')
+        parser.add_argument('--burst', type=float, default=10.0, help='With --pattern deadline, seconds before the deadline in which everyone submits')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds before a request counts as timed out')
+        parser.add_argument('--output', help='Also write the results as JSON to this file')
+        parser.add_argument('--fail-on-lock-errors', action='store_true', help='Exit with an error if any request hit a database lock')
+
+    def handle(self, *args, **options):
+        generator = SampleDataGenerator(seed=options['seed'])
+        usernames = list(
+            User.objects.filter(username__startswith=f'{generator.prefix}_student')
+            .order_by('pk').values_list('username', flat=True)[:options['students']]
+        )
+        if len(usernames) < options['students']:
+            raise CommandError(
+                f'The dataset of seed {options["seed"]} has {len(usernames)} students, '
+                f'generate more with load_sample_data --seed {options["seed"]} --users N.'
+            )
+
+        if options['quiz']:
+            quiz = Quiz.objects.filter(pk=options['quiz']).first()
+        else:
+            quiz = Quiz.objects.filter(title__startswith=f'Sample quiz {generator.prefix}-').order_by('pk').first()
+        if quiz is None:
+            raise CommandError('Quiz not found.')
+
+        load_test = LoadTest(
+            options['url'],
+            reverse('accounts:login'),
+            reverse('quizzes:quiz_take', args=[quiz.pk]),
+            [(username, PASSWORD) for username in usernames],
+            pattern=options['pattern'],
+            duration=options['duration'],
+            think=options['think'],
+            burst=options['burst'],
+            timeout=options['timeout'],
+            seed=options['seed'],
+        )
+        self.stdout.write(
+            f'{len(usernames)} students taking "{quiz.title}" at {options["url"]} ({options["pattern"]})...'
+        )
+        summary = asyncio.run(load_test.run()).summary()
+
+        self.stdout.write(
+            f'{summary["completed_sessions"]} of {summary["sessions"]} sessions completed in '
+            f'{summary["elapsed_s"]}s ({summary["sessions_per_s"]} sessions/s)'
+        )
+        for name in [*STEPS, 'total']:
+            step = summary['total'] if name == 'total' else summary['steps'][name]
+            if not step['requests']:
+                continue
+            latency = (
+                f'p50 {step["p50_ms"]:8.1f}ms  p95 {step["p95_ms"]:8.1f}ms  p99 {step["p99_ms"]:8.1f}ms'
+                if step['p50_ms'] is not None else 'no successful requests'
+            )
+            errors = ', '.join(f'{kind} {count}' for kind, count in sorted(step['errors'].items()))
+            self.stdout.write(
+                f'{name:<11} {step["requests"]:6d} requests  {step["throughput_rps"]:7.2f}/s  {latency}  '
+                f'errors {step["error_rate"]:.1%}' + (f' ({errors})' if errors else '')
+            )
+
+        lock_errors = summary['total']['errors'].get('db_lock', 0)
+        timeouts = summary['total']['errors'].get('timeout', 0)
+        if lock_errors or timeouts:
+            self.stdout.write(self.style.WARNING(f'{lock_errors} database lock errors, {timeouts} timeouts'))
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(summary, indent=2))
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        if lock_errors and options['fail_on_lock_errors']:
+            raise CommandError(f'{lock_errors} requests hit a database lock.')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from quizzes.leaderboards import rebuild_leaderboards
+from quizzes.models import Quiz
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized leaderboards from completed attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, help='Only rebuild the leaderboards of this quiz')
+
+    def handle(self, *args, **options):
+        quiz = None
+        if options['quiz']:
+            try:
+                quiz = Quiz.objects.get(pk=options['quiz'])
+            except Quiz.DoesNotExist:
+                raise CommandError(f'Quiz {options["quiz"]} does not exist.')
+        
+        written = rebuild_leaderboards(quiz)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} leaderboard entries.'))
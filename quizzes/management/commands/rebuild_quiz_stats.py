@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from quizzes.models import Quiz
+from quizzes.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-quiz statistics rollups from completed attempts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, help='Only rebuild the statistics of this quiz')
+
+    def handle(self, *args, **options):
+        quiz = None
+        if options['quiz']:
+            try:
+                quiz = Quiz.objects.get(pk=options['quiz'])
+            except Quiz.DoesNotExist:
+                raise CommandError(f'Quiz {options["quiz"]} does not exist.')
+        
+        written = rebuild_stats(quiz)
+        self.stdout.write(self.style.SUCCESS(f'Wrote statistics of {written} quizzes.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand, CommandError
+from quizzes import search
+from quizzes.models import Quiz
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of the quiz catalog'
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError('The database has no full-text search index, searches use LIKE queries.')
+        
+        indexed = search.rebuild(Quiz.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} quizzes.'))
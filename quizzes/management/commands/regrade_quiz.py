@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from quizzes.models import Quiz
+from quizzes.regrade import CHUNK_SIZE, regrade_quiz
+
+
+class Command(BaseCommand):
+    help = 'Regrade all completed attempts of a quiz against its current correct answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int)
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows per transaction')
+        parser.add_argument('--restart', action='store_true', help='Ignore an interrupted run and start over')
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(pk=options['quiz_id'])
+        except Quiz.DoesNotExist:
+            raise CommandError(f'Quiz {options["quiz_id"]} does not exist.')
+        
+        def progress(run):
+            if run.phase == 'answers':
+                self.stdout.write(f'Answers: {run.answers_processed} checked, {run.answers_changed} changed')
+            else:
+                self.stdout.write(f'Attempts: {run.attempts_processed} rescored')
+        
+        self.stdout.write(f'Regrading "{quiz.title}"...')
+        run = regrade_quiz(
+            quiz, chunk_size=options['chunk_size'], restart=options['restart'], progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {run.answers_changed} of {run.answers_processed} answers changed, '
+            f'{run.attempts_processed} attempts rescored.'
+        ))
@@ -0,0 +1,61 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker_process(index, burst, sleep):
+    """Entry point of a forked or spawned worker process"""
+    import django
+    django.setup()
+    
+    from quizzes.jobs import work, worker_name
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    work(
+        worker_id=f'{worker_name()}/{index}',
+        burst=burst,
+        sleep=sleep,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Process background jobs (statistics, leaderboards, text answer grading)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        
+        if processes == 1:
+            from quizzes.jobs import work
+            self.stdout.write('Worker started, press Ctrl+C to stop.')
+            try:
+                processed = work(burst=options['burst'], sleep=options['sleep'])
+            except KeyboardInterrupt:
+                return
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} job(s).'))
+            return
+        
+        # Children must not inherit the parent's database connections
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=_worker_process, args=(index, options['burst'], options['sleep']))
+            for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Started {processes} worker processes, press Ctrl+C to stop.')
+        
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
@@ -0,0 +1,47 @@
+import os
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from quiz_platform.replicas import replicas
+
+
+def copy_database(source, target):
+    """Snapshot the SQLite database source into target, replacing it in one step"""
+    partial = f'{target}.partial'
+    src, dst = sqlite3.connect(source), sqlite3.connect(partial)
+    try:
+        src.backup(dst)
+        # Readers of the copy must not expect a WAL file next to it
+        dst.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        src.close()
+        dst.close()
+    os.replace(partial, target)
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the SQLite read replicas, for trying replicas locally'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, help='Keep copying every this many seconds')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        targets = [
+            connections[alias].settings_dict['NAME']
+            for alias in replicas() if connections[alias].vendor == 'sqlite'
+        ]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3' or not targets:
+            raise CommandError('Needs a SQLite primary and SQLite aliases in QUIZ_READ_REPLICAS.')
+
+        while True:
+            started = time.perf_counter()
+            for target in targets:
+                copy_database(primary['NAME'], target)
+            self.stdout.write(f'Copied to {len(targets)} replicas in {(time.perf_counter() - started) * 1000:.0f}ms')
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='content_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:01
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Quiz = apps.get_model('quizzes', 'Quiz')
+    Question = apps.get_model('quizzes', 'Question')
+    questions = Question.objects.filter(quiz=OuterRef('pk')).order_by().values('quiz')
+    Quiz.objects.update(
+        question_count=Coalesce(Subquery(questions.annotate(total=Count('id')).values('total')), Value(0)),
+        total_points=Coalesce(Subquery(questions.annotate(total=Sum('points')).values('total')), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0002_quiz_content_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='question_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='total_points',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_quiz_question_count_total_points'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='autosave_seq',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='last_saved_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
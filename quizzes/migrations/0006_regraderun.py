@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegradeRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_version', models.PositiveIntegerField(help_text='Quiz content version regraded against')),
+                ('phase', models.CharField(choices=[('answers', 'Regrading answers'), ('attempts', 'Recalculating scores'), ('done', 'Done')], default='answers', max_length=10)),
+                ('cursor', models.BigIntegerField(default=0, help_text='Last primary key processed in the current phase')),
+                ('answers_processed', models.IntegerField(default=0)),
+                ('answers_changed', models.IntegerField(default=0)),
+                ('attempts_processed', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='regrade_runs', to='quizzes.quiz')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def enqueue_rebuilds(apps, schema_editor):
+    # Existing attempts are not counted yet; a worker builds the leaderboards of
+    # every quiz that has some, instead of leaving them empty until someone
+    # runs the rebuild command
+    alias = schema_editor.connection.alias
+    Job = apps.get_model('quizzes', 'Job')
+    quiz_ids = (
+        apps.get_model('quizzes', 'QuizAttempt').objects.using(alias)
+        .filter(status='completed').values_list('quiz_id', flat=True).distinct().order_by('quiz_id')
+    )
+    Job.objects.using(alias).bulk_create(
+        [Job(task='rebuild_quiz_leaderboards', payload={'quiz_id': quiz_id}) for quiz_id in quiz_ids], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_regraderun'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='counted_in_leaderboards',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('all', 'All Time'), ('month', 'This Month'), ('week', 'This Week')], default='all', max_length=5)),
+                ('period_start', models.DateField()),
+                ('attempts', models.IntegerField(default=0)),
+                ('quizzes_completed', models.IntegerField(default=0)),
+                ('score_sum', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('avg_score', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('best_score', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('best_at', models.DateTimeField(blank=True, help_text='When the best score was first reached', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quiz', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='quizzes.quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Leaderboard entries',
+                'indexes': [models.Index(fields=['quiz', 'window', 'period_start', '-best_score', 'best_at'], name='quizzes_lb_quiz_rank_idx'), models.Index(fields=['quiz', 'window', 'period_start', '-avg_score', '-quizzes_completed'], name='quizzes_lb_overall_rank_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('quiz__isnull', False)), fields=('quiz', 'window', 'period_start', 'user'), name='unique_quiz_leaderboard_entry'), models.UniqueConstraint(condition=models.Q(('quiz__isnull', True)), fields=('window', 'period_start', 'user'), name='unique_overall_leaderboard_entry')],
+            },
+        ),
+        migrations.RunPython(enqueue_rebuilds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:10
+
+import django.db.models.deletion
+import quizzes.models
+from django.db import migrations, models
+
+
+def enqueue_rebuilds(apps, schema_editor):
+    # Existing attempts are not counted yet; a worker builds the statistics of
+    # every quiz that has some, instead of leaving them empty until someone
+    # runs the rebuild command
+    alias = schema_editor.connection.alias
+    Job = apps.get_model('quizzes', 'Job')
+    quiz_ids = (
+        apps.get_model('quizzes', 'QuizAttempt').objects.using(alias)
+        .filter(status='completed').values_list('quiz_id', flat=True).distinct().order_by('quiz_id')
+    )
+    Job.objects.using(alias).bulk_create(
+        [Job(task='rebuild_quiz_stats', payload={'quiz_id': quiz_id}) for quiz_id in quiz_ids], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0007_leaderboards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='counted_in_stats',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='QuizStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.IntegerField(default=0)),
+                ('pass_count', models.IntegerField(default=0)),
+                ('score_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('score_sq_sum', models.DecimalField(decimal_places=4, default=0, max_digits=20)),
+                ('duration_sum', models.BigIntegerField(default=0, help_text='Total time taken in seconds')),
+                ('score_histogram', models.JSONField(default=quizzes.models.empty_score_histogram)),
+                ('duration_histogram', models.JSONField(default=quizzes.models.empty_duration_histogram)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='quizzes.quiz')),
+            ],
+            options={
+                'verbose_name_plural': 'Quiz statistics',
+            },
+        ),
+        migrations.RunPython(enqueue_rebuilds, migrations.RunPython.noop),
+    ]
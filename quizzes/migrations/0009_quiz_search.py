@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:20
+
+from django.db import migrations
+
+
+# The index as of this migration; quizzes.search reads and writes it
+TABLE = 'quizzes_quiz_search'
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        # facets holds the filter values as tokens, so filters are
+        # part of the MATCH expression instead of a scan of the hits.
+        # Prefix indexes keep short prefixes from expanding to many terms.
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {TABLE} USING fts5(title, description, facets, prefix='2 3')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {TABLE} (rowid, title, description, facets) '
+            "SELECT id, title, description, 'c' || COALESCE(category_id, 0) || ' d' || difficulty "
+            "|| CASE WHEN is_active AND is_public THEN '' ELSE ' hidden' END FROM quizzes_quiz"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE TABLE {TABLE} ('
+            'quiz_id integer PRIMARY KEY REFERENCES quizzes_quiz (id) ON DELETE CASCADE, '
+            'document tsvector NOT NULL, category_id integer, difficulty varchar(10) NOT NULL, '
+            'visible boolean NOT NULL)'
+        )
+        schema_editor.execute(f'CREATE INDEX {TABLE}_document ON {TABLE} USING gin (document)')
+        schema_editor.execute(
+            f'INSERT INTO {TABLE} (quiz_id, document, category_id, difficulty, visible) '
+            "SELECT id, setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', description), 'B'), "
+            'category_id, difficulty, is_active AND is_public FROM quizzes_quiz'
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0008_quizstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
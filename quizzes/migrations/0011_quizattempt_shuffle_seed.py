@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:48
+
+import secrets
+
+import quizzes.models
+from django.db import migrations, models
+
+
+def populate_seeds(apps, schema_editor):
+    # A default would give every existing attempt the same seed, and so the same question order
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    attempts = QuizAttempt.objects.using(schema_editor.connection.alias).filter(shuffle_seed__isnull=True)
+    batch = []
+    for attempt in attempts.only('pk').iterator(chunk_size=1000):
+        attempt.shuffle_seed = secrets.randbelow(2 ** 31)
+        batch.append(attempt)
+        if len(batch) == 1000:
+            QuizAttempt.objects.using(schema_editor.connection.alias).bulk_update(batch, ['shuffle_seed'])
+            batch = []
+    QuizAttempt.objects.using(schema_editor.connection.alias).bulk_update(batch, ['shuffle_seed'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0010_category_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='shuffle_seed',
+            field=models.PositiveIntegerField(null=True, editable=False),
+        ),
+        migrations.RunPython(populate_seeds, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='quizattempt',
+            name='shuffle_seed',
+            field=models.PositiveIntegerField(default=quizzes.models.new_shuffle_seed, editable=False),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:56
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0011_quizattempt_shuffle_seed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='questions_per_page',
+            field=models.PositiveIntegerField(blank=True, help_text='Take the quiz one page of questions at a time, all on one page when empty', null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='page_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
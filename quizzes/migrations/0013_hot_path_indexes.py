@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0012_paged_take'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_public', True)), fields=['-created_at', '-id'], name='quizzes_quiz_listed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_public', True)), fields=['category', '-created_at', '-id'], name='quizzes_quiz_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['creator', '-created_at', '-id'], name='quizzes_quiz_creator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', 'quiz', 'status', '-start_time'], name='quizzes_attempt_user_quiz_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', '-start_time', '-id'], name='quizzes_attempt_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('status', 'completed')), fields=['quiz', '-end_time', '-id'], name='quizzes_attempt_completed_idx'),
+        ),
+    ]
@@ -1,3 +1,7 @@
+import math
+import secrets
+from decimal import Decimal
+
 from django.contrib.auth.models import User
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -11,6 +15,7 @@ class Category(models.Model):
     icon = models.CharField(max_length=50, blank=True, help_text="Icon class name")
     color = models.CharField(max_length=7, default='#007bff', help_text="Hex color code")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
@@ -46,6 +51,10 @@ class Quiz(models.Model):
     show_correct_answers = models.BooleanField(default=True, help_text="Show correct answers after completion")
     randomize_questions = models.BooleanField(default=False)
     randomize_answers = models.BooleanField(default=False)
+    questions_per_page = models.PositiveIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1)],
+        help_text="Take the quiz one page of questions at a time, all on one page when empty"
+    )
     
     # Dates
     start_date = models.DateTimeField(null=True, blank=True)
@@ -53,13 +62,35 @@ class Quiz(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Bumped whenever a question or answer of the quiz changes
+    content_version = models.PositiveIntegerField(default=1, editable=False)
+    
+    # Denormalized from questions, kept up to date by quizzes.signals
+    question_count = models.IntegerField(default=0, editable=False)
+    total_points = models.IntegerField(default=0, editable=False)
+    
+    # Maintained with F() updates, never written back from a possibly stale instance
+    COUNTER_FIELDS = ('content_version', 'question_count', 'total_points')
+    
     def __str__(self):
         return self.title
     
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, *args, **kwargs):
+        """
+        Leave COUNTER_FIELDS out of the UPDATE of a plain save().
+
+        Callers passing update_fields write exactly those fields. When the
+        row no longer exists, save() still inserts it, counters included.
+        """
+        if update_fields is None:
+            values = [value for value in values if value[0].name not in self.COUNTER_FIELDS]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, *args, **kwargs)
+    
     @property
-    def total_points(self):
-        """Calculate total points for the quiz"""
-        return sum(q.points for q in self.questions.all())
+    def answer_key(self):
+        """Compiled answer key for the current content version"""
+        from .answer_keys import get_answer_key
+        return get_answer_key(self)
     
     @property
     def is_available(self):
@@ -76,6 +107,21 @@ class Quiz(models.Model):
     class Meta:
         verbose_name_plural = 'Quizzes'
         ordering = ['-created_at']
+        indexes = [
+            # Home page and catalog, newest first, also within a category
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_active=True, is_public=True),
+                name='quizzes_quiz_listed_idx',
+            ),
+            models.Index(
+                fields=['category', '-created_at', '-id'],
+                condition=models.Q(is_active=True, is_public=True),
+                name='quizzes_quiz_category_idx',
+            ),
+            # Teacher dashboard
+            models.Index(fields=['creator', '-created_at', '-id'], name='quizzes_quiz_creator_idx'),
+        ]
 
 
 class Question(models.Model):
@@ -100,6 +146,13 @@ class Question(models.Model):
     def __str__(self):
         return f"{self.quiz.title} - Q{self.order}: {self.text[:50]}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what is stored so signals can apply counter deltas
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
     class Meta:
         ordering = ['quiz', 'order']
         unique_together = ['quiz', 'order']
@@ -119,6 +172,10 @@ class Answer(models.Model):
         ordering = ['question', 'order']
 
 
+def new_shuffle_seed():
+    return secrets.randbelow(2 ** 31)
+
+
 class QuizAttempt(models.Model):
     """Track user attempts at quizzes"""
     STATUS_CHOICES = [
@@ -137,6 +194,20 @@ class QuizAttempt(models.Model):
     points_earned = models.IntegerField(default=0)
     total_points = models.IntegerField(default=0)
     
+    # Fixes the order of randomized questions and answers, see quizzes.bundles
+    shuffle_seed = models.PositiveIntegerField(default=new_shuffle_seed, editable=False)
+    
+    # Questions per page in paged take mode, all on one page when empty, see quizzes.bundles
+    page_size = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    
+    # Autosave bookkeeping, see quizzes.autosave
+    autosave_seq = models.PositiveBigIntegerField(default=0, editable=False)
+    last_saved_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
+    # Set once the attempt has been added to the rollups, makes the update jobs idempotent
+    counted_in_leaderboards = models.BooleanField(default=False, editable=False)
+    counted_in_stats = models.BooleanField(default=False, editable=False)
+    
     def __str__(self):
         return f"{self.user.username} - {self.quiz.title} ({self.status})"
     
@@ -156,19 +227,29 @@ class QuizAttempt(models.Model):
     
     def calculate_score(self):
         """Calculate and save the score for this attempt"""
-        correct_answers = self.user_answers.filter(is_correct=True)
-        self.points_earned = sum(ua.points_earned for ua in self.user_answers.all())
+        from .grading import calculate_percentage
+
+        self.points_earned = self.user_answers.aggregate(
+            total=models.Sum('points_earned')
+        )['total'] or 0
         self.total_points = self.quiz.total_points
-        
-        if self.total_points > 0:
-            self.score = (self.points_earned / self.total_points) * 100
-        else:
-            self.score = 0
-        
+        self.score = calculate_percentage(self.points_earned, self.total_points)
         self.save()
     
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            # Attempts of a user at a quiz, on the detail and take pages
+            models.Index(fields=['user', 'quiz', 'status', '-start_time'], name='quizzes_attempt_user_quiz_idx'),
+            # Dashboard and history, newest first
+            models.Index(fields=['user', '-start_time', '-id'], name='quizzes_attempt_user_time_idx'),
+            # Reports and rollup rebuilds only read completed attempts
+            models.Index(
+                fields=['quiz', '-end_time', '-id'],
+                condition=models.Q(status='completed'),
+                name='quizzes_attempt_completed_idx',
+            ),
+        ]
 
 
 class UserAnswer(models.Model):
@@ -184,35 +265,258 @@ class UserAnswer(models.Model):
     def __str__(self):
         return f"{self.attempt.user.username} - {self.question.text[:30]}"
     
-    def check_answer(self):
+    def check_answer(self, answer_key=None):
         """Check if the answer is correct and calculate points"""
-        if self.question.question_type == 'text':
-            # Text answers need manual grading
-            self.is_correct = False
-            self.points_earned = 0
-        elif self.question.question_type == 'truefalse' or self.question.question_type == 'single':
-            # Single choice questions
-            selected = self.selected_answers.first()
-            if selected and selected.is_correct:
-                self.is_correct = True
-                self.points_earned = self.question.points
-            else:
-                self.is_correct = False
-                self.points_earned = 0
-        elif self.question.question_type == 'multiple':
-            # Multiple choice questions - all correct answers must be selected
-            correct_answers = set(self.question.answers.filter(is_correct=True))
-            selected_answers = set(self.selected_answers.all())
-            
-            if correct_answers == selected_answers:
-                self.is_correct = True
-                self.points_earned = self.question.points
-            else:
-                self.is_correct = False
-                self.points_earned = 0
-        
+        from .grading import grade
+
+        if answer_key is None:
+            answer_key = self.attempt.quiz.answer_key
+        selected_ids = self.selected_answers.values_list('id', flat=True)
+        self.is_correct, self.points_earned = grade(answer_key[self.question_id], list(selected_ids))
         self.save()
     
     class Meta:
         ordering = ['answered_at']
         unique_together = ['attempt', 'question']
+
+
+class Job(models.Model):
+    """Background task processed by the run_worker command"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3, validators=[MinValueValidator(1)])
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    
+    run_at = models.DateTimeField(default=timezone.now, help_text="Not picked up before this time")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+    
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='quizzes_job_dequeue_idx'),
+        ]
+
+
+class RegradeRun(models.Model):
+    """Progress of a bulk regrade, so an interrupted regrade can resume"""
+    PHASE_CHOICES = [
+        ('answers', 'Regrading answers'),
+        ('attempts', 'Recalculating scores'),
+        ('done', 'Done'),
+    ]
+    
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='regrade_runs')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    content_version = models.PositiveIntegerField(help_text="Quiz content version regraded against")
+    phase = models.CharField(max_length=10, choices=PHASE_CHOICES, default='answers')
+    cursor = models.BigIntegerField(default=0, help_text="Last primary key processed in the current phase")
+    
+    answers_processed = models.IntegerField(default=0)
+    answers_changed = models.IntegerField(default=0)
+    attempts_processed = models.IntegerField(default=0)
+    
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Regrade of {self.quiz.title} ({self.get_phase_display()})"
+    
+    class Meta:
+        ordering = ['-started_at']
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Materialized leaderboard row of one user.
+    
+    Rows without a quiz make up the overall leaderboard. Each row belongs
+    to a time window; weekly and monthly rows are keyed by the first day
+    of their period, all-time rows by ALL_TIME_START.
+    """
+    WINDOW_CHOICES = [
+        ('all', 'All Time'),
+        ('month', 'This Month'),
+        ('week', 'This Week'),
+    ]
+    
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, null=True, blank=True, related_name='leaderboard_entries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    window = models.CharField(max_length=5, choices=WINDOW_CHOICES, default='all')
+    period_start = models.DateField()
+    
+    attempts = models.IntegerField(default=0)
+    quizzes_completed = models.IntegerField(default=0)
+    score_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    avg_score = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    best_score = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    best_at = models.DateTimeField(null=True, blank=True, help_text="When the best score was first reached")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        scope = self.quiz.title if self.quiz_id else 'Overall'
+        return f"{scope} ({self.window} from {self.period_start}) - {self.user.username}"
+    
+    class Meta:
+        verbose_name_plural = 'Leaderboard entries'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['quiz', 'window', 'period_start', 'user'],
+                condition=models.Q(quiz__isnull=False),
+                name='unique_quiz_leaderboard_entry',
+            ),
+            models.UniqueConstraint(
+                fields=['window', 'period_start', 'user'],
+                condition=models.Q(quiz__isnull=True),
+                name='unique_overall_leaderboard_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['quiz', 'window', 'period_start', '-best_score', 'best_at'],
+                name='quizzes_lb_quiz_rank_idx',
+            ),
+            models.Index(
+                fields=['quiz', 'window', 'period_start', '-avg_score', '-quizzes_completed'],
+                name='quizzes_lb_overall_rank_idx',
+            ),
+        ]
+
+
+def empty_score_histogram():
+    return [0] * QuizStats.SCORE_BUCKETS
+
+
+def empty_duration_histogram():
+    return [0] * (len(QuizStats.DURATION_BUCKETS) + 1)
+
+
+class QuizStats(models.Model):
+    """
+    Rollup of the completed attempts of a quiz.
+    
+    Updated once per completed attempt by the update_quiz_stats task and
+    recomputed by the rebuild_quiz_stats command, so reports never have
+    to scan QuizAttempt.
+    """
+    # Scores fall into SCORE_BUCKETS buckets of equal width, 100% goes into the last one
+    SCORE_BUCKETS = 20
+    # Upper bounds in seconds of the time taken buckets, the last bucket is open ended
+    DURATION_BUCKETS = [60, 120, 300, 600, 900, 1800, 3600]
+    
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, related_name='stats')
+    attempt_count = models.IntegerField(default=0)
+    pass_count = models.IntegerField(default=0)
+    score_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    score_sq_sum = models.DecimalField(max_digits=20, decimal_places=4, default=0)
+    duration_sum = models.BigIntegerField(default=0, help_text="Total time taken in seconds")
+    score_histogram = models.JSONField(default=empty_score_histogram)
+    duration_histogram = models.JSONField(default=empty_duration_histogram)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Statistics of {self.quiz.title}"
+    
+    @classmethod
+    def score_bucket(cls, score):
+        """Histogram bucket of a score"""
+        width = Decimal(100) / cls.SCORE_BUCKETS
+        return max(0, min(int(Decimal(score) // width), cls.SCORE_BUCKETS - 1))
+    
+    @classmethod
+    def duration_bucket(cls, seconds):
+        """Histogram bucket of a time taken in seconds"""
+        for index, upper in enumerate(cls.DURATION_BUCKETS):
+            if seconds < upper:
+                return index
+        return len(cls.DURATION_BUCKETS)
+    
+    def add_attempt(self, score, seconds, passed):
+        """Add one completed attempt to the rollup"""
+        score = Decimal(score)
+        self.attempt_count += 1
+        self.pass_count += 1 if passed else 0
+        self.score_sum += score
+        self.score_sq_sum += score * score
+        self.duration_sum += seconds
+        self.score_histogram[self.score_bucket(score)] += 1
+        self.duration_histogram[self.duration_bucket(seconds)] += 1
+    
+    @property
+    def mean_score(self):
+        if not self.attempt_count:
+            return None
+        return round(self.score_sum / self.attempt_count, 2)
+    
+    @property
+    def score_stddev(self):
+        """Population standard deviation of the scores"""
+        if not self.attempt_count:
+            return None
+        mean = self.score_sum / self.attempt_count
+        variance = self.score_sq_sum / self.attempt_count - mean * mean
+        return round(Decimal(math.sqrt(max(variance, 0))), 2)
+    
+    @property
+    def pass_rate(self):
+        if not self.attempt_count:
+            return None
+        return round(Decimal(self.pass_count) * 100 / self.attempt_count, 1)
+    
+    @property
+    def mean_duration(self):
+        """Average time taken in seconds"""
+        if not self.attempt_count:
+            return None
+        return self.duration_sum // self.attempt_count
+    
+    def percentile_rank(self, score):
+        """
+        Percentage of attempts scoring below score, read from the histogram.
+        
+        Scores are assumed to be spread evenly within their bucket.
+        """
+        if not self.attempt_count or score is None:
+            return None
+        bucket = self.score_bucket(score)
+        width = Decimal(100) / self.SCORE_BUCKETS
+        within = min((Decimal(score) - bucket * width) / width, Decimal(1))
+        below = sum(self.score_histogram[:bucket]) + self.score_histogram[bucket] * within
+        return round(below * 100 / self.attempt_count, 1)
+    
+    def score_distribution(self):
+        """(lower bound, upper bound, count, percentage) of each score bucket"""
+        width = 100 // self.SCORE_BUCKETS
+        return [
+            (index * width, (index + 1) * width, count, count * 100 / self.attempt_count if self.attempt_count else 0)
+            for index, count in enumerate(self.score_histogram)
+        ]
+    
+    def duration_distribution(self):
+        """(label, count, percentage) of each time taken bucket"""
+        bounds = [0] + self.DURATION_BUCKETS
+        labels = [f'{lower // 60}-{upper // 60} min' for lower, upper in zip(bounds, bounds[1:])]
+        labels.append(f'{bounds[-1] // 60}+ min')
+        return [
+            (label, count, count * 100 / self.attempt_count if self.attempt_count else 0)
+            for label, count in zip(labels, self.duration_histogram)
+        ]
+    
+    class Meta:
+        verbose_name_plural = 'Quiz statistics'
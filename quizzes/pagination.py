@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+from django.core import signing
+from django.db.models import Q
+
+
+# Rows per page of the paginated lists
+PAGE_SIZE = 24
+
+CURSOR_PARAM = 'cursor'
+
+SALT = 'quizzes.pagination'
+
+
+@dataclass
+class Page:
+    """One page of a keyset paginated list with query strings of its neighbours"""
+    items: list
+    next_query: str = ''
+    previous_query: str = ''
+
+    @property
+    def has_other_pages(self):
+        return bool(self.next_query or self.previous_query)
+
+
+def _filters(params):
+    """Query parameters besides the cursor, which select the list being paginated"""
+    return sorted((key, value) for key, values in params.lists() if key != CURSOR_PARAM for value in values)
+
+
+def _query(filters, direction, position):
+    cursor = signing.dumps({'d': direction, 'p': position, 'f': filters}, salt=SALT, compress=True)
+    return urlencode([*filters, (CURSOR_PARAM, cursor)])
+
+
+def _load(params):
+    """(direction, position) of the request's cursor, None for the first page"""
+    try:
+        state = signing.loads(params.get(CURSOR_PARAM, ''), salt=SALT)
+    except signing.BadSignature:
+        return None
+    # A cursor only continues the list it was made for
+    if [tuple(item) for item in state['f']] != _filters(params):
+        return None
+    return state['d'], state['p']
+
+
+def _after(ordering, values, reverse=False):
+    """Rows past values in ordering, or before them with reverse"""
+    condition = Q()
+    for index, name in enumerate(ordering):
+        descending = name.startswith('-') != reverse
+        step = Q(**{f'{name.lstrip("-")}__{"lt" if descending else "gt"}': values[index]})
+        for previous, value in zip(ordering[:index], values):
+            step &= Q(**{previous.lstrip('-'): value})
+        condition |= step
+    return condition
+
+
+def _position(item, ordering):
+    values = [getattr(item, name.lstrip('-')) for name in ordering]
+    return [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+
+
+def _values(queryset, ordering, position):
+    model = queryset.model
+    return [model._meta.get_field(name.lstrip('-')).to_python(value) for name, value in zip(ordering, position)]
+
+
+def _window(request, queryset, ordering, per_page):
+    """(filters, direction, queryset of the rows to fetch) for the request's cursor"""
+    filters = _filters(request.GET)
+    state = _load(request.GET)
+    queryset = queryset.order_by(*ordering)
+    if state is None:
+        return filters, None, queryset[:per_page + 1]
+
+    direction, position = state
+    values = _values(queryset, ordering, position)
+    if direction == 'next':
+        return filters, direction, queryset.filter(_after(ordering, values))[:per_page + 1]
+    reverse_ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+    return filters, direction, (
+        queryset.filter(_after(ordering, values, reverse=True)).order_by(*reverse_ordering)[:per_page + 1]
+    )
+
+
+def _page(items, filters, direction, ordering, per_page):
+    """Page of the rows fetched for a _window()"""
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if direction == 'previous':
+        items = items[::-1]
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, direction == 'next'
+
+    return Page(
+        items,
+        next_query=_query(filters, 'next', _position(items[-1], ordering)) if has_next and items else '',
+        previous_query=_query(filters, 'previous', _position(items[0], ordering)) if has_previous and items else '',
+    )
+
+
+def paginate(request, queryset, ordering, per_page=PAGE_SIZE):
+    """
+    Keyset page of a queryset for the request's cursor.
+
+    ordering must be unique and its fields not nullable, e.g.
+    ('-created_at', '-id'). Pages continue from the first or last row of
+    the page before instead of an OFFSET, so every page costs the same.
+    The cursor holds the other query parameters, the list's filters, and
+    is ignored when they change.
+    """
+    filters, direction, rows = _window(request, queryset, ordering, per_page)
+    return _page(list(rows), filters, direction, ordering, per_page)
+
+
+async def apaginate(request, queryset, ordering, per_page=PAGE_SIZE):
+    """Async version of paginate()"""
+    filters, direction, rows = _window(request, queryset, ordering, per_page)
+    return _page([row async for row in rows], filters, direction, ordering, per_page)
+
+
+def ranked_offset(request, per_page=PAGE_SIZE):
+    """Position in a ranked list, such as search results, where the request's page starts"""
+    state = _load(request.GET)
+    if state is None:
+        return 0
+    direction, position = state
+    return position if direction == 'next' else max(0, position - per_page)
+
+
+def paginate_ranked(request, items, per_page=PAGE_SIZE):
+    """
+    Page of a ranked list such as search results.
+
+    items are the rows of the list from ranked_offset() on, one more than
+    per_page when the list goes on. Uses the same cursors as paginate()
+    holding a position in the list.
+    """
+    filters = _filters(request.GET)
+    start = ranked_offset(request, per_page)
+    end = start + per_page
+    return Page(
+        items[:per_page],
+        next_query=_query(filters, 'next', end) if len(items) > per_page else '',
+        previous_query=_query(filters, 'previous', start) if start > 0 else '',
+    )
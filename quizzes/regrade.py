@@ -0,0 +1,140 @@
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .grading import calculate_percentage, grade
+from .jobs import enqueue_quiz_followups, heartbeat
+from .models import QuizAttempt, RegradeRun, UserAnswer
+
+
+# Rows handled per chunk; each chunk is its own short transaction
+CHUNK_SIZE = 5000
+
+
+def get_run(quiz, restart=False, requested_by=None):
+    """Return the unfinished regrade run for the quiz's current content version, or start one"""
+    run = None
+    if not restart:
+        run = RegradeRun.objects.filter(
+            quiz=quiz, content_version=quiz.content_version
+        ).exclude(phase='done').first()
+    if run is None:
+        run = RegradeRun.objects.create(
+            quiz=quiz, content_version=quiz.content_version, requested_by=requested_by
+        )
+    return run
+
+
+def _regrade_answer_chunk(run, answer_key, chunk_size):
+    """Regrade the next chunk of choice answers; returns False when there is nothing left"""
+    rows = list(
+        UserAnswer.objects.filter(
+            attempt__quiz_id=run.quiz_id,
+            attempt__status='completed',
+            pk__gt=run.cursor,
+        ).order_by('pk').values_list('pk', 'question_id', 'is_correct', 'points_earned')[:chunk_size]
+    )
+    if not rows:
+        return False
+
+    first_pk, last_pk = rows[0][0], rows[-1][0]
+    selections = {}
+    SelectedAnswer = UserAnswer.selected_answers.through
+    for useranswer_id, answer_id in SelectedAnswer.objects.filter(
+        useranswer_id__gte=first_pk, useranswer_id__lte=last_pk,
+        useranswer__attempt__quiz_id=run.quiz_id,
+    ).values_list('useranswer_id', 'answer_id'):
+        selections.setdefault(useranswer_id, []).append(answer_id)
+
+    changed = []
+    for pk, question_id, is_correct, points_earned in rows:
+        if question_id not in answer_key:
+            continue
+        question_key = answer_key[question_id]
+        if question_key.question_type == 'text':
+            # Short answers are graded by hand or by the text grading task
+            continue
+        new_is_correct, new_points = grade(question_key, sorted(selections.get(pk, [])))
+        if (new_is_correct, new_points) != (is_correct, points_earned):
+            changed.append(UserAnswer(pk=pk, is_correct=new_is_correct, points_earned=new_points))
+
+    with transaction.atomic():
+        UserAnswer.objects.bulk_update(changed, ['is_correct', 'points_earned'])
+        run.cursor = last_pk
+        run.answers_processed += len(rows)
+        run.answers_changed += len(changed)
+        run.save(update_fields=['cursor', 'answers_processed', 'answers_changed', 'updated_at'])
+    return True
+
+
+def _rescore_attempt_chunk(run, answer_key, chunk_size):
+    """
+    Recompute points and score of the next chunk of attempts.
+
+    Scores go through calculate_percentage like on submission, so a
+    regrade that changes no answer leaves every score as it was.
+    """
+    attempts = list(
+        QuizAttempt.objects.filter(
+            quiz_id=run.quiz_id, status='completed', pk__gt=run.cursor,
+        ).order_by('pk').only('pk', 'points_earned', 'total_points', 'score')[:chunk_size]
+    )
+    if not attempts:
+        return False
+
+    earned = dict(
+        UserAnswer.objects.filter(
+            attempt_id__gte=attempts[0].pk, attempt_id__lte=attempts[-1].pk, attempt__quiz_id=run.quiz_id,
+        ).order_by().values('attempt').annotate(total=Sum('points_earned')).values_list('attempt', 'total')
+    )
+    total_points = answer_key.total_points
+    changed = []
+    for attempt in attempts:
+        points_earned = earned.get(attempt.pk) or 0
+        score = calculate_percentage(points_earned, total_points)
+        if (attempt.points_earned, attempt.total_points, attempt.score) != (points_earned, total_points, score):
+            attempt.points_earned, attempt.total_points, attempt.score = points_earned, total_points, score
+            changed.append(attempt)
+
+    with transaction.atomic():
+        QuizAttempt.objects.bulk_update(changed, ['points_earned', 'total_points', 'score'])
+        run.cursor = attempts[-1].pk
+        run.attempts_processed += len(attempts)
+        run.save(update_fields=['cursor', 'attempts_processed', 'updated_at'])
+    return True
+
+
+def regrade_quiz(quiz, chunk_size=CHUNK_SIZE, restart=False, requested_by=None, progress=None):
+    """
+    Regrade all completed attempts of a quiz against its current answer key.
+
+    Works through UserAnswer and then QuizAttempt primary keys in chunks.
+    Each chunk is one short transaction and records its position in a
+    RegradeRun, so an interrupted regrade picks up where it stopped.
+    ``progress`` is called with the run after every chunk. Run as a job,
+    every chunk also counts as a heartbeat, so a long regrade is not taken
+    for a dead one and started a second time.
+    """
+    answer_key = quiz.answer_key
+    run = get_run(quiz, restart=restart, requested_by=requested_by)
+
+    while run.phase == 'answers':
+        if not _regrade_answer_chunk(run, answer_key, chunk_size):
+            run.phase, run.cursor = 'attempts', 0
+            run.save(update_fields=['phase', 'cursor', 'updated_at'])
+        elif progress:
+            progress(run)
+        heartbeat()
+
+    while run.phase == 'attempts':
+        if not _rescore_attempt_chunk(run, answer_key, chunk_size):
+            with transaction.atomic():
+                run.phase = 'done'
+                run.finished_at = timezone.now()
+                run.save(update_fields=['phase', 'finished_at', 'updated_at'])
+                enqueue_quiz_followups(quiz)
+        elif progress:
+            progress(run)
+        heartbeat()
+
+    return run
@@ -0,0 +1,287 @@
+import math
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.bulk import bulk_create_users, hash_passwords
+from .counters import recount
+from . import search
+from .grading import calculate_percentage
+from .models import Answer, Category, Question, Quiz, QuizAttempt, UserAnswer
+
+
+# Password of every generated user
+PASSWORD = 'password123'
+
+# One teacher per this many generated users
+STUDENTS_PER_TEACHER = 50
+
+# Share of each question type among generated questions
+QUESTION_TYPES = [('single', 0.5), ('multiple', 0.25), ('truefalse', 0.15), ('text', 0.1)]
+
+# Attempts are spread over this many days before now
+HISTORY_DAYS = 120
+
+WORDS = (
+    'array function loop class module index query cache thread socket '
+    'pointer string integer float tuple method object lambda closure scope'
+).split()
+
+
+def _insert_rows(model, field_names, rows):
+    """Insert plain value tuples with one executemany()"""
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in field_names)
+    placeholders = ', '.join(['%s'] * len(field_names))
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})', rows)
+
+
+class SampleDataGenerator:
+    """
+    Deterministic synthetic dataset for capacity testing.
+
+    Everything is derived from one random seed. Students have an ability
+    and questions a difficulty, and answers are correct with the
+    probability of a logistic item response model, giving realistic score
+    distributions. Rows are written in batches of batch_size.
+    """
+
+    def __init__(self, seed=0, batch_size=2000, hash_processes=0, log=None):
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.hash_processes = hash_processes
+        self.log = log or (lambda message: None)
+        self.prefix = f's{seed}'
+
+    def exists(self):
+        return User.objects.filter(username__startswith=f'{self.prefix}_').exists()
+
+    def create_users(self, count):
+        """Create count users, one teacher per STUDENTS_PER_TEACHER; returns (teachers, students)"""
+        roles = ['teacher' if index % STUDENTS_PER_TEACHER == 0 else 'student' for index in range(count)]
+        if self.hash_processes:
+            passwords = hash_passwords([PASSWORD] * count, processes=self.hash_processes)
+        else:
+            # A single hash shared by everyone keeps generation fast
+            passwords = [make_password(PASSWORD)] * count
+
+        teachers, students = [], []
+        for start in range(0, count, self.batch_size):
+            batch = range(start, min(start + self.batch_size, count))
+            users = bulk_create_users(
+                [
+                    User(
+                        username=f'{self.prefix}_{roles[index]}{index}',
+                        email=f'{self.prefix}_{roles[index]}{index}@example.com',
+                        first_name=roles[index].title(),
+                        last_name=str(index),
+                        password=passwords[index],
+                    )
+                    for index in batch
+                ],
+                [roles[index] for index in batch],
+                batch_size=self.batch_size,
+            )
+            for user, index in zip(users, batch):
+                (teachers if roles[index] == 'teacher' else students).append(user.pk)
+            self.log(f'Created {start + len(batch)} of {count} users')
+        return teachers, students
+
+    def _question_type(self):
+        value = self.random.random()
+        for question_type, share in QUESTION_TYPES:
+            if value < share:
+                return question_type
+            value -= share
+        return QUESTION_TYPES[-1][0]
+
+    def _answers(self, question_type):
+        """(text, is_correct) of the answers of a new question"""
+        if question_type == 'truefalse':
+            truth = self.random.random() < 0.5
+            return [('True', truth), ('False', not truth)]
+        if question_type == 'text':
+            return [(self.random.choice(WORDS), True)]
+        words = self.random.sample(WORDS, 4)
+        correct = self.random.sample(range(4), 1 if question_type == 'single' else self.random.randint(2, 3))
+        return [(word, index in correct) for index, word in enumerate(words)]
+
+    @transaction.atomic
+    def create_quizzes(self, count, teachers):
+        """Create count quizzes of 5 to 30 questions; returns their primary keys"""
+        categories = list(Category.objects.values_list('pk', flat=True)) or [None]
+        quizzes = Quiz.objects.bulk_create(
+            [
+                Quiz(
+                    title=f'Sample quiz {self.prefix}-{index}',
+                    description='Generated by load_sample_data',
+                    category_id=self.random.choice(categories),
+                    creator_id=self.random.choice(teachers),
+                    difficulty=self.random.choice(['easy', 'medium', 'hard']),
+                    time_limit=self.random.choice([None, 10, 20, 30]),
+                    passing_score=self.random.choice([50, 60, 70, 80]),
+                    max_attempts=10,
+                )
+                for index in range(count)
+            ],
+            batch_size=self.batch_size,
+        )
+
+        questions = []
+        for quiz in quizzes:
+            for order in range(self.random.randint(5, 30)):
+                question_type = self._question_type()
+                question = Question(
+                    quiz=quiz,
+                    question_type=question_type,
+                    text=f'{" ".join(self.random.sample(WORDS, 5)).capitalize()}?',
+                    points=self.random.randint(1, 5),
+                    order=order,
+                )
+                question.answer_data = self._answers(question_type)
+                questions.append(question)
+        Question.objects.bulk_create(questions, batch_size=self.batch_size)
+        Answer.objects.bulk_create(
+            [
+                Answer(question=question, text=text, is_correct=is_correct, order=order)
+                for question in questions
+                for order, (text, is_correct) in enumerate(question.answer_data)
+            ],
+            batch_size=self.batch_size,
+        )
+        # bulk_create() bypasses the signals maintaining the denormalized counters
+        recount(Quiz.objects.filter(pk__in=[quiz.pk for quiz in quizzes]))
+        search.index_quizzes(Quiz.objects.filter(pk__in=[quiz.pk for quiz in quizzes]))
+        self.log(f'Created {count} quizzes with {len(questions)} questions')
+        return [quiz.pk for quiz in quizzes]
+
+    def _load_quiz(self, quiz_id):
+        """(question, difficulty, answers) of every question of a quiz"""
+        questions = Question.objects.filter(quiz_id=quiz_id).prefetch_related('answers')
+        return [(question, self.random.gauss(0, 1), list(question.answers.all())) for question in questions]
+
+    def _respond(self, question, answers, correct):
+        """(selected answer ids, text answer) of a correct or incorrect response"""
+        right = [answer for answer in answers if answer.is_correct]
+        wrong = [answer for answer in answers if not answer.is_correct]
+        if question.question_type == 'text':
+            return [], right[0].text if correct else self.random.choice([word for word in WORDS if word != right[0].text])
+        if correct:
+            return [answer.pk for answer in right], ''
+        if question.question_type == 'multiple':
+            # Typical multi-select mistakes: a correct option missed or a wrong one added
+            selected = self.random.sample(right, len(right) - 1)
+            if wrong and self.random.random() < 0.6:
+                selected.append(self.random.choice(wrong))
+            return [answer.pk for answer in selected], ''
+        return [self.random.choice(wrong).pk], ''
+
+    def create_attempts(self, count, students, quiz_ids):
+        """Create count completed, graded attempts by random students on random quizzes"""
+        abilities = {student: self.random.gauss(0, 1) for student in students}
+        quizzes = {quiz_id: self._load_quiz(quiz_id) for quiz_id in quiz_ids}
+        now = timezone.now()
+
+        for start in range(0, count, self.batch_size):
+            batch_size = min(self.batch_size, count - start)
+            attempts, responses = [], []
+            for _ in range(batch_size):
+                student = self.random.choice(students)
+                quiz_id = self.random.choice(quiz_ids)
+                items = quizzes[quiz_id]
+                end_time = now - timedelta(seconds=self.random.uniform(0, HISTORY_DAYS * 86400))
+                duration = timedelta(seconds=max(30, self.random.gauss(45, 20) * len(items)))
+
+                earned = total = 0
+                attempt_responses = []
+                for question, difficulty, answers in items:
+                    total += question.points
+                    if self.random.random() < 0.03:
+                        # Skipped question
+                        attempt_responses.append((question, [], '', False, 0))
+                        continue
+                    chance = 1 / (1 + math.exp(-1.7 * (abilities[student] - difficulty)))
+                    correct = self.random.random() < chance
+                    selected, text = self._respond(question, answers, correct)
+                    points = question.points if correct else 0
+                    earned += points
+                    attempt_responses.append((question, selected, text, correct, points))
+
+                attempts.append(QuizAttempt(
+                    user_id=student,
+                    quiz_id=quiz_id,
+                    status='completed',
+                    start_time=end_time - duration,
+                    end_time=end_time,
+                    points_earned=earned,
+                    total_points=total,
+                    score=calculate_percentage(earned, total),
+                    shuffle_seed=self.random.randrange(2 ** 31),
+                ))
+                responses.append((end_time, attempt_responses))
+            self._write_attempts(attempts, responses)
+            self.log(f'Created {start + batch_size} of {count} attempts')
+
+        # Explicit ids leave PostgreSQL's sequence behind
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [UserAnswer]):
+                cursor.execute(sql)
+
+    @transaction.atomic
+    def _write_attempts(self, attempts, responses):
+        # start_time is auto_now_add, so bulk_create() stamps it with now and
+        # the generated times are written back afterwards
+        start_times = [attempt.start_time for attempt in attempts]
+        attempts = QuizAttempt.objects.bulk_create(attempts, batch_size=self.batch_size)
+        for attempt, start_time in zip(attempts, start_times):
+            attempt.start_time = start_time
+        QuizAttempt.objects.bulk_update(attempts, ['start_time'], batch_size=self.batch_size)
+
+        # Answers and selections are by far the largest tables. Building a
+        # model instance per row would dominate the load time, so their rows
+        # go to executemany() directly, with answer ids assigned up front
+        # for the selections to refer to.
+        next_id = (UserAnswer.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        user_answers = []
+        selections = []
+        for attempt, (answered_at, attempt_responses) in zip(attempts, responses):
+            answered_at = connection.ops.adapt_datetimefield_value(answered_at)
+            for question, selected, text, correct, points in attempt_responses:
+                user_answers.append((next_id, attempt.pk, question.pk, text, correct, points, answered_at))
+                selections.extend((next_id, answer_id) for answer_id in selected)
+                next_id += 1
+        _insert_rows(
+            UserAnswer,
+            ['id', 'attempt', 'question', 'text_answer', 'is_correct', 'points_earned', 'answered_at'],
+            user_answers,
+        )
+        _insert_rows(UserAnswer.selected_answers.through, ['useranswer', 'answer'], selections)
+
+    def generate(self, users, quizzes, attempts):
+        """
+        Create users, quizzes and attempts.
+
+        Quizzes fall back to existing teachers and attempts to existing
+        students and quizzes when none are generated. Returns the primary
+        keys of the teachers, students and quizzes used.
+        """
+        teachers, students = self.create_users(users) if users else ([], [])
+        teachers = teachers or list(
+            User.objects.filter(profile__role='teacher').order_by('pk').values_list('pk', flat=True)
+        )
+        students = students or list(
+            User.objects.filter(profile__role='student').order_by('pk').values_list('pk', flat=True)
+        )
+        quiz_ids = self.create_quizzes(quizzes, teachers) if quizzes and teachers else []
+        quiz_ids = quiz_ids or list(Quiz.objects.filter(question_count__gt=0).order_by('pk').values_list('pk', flat=True))
+        if attempts and students and quiz_ids:
+            self.create_attempts(attempts, students, quiz_ids)
+        return teachers, students, quiz_ids
@@ -0,0 +1,145 @@
+import re
+
+from django.db import connection, transaction
+
+
+# Table holding the search index, an FTS5 virtual table on SQLite and a
+# table with a GIN-indexed tsvector column on PostgreSQL, created by
+# migration 0009_quiz_search
+TABLE = 'quizzes_quiz_search'
+
+# Results find() returns at once, best ranked first; paged lists ask for one page at a time
+MAX_RESULTS = 200
+
+# Fields whose changes require reindexing a quiz
+INDEXED_FIELDS = {'title', 'description', 'category', 'difficulty', 'is_active', 'is_public'}
+
+# Quizzes per INSERT statement when rebuilding
+BATCH_SIZE = 1000
+
+TERM_RE = re.compile(r'\w+')
+
+VENDORS = ('sqlite', 'postgresql')
+
+
+def available(using=None):
+    """Whether the database has a search index; other backends fall back to LIKE queries"""
+    return (using or connection).vendor in VENDORS
+
+
+def terms(text):
+    """Lowercased words of a search text, each matched as a prefix"""
+    return [term.lower() for term in TERM_RE.findall(text or '')]
+
+
+def _facets(category_id, difficulty, visible):
+    # Hidden quizzes are the few, so they carry the token to exclude
+    return ' '.join([f'c{category_id or 0}', f'd{difficulty}'] + ([] if visible else ['hidden']))
+
+
+def _write(rows):
+    """Replace the index entries of (id, title, description, category_id, difficulty, is_active, is_public) rows"""
+    rows = [
+        (pk, title, description, category_id, difficulty, is_active and is_public)
+        for pk, title, description, category_id, difficulty, is_active, is_public in rows
+    ]
+    if not rows or not available():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, title, description, facets) VALUES (%s, %s, %s, %s)',
+                [(pk, title, description, _facets(category_id, difficulty, visible))
+                 for pk, title, description, category_id, difficulty, visible in rows],
+            )
+        else:
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE quiz_id = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (quiz_id, document, category_id, difficulty, visible) VALUES '
+                "(%s, setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B'), "
+                '%s, %s, %s)',
+                rows,
+            )
+
+
+def _rows(quizzes):
+    return quizzes.values_list('id', 'title', 'description', 'category_id', 'difficulty', 'is_active', 'is_public')
+
+
+def index_quizzes(quizzes):
+    """(Re)index the quizzes of a queryset, e.g. after bulk_create()"""
+    _write(_rows(quizzes))
+
+
+def index_quiz(quiz):
+    """(Re)index one quiz, from quizzes.signals"""
+    _write([(
+        quiz.pk, quiz.title, quiz.description, quiz.category_id, quiz.difficulty, quiz.is_active, quiz.is_public,
+    )])
+
+
+def remove_quiz(quiz_id):
+    if available():
+        with connection.cursor() as cursor:
+            column = 'rowid' if connection.vendor == 'sqlite' else 'quiz_id'
+            cursor.execute(f'DELETE FROM {TABLE} WHERE {column} = %s', [quiz_id])
+
+
+@transaction.atomic
+def rebuild(quizzes, batch_size=BATCH_SIZE):
+    """Reindex the quizzes of a queryset from scratch, dropping all others; returns the number indexed"""
+    if not available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    count = 0
+    batch = []
+    for row in _rows(quizzes.order_by('pk')).iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            _write(batch)
+            count += len(batch)
+            batch = []
+    _write(batch)
+    return count + len(batch)
+
+
+def find(text, category=None, difficulty=None, limit=MAX_RESULTS, offset=0):
+    """
+    Ids of visible quizzes matching every word of text as a prefix, best first.
+
+    Titles weigh more than descriptions. The category and difficulty
+    filters are applied inside the index query, so its cost depends on
+    the number of matches rather than the size of the catalog. limit and
+    offset select a slice of the ranking, e.g. one page.
+    """
+    words = terms(text)
+    if not words:
+        return []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            match = '{title description}: (' + ' AND '.join(f'"{word}"*' for word in words) + ')'
+            facets = [f'c{category.pk}' if category else '', f'd{difficulty}' if difficulty else '']
+            if any(facets):
+                match += f' AND facets: ({" ".join(filter(None, facets))})'
+            cursor.execute(
+                f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+                f'ORDER BY bm25({TABLE}, 10.0, 1.0, 0.0), rowid LIMIT %s OFFSET %s',
+                [f'{match} NOT facets: hidden', limit, offset],
+            )
+        else:
+            query = ' & '.join(f'{word}:*' for word in words)
+            filters, params = ["document @@ to_tsquery('simple', %s)", 'visible'], [query]
+            if category:
+                filters.append('category_id = %s')
+                params.append(category.pk)
+            if difficulty:
+                filters.append('difficulty = %s')
+                params.append(difficulty)
+            cursor.execute(
+                f'SELECT quiz_id FROM {TABLE} WHERE {" AND ".join(filters)} '
+                f"ORDER BY ts_rank_cd(document, to_tsquery('simple', %s)) DESC, quiz_id LIMIT %s OFFSET %s",
+                [*params, query, limit, offset],
+            )
+        return [row[0] for row in cursor.fetchall()]
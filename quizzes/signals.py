@@ -0,0 +1,55 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Quiz, Question, Answer
+from .answer_keys import bump_content_version
+from .counters import adjust_quiz
+from . import search
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, created, **kwargs):
+    """Keep quiz counters and content version in step with a saved question"""
+    loaded = getattr(instance, '_loaded_values', {})
+    old_quiz_id = loaded.get('quiz_id', instance.quiz_id)
+    old_points = loaded.get('points', instance.points)
+    
+    if created:
+        adjust_quiz(instance.quiz_id, questions=1, points=instance.points)
+    elif old_quiz_id != instance.quiz_id:
+        # Question moved to another quiz
+        adjust_quiz(old_quiz_id, questions=-1, points=-old_points)
+        adjust_quiz(instance.quiz_id, questions=1, points=instance.points)
+    else:
+        adjust_quiz(instance.quiz_id, points=instance.points - old_points)
+    
+    instance._loaded_values = {'quiz_id': instance.quiz_id, 'points': instance.points}
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    """Remove a deleted question from the quiz counters"""
+    loaded = getattr(instance, '_loaded_values', {})
+    adjust_quiz(
+        loaded.get('quiz_id', instance.quiz_id),
+        questions=-1,
+        points=-loaded.get('points', instance.points),
+    )
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def answer_changed(sender, instance, **kwargs):
+    """Bump the quiz content version when an answer changes"""
+    bump_content_version(Question.objects.filter(pk=instance.question_id).values('quiz_id')[:1])
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_saved(sender, instance, update_fields=None, **kwargs):
+    """Keep the search index in step with a saved quiz"""
+    if update_fields is None or search.INDEXED_FIELDS & set(update_fields):
+        search.index_quiz(instance)
+
+
+@receiver(post_delete, sender=Quiz)
+def quiz_deleted(sender, instance, **kwargs):
+    search.remove_quiz(instance.pk)
@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import Quiz, QuizAttempt, QuizStats
+
+
+# Attempts marked counted per UPDATE after a rebuild
+UPDATE_BATCH_SIZE = 1000
+
+
+def stats_for(quiz):
+    """The quiz's statistics rollup, or an empty one if nothing was recorded yet"""
+    return QuizStats.objects.filter(quiz=quiz).first() or QuizStats(quiz=quiz)
+
+
+async def astats_for(quiz):
+    """Async version of stats_for()"""
+    return await QuizStats.objects.filter(quiz=quiz).afirst() or QuizStats(quiz=quiz)
+
+
+def _seconds(start_time, end_time):
+    if not start_time or not end_time:
+        return 0
+    return max(int((end_time - start_time).total_seconds()), 0)
+
+
+@transaction.atomic
+def record_attempt(attempt):
+    """
+    Add a completed attempt to its quiz's statistics rollup.
+
+    Only the quiz's single QuizStats row is read and written, however many
+    attempts the quiz has. Each attempt is only ever counted once. Returns
+    whether anything was updated.
+    """
+    claimed = QuizAttempt.objects.filter(
+        pk=attempt.pk, status='completed', counted_in_stats=False
+    ).update(counted_in_stats=True)
+    if not claimed:
+        return False
+
+    passing_score = Quiz.objects.filter(pk=attempt.quiz_id).values_list('passing_score', flat=True).get()
+    stats, _ = QuizStats.objects.select_for_update().get_or_create(quiz_id=attempt.quiz_id)
+    score = attempt.score or Decimal('0')
+    stats.add_attempt(score, _seconds(attempt.start_time, attempt.end_time), score >= passing_score)
+    stats.save()
+    return True
+
+
+@transaction.atomic
+def rebuild_stats(quiz=None):
+    """
+    Recompute statistics rollups from completed attempts.
+
+    Needed after a regrade or when the passing score changed. Returns the
+    number of rollups written.
+    """
+    quizzes = Quiz.objects.all() if quiz is None else Quiz.objects.filter(pk=quiz.pk)
+    passing_scores = dict(quizzes.values_list('pk', 'passing_score'))
+    attempts = QuizAttempt.objects.filter(status='completed', quiz__in=quizzes)
+
+    rollups = {}
+    # Only the attempts added here are marked counted, not ones completed meanwhile
+    uncounted = []
+    rows = attempts.order_by().values_list('pk', 'quiz_id', 'score', 'start_time', 'end_time', 'counted_in_stats')
+    for pk, quiz_id, score, start_time, end_time, counted in rows.iterator(chunk_size=5000):
+        if not counted:
+            uncounted.append(pk)
+        score = score or Decimal('0')
+        if quiz_id not in rollups:
+            rollups[quiz_id] = QuizStats(quiz_id=quiz_id)
+        rollups[quiz_id].add_attempt(score, _seconds(start_time, end_time), score >= passing_scores[quiz_id])
+
+    QuizStats.objects.filter(quiz__in=quizzes).delete()
+    QuizStats.objects.bulk_create(rollups.values())
+    for start in range(0, len(uncounted), UPDATE_BATCH_SIZE):
+        QuizAttempt.objects.filter(pk__in=uncounted[start:start + UPDATE_BATCH_SIZE]).update(counted_in_stats=True)
+    return len(rollups)
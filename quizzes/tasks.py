@@ -0,0 +1,109 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .jobs import enqueue, enqueue_attempt_followups, task
+from .models import Answer, Quiz, QuizAttempt, UserAnswer
+
+
+def normalize_text(value):
+    """Case- and whitespace-insensitive form used to compare short answers"""
+    return ' '.join(value.split()).casefold()
+
+
+def enqueue_post_submission(attempt, answer_key):
+    """
+    Queue follow-up work for a submitted attempt.
+
+    Attempts with short answers are graded in the background first; the
+    grading task queues the statistics and leaderboard updates once the
+    final score is known.
+    """
+    if any(question.question_type == 'text' for question in answer_key.questions.values()):
+        enqueue('grade_text_answers', {'attempt_id': attempt.pk})
+    else:
+        enqueue_attempt_followups(attempt)
+
+
+@task('grade_text_answers')
+def grade_text_answers(attempt_id):
+    """
+    Grade short answers against the accepted answers of their question.
+
+    Accepted answers are the answers marked correct on a text question.
+    Questions without any are left for manual grading.
+    """
+    attempt = QuizAttempt.objects.select_related('quiz').get(pk=attempt_id)
+    text_answers = list(
+        UserAnswer.objects.filter(attempt=attempt, question__question_type='text')
+    )
+    
+    accepted = {}
+    for question_id, text in Answer.objects.filter(
+        question__in=[user_answer.question_id for user_answer in text_answers], is_correct=True
+    ).values_list('question_id', 'text'):
+        accepted.setdefault(question_id, set()).add(normalize_text(text))
+    
+    points = {question_id: question.points for question_id, question in attempt.quiz.answer_key.questions.items()}
+    graded = []
+    for user_answer in text_answers:
+        if user_answer.question_id not in accepted:
+            continue
+        user_answer.is_correct = normalize_text(user_answer.text_answer) in accepted[user_answer.question_id]
+        user_answer.points_earned = points.get(user_answer.question_id, 0) if user_answer.is_correct else 0
+        graded.append(user_answer)
+    
+    with transaction.atomic():
+        UserAnswer.objects.bulk_update(graded, ['is_correct', 'points_earned'])
+        if graded:
+            attempt.calculate_score()
+        enqueue_attempt_followups(attempt)
+
+
+@task('regrade_quiz')
+def regrade_quiz_task(quiz_id, requested_by_id=None):
+    """Regrade a quiz in the background, resuming an interrupted run"""
+    from .regrade import regrade_quiz
+
+    quiz = Quiz.objects.get(pk=quiz_id)
+    requested_by = User.objects.filter(pk=requested_by_id).first() if requested_by_id else None
+    regrade_quiz(quiz, requested_by=requested_by)
+
+
+@task('update_leaderboards', on_attempt_completed=True)
+def update_leaderboards(attempt_id):
+    """Add a completed attempt to the materialized leaderboards"""
+    from .leaderboards import record_attempt
+
+    record_attempt(QuizAttempt.objects.get(pk=attempt_id))
+
+
+@task('rebuild_quiz_leaderboards', on_quiz_regraded=True)
+def rebuild_quiz_leaderboards(quiz_id):
+    """Rebuild a quiz's leaderboards after its scores changed"""
+    from .leaderboards import rebuild_leaderboards
+
+    rebuild_leaderboards(Quiz.objects.get(pk=quiz_id))
+
+
+@task('update_quiz_stats', on_attempt_completed=True)
+def update_quiz_stats(attempt_id):
+    """Add a completed attempt to its quiz's statistics rollup"""
+    from .stats import record_attempt
+
+    record_attempt(QuizAttempt.objects.get(pk=attempt_id))
+
+
+@task('rebuild_quiz_stats', on_quiz_regraded=True)
+def rebuild_quiz_stats(quiz_id):
+    """Recompute a quiz's statistics after its scores changed"""
+    from .stats import rebuild_stats
+
+    rebuild_stats(Quiz.objects.get(pk=quiz_id))
+
+
+@task('invalidate_item_analysis', on_quiz_regraded=True)
+def invalidate_item_analysis(quiz_id):
+    """Drop the cached item analysis of a regraded quiz"""
+    from .analysis import invalidate
+
+    invalidate(Quiz.objects.get(pk=quiz_id))
@@ -0,0 +1,62 @@
+from django.contrib.auth.models import User
+
+from .grading import grade_attempt, store_responses
+from .jobs import enqueue_attempt_followups
+from .models import Answer, Category, Question, Quiz, QuizAttempt
+
+
+def make_user(username, role='student'):
+    user = User.objects.create_user(username, password='secret-pass-123')
+    user.profile.role = role
+    user.profile.save()
+    return user
+
+
+def add_questions(quiz, count):
+    """Add count questions cycling through every question type, each with three answers"""
+    offset = quiz.questions.count()
+    for index in range(offset, offset + count):
+        question_type = ['single', 'multiple', 'truefalse', 'text'][index % 4]
+        question = Question.objects.create(
+            quiz=quiz, question_type=question_type, text=f'Question {index}', points=2, order=index
+        )
+        Answer.objects.bulk_create([
+            Answer(question=question, text=f'Answer {choice}', order=choice,
+                   is_correct=choice == 0 or (question_type == 'multiple' and choice == 1))
+            for choice in range(3)
+        ])
+
+
+def complete_attempt(user, quiz, correct=True):
+    """Store and grade an attempt answering every question"""
+    attempt = QuizAttempt.objects.create(user=user, quiz=quiz)
+    answer_key = quiz.answer_key
+    responses = {}
+    for question_id, question_key in answer_key.questions.items():
+        if question_key.question_type == 'text':
+            responses[question_id] = ([], 'Answer 0' if correct else 'wrong')
+        else:
+            selected = sorted(question_key.correct_ids if correct else question_key.answer_ids - question_key.correct_ids)
+            responses[question_id] = (selected[:1] if question_key.question_type != 'multiple' else selected, '')
+    store_responses(attempt, responses)
+    grade_attempt(attempt, answer_key)
+    enqueue_attempt_followups(attempt)
+    return attempt
+
+
+def seed(teacher, quizzes, questions, students, categories):
+    """Add categories, quizzes of the teacher and students with completed attempts"""
+    created = [Category.objects.create(name=f'Category {Category.objects.count()}') for _ in range(categories)]
+    new_quizzes = []
+    for index in range(quizzes):
+        quiz = Quiz.objects.create(
+            title=f'Quiz {Quiz.objects.count()}', description='Seeded quiz', creator=teacher,
+            category=created[index % len(created)] if created else None, max_attempts=100,
+        )
+        add_questions(quiz, questions)
+        new_quizzes.append(quiz)
+    for index in range(students):
+        student = make_user(f'seed{User.objects.count()}')
+        for position, quiz in enumerate(Quiz.objects.all()):
+            complete_attempt(student, quiz, correct=(index + position) % 2 == 0)
+    return new_quizzes
@@ -1,3 +1,1610 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, router
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F, Q
+from django.http import HttpResponse, QueryDict
+from django.test import LiveServerTestCase, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from accounts.models import UserProfile
+from quiz_platform import replicas
+from quiz_platform.locking import LOCK_RETRY_ATTEMPTS, retry_on_lock
+from . import analysis, answer_keys, async_views, autosave, bundles, fragments, jobs, search, stats
+from .answer_keys import bump_content_version
+from .bundles import DEFAULT_QUESTIONS_PER_PAGE, PAGED_TAKE_THRESHOLD, arrange, page_size_for
+from .counters import find_drift, recount
+from .grading import grade, grade_attempt, parse_submission, store_responses
+from .jobs import work
+from .leaderboards import ALL_TIME_START, WINDOWS, board, rank_of, rebuild_leaderboards, record_attempt
+from .loadtest import LoadTest
+from .management.commands.bench_asgi import serving
+from .models import Answer, Category, Job, LeaderboardEntry, Question, Quiz, QuizAttempt, QuizStats, UserAnswer
+from .pagination import PAGE_SIZE
+from .regrade import regrade_quiz
+from .testing import add_questions, complete_attempt, make_user, seed
+
+
+class GradingTests(TestCase):
+    """Submissions are parsed, stored and graded for every question type"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.student = make_user('student')
+        cls.quiz = Quiz.objects.create(title='Graded', description='d', creator=cls.teacher)
+        # Questions 0-3 are single, multiple, true/false and text, answer 0 (and 1 for multiple) correct
+        add_questions(cls.quiz, 4)
+        cls.questions = {question.question_type: question for question in cls.quiz.questions.all()}
+    
+    def setUp(self):
+        cache.clear()
+        answer_keys._local_keys.clear()
+        self.answer_key = self.quiz.answer_key
+    
+    def answers(self, question_type):
+        return [answer.pk for answer in self.questions[question_type].answers.order_by('order')]
+    
+    def test_grade(self):
+        single, multiple, truefalse = self.answers('single'), self.answers('multiple'), self.answers('truefalse')
+        key = lambda question_type: self.answer_key[self.questions[question_type].pk]
+        
+        self.assertEqual(grade(key('single'), [single[0]]), (True, 2))
+        self.assertEqual(grade(key('single'), [single[1]]), (False, 0))
+        self.assertEqual(grade(key('single'), []), (False, 0))
+        self.assertEqual(grade(key('multiple'), [multiple[1], multiple[0]]), (True, 2))
+        self.assertEqual(grade(key('multiple'), [multiple[0]]), (False, 0))
+        self.assertEqual(grade(key('multiple'), multiple), (False, 0))
+        self.assertEqual(grade(key('truefalse'), [truefalse[0]]), (True, 2))
+        self.assertEqual(grade(key('truefalse'), [truefalse[2]]), (False, 0))
+        # Text answers wait for manual grading
+        self.assertEqual(grade(key('text'), []), (False, 0))
+    
+    def test_parse_submission(self):
+        single, multiple = self.answers('single'), self.answers('multiple')
+        other_question = self.answers('truefalse')[0]
+        data = QueryDict(mutable=True)
+        data.setlist(f'question_{self.questions["single"].pk}', [str(single[1]), str(single[0])])
+        data.setlist(f'question_{self.questions["multiple"].pk}', [str(multiple[0]), str(other_question), 'x', str(multiple[0])])
+        data[f'question_{self.questions["text"].pk}'] = 'My answer'
+        data['question_999999'] = str(single[0])
+        
+        self.assertEqual(parse_submission(self.answer_key, data), {
+            self.questions['single'].pk: ([single[1]], ''),
+            self.questions['multiple'].pk: ([multiple[0]], ''),
+            self.questions['truefalse'].pk: ([], ''),
+            self.questions['text'].pk: ([], 'My answer'),
+        })
+    
+    def test_unanswered_questions_get_empty_answers(self):
+        attempt = QuizAttempt.objects.create(user=self.student, quiz=self.quiz)
+        store_responses(attempt, {self.questions['single'].pk: ([self.answers('single')[0]], '')})
+        grade_attempt(attempt, self.answer_key)
+        
+        attempt.refresh_from_db()
+        self.assertEqual((attempt.status, attempt.points_earned, attempt.total_points), ('completed', 2, 8))
+        self.assertEqual(attempt.score, Decimal('25.00'))
+        user_answers = {user_answer.question_id: user_answer for user_answer in attempt.user_answers.all()}
+        self.assertEqual(set(user_answers), {question.pk for question in self.questions.values()})
+        unanswered = user_answers[self.questions['multiple'].pk]
+        self.assertEqual((unanswered.is_correct, unanswered.points_earned, unanswered.selected_answers.count()), (False, 0, 0))
+    
+    def test_resubmission_upserts(self):
+        attempt = QuizAttempt.objects.create(user=self.student, quiz=self.quiz)
+        single, multiple = self.answers('single'), self.answers('multiple')
+        store_responses(attempt, {
+            self.questions['single'].pk: ([single[1]], ''),
+            self.questions['multiple'].pk: ([multiple[0], multiple[1]], ''),
+            self.questions['text'].pk: ([], 'first'),
+        })
+        store_responses(attempt, {
+            self.questions['single'].pk: ([single[0]], ''),
+            self.questions['multiple'].pk: ([multiple[2]], ''),
+            self.questions['text'].pk: ([], 'second'),
+        })
+        
+        self.assertEqual(attempt.user_answers.count(), 3)
+        selections = {
+            user_answer.question_id: sorted(answer.pk for answer in user_answer.selected_answers.all())
+            for user_answer in attempt.user_answers.all()
+        }
+        self.assertEqual(selections[self.questions['single'].pk], [single[0]])
+        self.assertEqual(selections[self.questions['multiple'].pk], [multiple[2]])
+        self.assertEqual(attempt.user_answers.get(question=self.questions['text']).text_answer, 'second')
+        
+        grade_attempt(attempt, self.answer_key)
+        self.assertEqual(attempt.points_earned, 2)
+
+
+class AnswerKeyTests(TestCase):
+    """Editing the quiz content moves it to a new version and a freshly compiled key"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.quiz = Quiz.objects.create(title='Keyed', description='d', creator=cls.teacher)
+        add_questions(cls.quiz, 2)
+        cls.single = cls.quiz.questions.get(question_type='single')
+    
+    def setUp(self):
+        cache.clear()
+        answer_keys._local_keys.clear()
+    
+    def cached_key(self):
+        """Warm both caches with the key of the current version and return that version"""
+        self.quiz.refresh_from_db()
+        self.quiz.answer_key
+        key = answer_keys.cache_key(self.quiz.pk, self.quiz.content_version)
+        self.assertIsNotNone(cache.get(key))
+        self.assertIsNotNone(answer_keys._local_keys.get(key))
+        return self.quiz.content_version
+    
+    def assertNewKey(self, old_version):
+        self.quiz.refresh_from_db()
+        self.assertGreater(self.quiz.content_version, old_version)
+        key = answer_keys.cache_key(self.quiz.pk, self.quiz.content_version)
+        self.assertIsNone(cache.get(key))
+        self.assertIsNone(answer_keys._local_keys.get(key))
+        with self.assertNumQueries(2):
+            answer_key = self.quiz.answer_key
+        self.assertEqual(answer_key.version, self.quiz.content_version)
+        return answer_key
+    
+    def test_cached_key_is_reused(self):
+        self.cached_key()
+        answer_keys._local_keys.clear()
+        with self.assertNumQueries(0):
+            self.quiz.answer_key
+            self.quiz.answer_key
+    
+    def test_edited_answer(self):
+        version = self.cached_key()
+        answer = self.single.answers.get(order=1)
+        answer.is_correct = True
+        answer.save()
+        
+        answer_key = self.assertNewKey(version)
+        self.assertIn(answer.pk, answer_key[self.single.pk].correct_ids)
+    
+    def test_deleted_answer(self):
+        version = self.cached_key()
+        answer = self.single.answers.get(order=2)
+        answer.delete()
+        
+        answer_key = self.assertNewKey(version)
+        self.assertNotIn(answer.pk, answer_key[self.single.pk].answer_ids)
+    
+    def test_edited_question(self):
+        version = self.cached_key()
+        self.single.points = 5
+        self.single.save()
+        
+        answer_key = self.assertNewKey(version)
+        self.assertEqual(answer_key[self.single.pk].points, 5)
+        self.assertEqual(answer_key.total_points, 7)
+    
+    def test_deleted_question(self):
+        version = self.cached_key()
+        Question.objects.get(pk=self.single.pk).delete()
+        
+        answer_key = self.assertNewKey(version)
+        self.assertNotIn(self.single.pk, answer_key)
+        self.assertEqual(answer_key.total_points, 2)
+
+
+class QuizCounterTests(TestCase):
+    """Question changes keep the stored counters of their quiz in step"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.quiz = Quiz.objects.create(title='Counted', description='d', creator=cls.teacher)
+        cls.other = Quiz.objects.create(title='Other', description='d', creator=cls.teacher)
+    
+    def assertCounters(self, quiz, question_count, total_points):
+        quiz.refresh_from_db()
+        self.assertEqual((quiz.question_count, quiz.total_points), (question_count, total_points))
+    
+    def test_question_deltas(self):
+        question = Question.objects.create(quiz=self.quiz, text='Q1', points=3, order=1)
+        Question.objects.create(quiz=self.quiz, text='Q2', points=2, order=2)
+        self.assertCounters(self.quiz, 2, 5)
+        
+        question.points = 7
+        question.save()
+        self.assertCounters(self.quiz, 2, 9)
+        
+        question.quiz = self.other
+        question.save()
+        self.assertCounters(self.quiz, 1, 2)
+        self.assertCounters(self.other, 1, 7)
+        
+        question.delete()
+        self.assertCounters(self.other, 0, 0)
+        self.assertEqual(list(find_drift()), [])
+    
+    def test_stale_instance_keeps_counters(self):
+        stale = Quiz.objects.get(pk=self.quiz.pk)
+        Question.objects.create(quiz=self.quiz, text='Q1', points=3, order=1)
+        
+        stale.title = 'Renamed'
+        stale.save()
+        
+        self.assertCounters(self.quiz, 1, 3)
+        self.assertEqual(self.quiz.title, 'Renamed')
+    
+    def test_save_reinserts_deleted_quiz(self):
+        quiz = Quiz.objects.create(title='Gone', description='d', creator=self.teacher)
+        Quiz.objects.filter(pk=quiz.pk).delete()
+        
+        quiz.save()
+        
+        self.assertTrue(Quiz.objects.filter(pk=quiz.pk, title='Gone').exists())
+    
+    def test_find_drift_and_recount(self):
+        Question.objects.create(quiz=self.quiz, text='Q1', points=3, order=1)
+        # bulk_create skips the signals
+        Question.objects.bulk_create([Question(quiz=self.other, text=f'Q{index}', points=4, order=index) for index in range(2)])
+        Quiz.objects.filter(pk=self.quiz.pk).update(total_points=99)
+        self.other.refresh_from_db()
+        version = self.other.content_version
+        
+        drifted = {quiz.pk: quiz for quiz in find_drift()}
+        self.assertEqual(set(drifted), {self.quiz.pk, self.other.pk})
+        self.assertEqual((drifted[self.other.pk].actual_question_count, drifted[self.other.pk].actual_total_points), (2, 8))
+        
+        self.assertEqual(recount(Quiz.objects.filter(pk__in=drifted)), 2)
+        self.assertCounters(self.quiz, 1, 3)
+        self.assertCounters(self.other, 2, 8)
+        self.assertGreater(self.other.content_version, version)
+        self.assertEqual(list(find_drift()), [])
+    
+    def test_check_quiz_counters_command(self):
+        Quiz.objects.filter(pk=self.quiz.pk).update(question_count=5)
+        with self.assertRaises(CommandError):
+            call_command('check_quiz_counters', stdout=StringIO())
+        
+        call_command('check_quiz_counters', '--repair', stdout=StringIO())
+        self.assertCounters(self.quiz, 0, 0)
+
+
+class AutosaveTests(TestCase):
+    """Autosaved deltas are applied once, in order, and reach the submission"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.student = make_user('student')
+        cls.quiz = Quiz.objects.create(title='Saved', description='d', creator=cls.teacher, questions_per_page=2)
+        # Page 1 holds the single and multiple choice questions, page 2 true/false and text
+        add_questions(cls.quiz, 4)
+        cls.questions = {question.question_type: question for question in cls.quiz.questions.all()}
+    
+    def setUp(self):
+        cache.clear()
+        answer_keys._local_keys.clear()
+        bundles._local_bundles.clear()
+        self.client.force_login(self.student)
+        self.url = reverse('quizzes:quiz_take', args=[self.quiz.pk])
+        self.client.get(self.url)
+        self.attempt = QuizAttempt.objects.get(user=self.student, quiz=self.quiz)
+    
+    def answer(self, question_type, order=0):
+        return self.questions[question_type].answers.get(order=order).pk
+    
+    def save_delta(self, seq, answers):
+        response = self.client.post(
+            reverse('quizzes:attempt_autosave', args=[self.quiz.pk, self.attempt.pk]),
+            json.dumps({'seq': seq, 'answers': answers}), content_type='application/json',
+        )
+        return response.json()
+    
+    def selected(self, question_type):
+        return list(UserAnswer.objects.filter(
+            attempt=self.attempt, question=self.questions[question_type]
+        ).values_list('selected_answers', flat=True))
+    
+    def test_deltas_go_to_the_database_without_a_shared_cache(self):
+        self.assertFalse(autosave.buffering())
+        single = str(self.questions['single'].pk)
+        
+        self.assertEqual(self.save_delta(1, {single: [self.answer('single', 1)]})['flushed'], True)
+        self.assertEqual(self.selected('single'), [self.answer('single', 1)])
+        
+        # A retried or overtaken delta changes nothing
+        self.assertEqual(self.save_delta(2, {single: [self.answer('single', 2)]})['accepted'], True)
+        self.assertEqual(self.save_delta(2, {single: [self.answer('single', 0)]})['accepted'], False)
+        self.assertEqual(self.save_delta(1, {single: [self.answer('single', 0)]})['accepted'], False)
+        self.assertEqual(self.selected('single'), [self.answer('single', 2)])
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.autosave_seq, 2)
+    
+    @override_settings(QUIZ_AUTOSAVE_BUFFER=True)
+    def test_buffered_deltas_apply_once(self):
+        single = str(self.questions['single'].pk)
+        
+        # The first delta is written right away, the ones after it are buffered
+        self.assertEqual(self.save_delta(1, {single: [self.answer('single', 1)]}), {'accepted': True, 'flushed': True, 'seq': 1})
+        self.assertEqual(self.save_delta(2, {single: [self.answer('single', 2)]}), {'accepted': True, 'flushed': False, 'seq': 2})
+        self.assertEqual(self.save_delta(2, {single: [self.answer('single', 0)]})['accepted'], False)
+        self.assertEqual(self.save_delta(1, {single: [self.answer('single', 0)]})['accepted'], False)
+        self.assertEqual(self.selected('single'), [self.answer('single', 1)])
+        
+        autosave.flush_autosave(self.attempt)
+        self.assertEqual(self.selected('single'), [self.answer('single', 2)])
+        self.assertIsNone(cache.get(autosave.buffer_key(self.attempt.pk)))
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.autosave_seq, 2)
+    
+    @override_settings(QUIZ_AUTOSAVE_BUFFER=True)
+    def test_late_flush_leaves_a_completed_attempt_alone(self):
+        single = str(self.questions['single'].pk)
+        self.save_delta(1, {single: [self.answer('single', 1)]})
+        self.save_delta(2, {single: [self.answer('single', 2)]})
+        # Another worker submitted the attempt before the buffer was flushed
+        QuizAttempt.objects.filter(pk=self.attempt.pk).update(status='completed')
+        
+        autosave.flush_autosave(self.attempt)
+        
+        self.assertEqual(self.selected('single'), [self.answer('single', 1)])
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.autosave_seq, 1)
+    
+    @override_settings(QUIZ_AUTOSAVE_BUFFER=True)
+    def test_submit_flushes_the_buffer(self):
+        self.save_delta(1, {str(self.questions['single'].pk): [self.answer('single', 1)]})
+        self.save_delta(2, {str(self.questions['truefalse'].pk): [self.answer('truefalse')]})
+        self.assertEqual(self.selected('truefalse'), [])
+        
+        self.client.post(self.url, {
+            'page': 1,
+            f'question_{self.questions["single"].pk}': self.answer('single'),
+            f'question_{self.questions["multiple"].pk}': [self.answer('multiple', 0), self.answer('multiple', 1)],
+        })
+        
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, 'completed')
+        self.assertEqual(self.selected('truefalse'), [self.answer('truefalse')])
+        self.assertEqual(self.attempt.points_earned, 6)
+
+
+class JobQueueTests(TestCase):
+    """Jobs are claimed by one worker at a time and retried with backoff"""
+    
+    def setUp(self):
+        self.calls = []
+        
+        def record(**payload):
+            self.calls.append(payload)
+        
+        def fail(**payload):
+            raise ValueError('broken job')
+        
+        for name, func in (('tests.record', record), ('tests.fail', fail)):
+            jobs.task(name)(func)
+            self.addCleanup(jobs.TASKS.pop, name)
+    
+    def test_enqueue_checks_the_task(self):
+        with self.assertRaises(jobs.UnknownTask):
+            jobs.enqueue('tests.missing')
+    
+    def test_claim_next_hands_each_job_out_once(self):
+        first = jobs.enqueue('tests.record', {'n': 1})
+        second = jobs.enqueue('tests.record', {'n': 2})
+        jobs.enqueue('tests.record', {'n': 3}, delay=60)
+        
+        claimed = [jobs.claim_next('worker-a'), jobs.claim_next('worker-b'), jobs.claim_next('worker-c')]
+        
+        self.assertEqual([job.pk for job in claimed[:2]], [first.pk, second.pk])
+        self.assertIsNone(claimed[2])
+        self.assertEqual(
+            [(job.status, job.locked_by, job.attempts) for job in claimed[:2]],
+            [('running', 'worker-a', 1), ('running', 'worker-b', 1)],
+        )
+        self.assertTrue(jobs.run_job(claimed[0]))
+        self.assertEqual(self.calls, [{'n': 1}])
+        claimed[0].refresh_from_db()
+        self.assertEqual((claimed[0].status, claimed[0].locked_by), ('done', ''))
+    
+    def test_retry_with_backoff_then_fail(self):
+        job = jobs.enqueue('tests.fail', max_attempts=3)
+        
+        for attempt in (1, 2):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            started = timezone.now()
+            with self.assertLogs('quizzes.jobs', 'ERROR'):
+                self.assertFalse(jobs.run_job(jobs.claim_next('worker')))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', attempt))
+            delay = (job.run_at - started).total_seconds()
+            self.assertAlmostEqual(delay, jobs.RETRY_DELAY * 2 ** (attempt - 1), delta=1)
+            self.assertIsNone(jobs.claim_next('worker'))
+        
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('quizzes.jobs', 'ERROR'):
+            jobs.run_job(jobs.claim_next('worker'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertIsNotNone(job.finished_at)
+        self.assertIn('ValueError: broken job', job.last_error)
+    
+    def test_requeue_stale(self):
+        stale, fresh = jobs.enqueue('tests.record'), jobs.enqueue('tests.record')
+        exhausted = jobs.enqueue('tests.record', max_attempts=1)
+        for worker in ('dead-worker', 'live-worker', 'other-dead-worker'):
+            jobs.claim_next(worker)
+        long_ago = timezone.now() - timedelta(seconds=jobs.STALE_AFTER + 1)
+        Job.objects.filter(pk__in=[stale.pk, exhausted.pk]).update(started_at=long_ago)
+        
+        self.assertEqual(jobs.requeue_stale(), 1)
+        
+        for job in (stale, fresh, exhausted):
+            job.refresh_from_db()
+        self.assertEqual((stale.status, stale.locked_by, stale.last_error), ('queued', '', 'worker lost'))
+        self.assertGreater(stale.run_at, timezone.now())
+        self.assertEqual(fresh.status, 'running')
+        self.assertEqual((exhausted.status, exhausted.last_error), ('failed', 'worker lost'))
+        self.assertIsNotNone(exhausted.finished_at)
+        
+        Job.objects.filter(pk=stale.pk).update(run_at=timezone.now())
+        self.assertEqual(jobs.claim_next('worker').pk, stale.pk)
+
+
+class RegradeTests(TestCase):
+    """Regrading scores attempts exactly like submitting them"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.student = make_user('student')
+        cls.quiz = Quiz.objects.create(title='Regraded', description='d', creator=cls.teacher)
+        add_questions(cls.quiz, 16)
+        # 1 of 32 points is 3.125%, where rounding half up and half to even differ
+        cls.first, second = cls.quiz.questions.order_by('order')[:2]
+        cls.first.points = 1
+        cls.first.save()
+        second.points = 3
+        second.save()
+    
+    def setUp(self):
+        cache.clear()
+        answer_keys._local_keys.clear()
+        self.quiz.refresh_from_db()
+        self.attempt = QuizAttempt.objects.create(user=self.student, quiz=self.quiz)
+        store_responses(self.attempt, {self.first.pk: ([self.first.answers.get(order=0).pk], '')})
+        grade_attempt(self.attempt, self.quiz.answer_key)
+    
+    def test_unchanged_key_keeps_scores(self):
+        self.assertEqual(self.attempt.score, Decimal('3.12'))
+        
+        run = regrade_quiz(self.quiz)
+        
+        self.attempt.refresh_from_db()
+        self.assertEqual((self.attempt.points_earned, self.attempt.score), (1, Decimal('3.12')))
+        self.assertEqual((run.phase, run.attempts_processed, run.answers_changed), ('done', 1, 0))
+    
+    def test_changed_key_rescores(self):
+        Answer.objects.filter(question=self.first, order=0).update(is_correct=False)
+        Answer.objects.filter(question=self.first, order=1).update(is_correct=True)
+        bump_content_version(self.quiz.pk)
+        self.quiz.refresh_from_db()
+        
+        run = regrade_quiz(self.quiz, chunk_size=1)
+        
+        self.attempt.refresh_from_db()
+        self.assertEqual((self.attempt.points_earned, self.attempt.score), (0, Decimal('0.00')))
+        self.assertEqual((run.answers_changed, run.attempts_processed), (1, 1))
+    
+    def test_regrade_job_sends_heartbeats(self):
+        beats = []
+        self.addCleanup(jobs.TASKS.pop, 'tests.regrade')
+        
+        @jobs.task('tests.regrade')
+        def regrade(quiz_id):
+            job = Job.objects.get(status='running')
+            Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(seconds=jobs.STALE_AFTER + 1))
+            regrade_quiz(Quiz.objects.get(pk=quiz_id), chunk_size=1)
+            beats.append(jobs.requeue_stale())
+        
+        jobs.enqueue('tests.regrade', {'quiz_id': self.quiz.pk})
+        work(burst=True, max_jobs=1)
+        self.assertEqual(beats, [0])
+
+
+class LeaderboardTests(TestCase):
+    """Leaderboards count every attempt once, per window, in ranking order"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.quiz = Quiz.objects.create(title='Ranked', description='d', creator=cls.teacher)
+        add_questions(cls.quiz, 4)
+        cls.students = [make_user(f'student{index}') for index in range(3)]
+    
+    def setUp(self):
+        cache.clear()
+        answer_keys._local_keys.clear()
+    
+    def entries(self):
+        return {
+            (entry.quiz_id, entry.user_id, entry.window, entry.period_start):
+            (entry.attempts, entry.quizzes_completed, entry.avg_score, entry.best_score, entry.best_at)
+            for entry in LeaderboardEntry.objects.all()
+        }
+    
+    def test_record_attempt_is_idempotent(self):
+        attempt = complete_attempt(self.students[0], self.quiz)
+        
+        self.assertTrue(record_attempt(attempt))
+        self.assertFalse(record_attempt(attempt))
+        
+        self.assertEqual(LeaderboardEntry.objects.count(), 2 * len(WINDOWS))
+        self.assertEqual(set(LeaderboardEntry.objects.values_list('attempts', 'quizzes_completed', 'best_score')), {
+            (1, 1, Decimal('75.00')),
+        })
+    
+    def test_window_periods(self):
+        attempt = complete_attempt(self.students[0], self.quiz)
+        # A Wednesday
+        finished = timezone.make_aware(datetime(2026, 3, 4, 12))
+        QuizAttempt.objects.filter(pk=attempt.pk).update(end_time=finished)
+        attempt.refresh_from_db()
+        record_attempt(attempt)
+        
+        periods = dict(LeaderboardEntry.objects.filter(quiz=self.quiz).values_list('window', 'period_start'))
+        self.assertEqual(periods, {'all': ALL_TIME_START, 'month': date(2026, 3, 1), 'week': date(2026, 3, 2)})
+        self.assertTrue(board(self.quiz, 'all').exists())
+        self.assertFalse(board(self.quiz, 'week').exists())
+        self.assertTrue(board(self.quiz, 'week', date(2026, 3, 2)).exists())
+    
+    def test_rank_of_follows_the_board(self):
+        first, last, second = self.students
+        for student, correct in ((first, True), (last, False), (second, True)):
+            record_attempt(complete_attempt(student, self.quiz, correct=correct))
+        
+        for quiz in (self.quiz, None):
+            ranked = list(board(quiz, 'all'))
+            self.assertEqual([rank_of(entry) for entry in ranked], [1, 2, 3])
+        self.assertEqual([entry.user for entry in board(self.quiz, 'all')], [first, second, last])
+    
+    def test_rebuild_matches_incremental(self):
+        for index, student in enumerate(self.students):
+            record_attempt(complete_attempt(student, self.quiz, correct=index % 2 == 0))
+        complete_attempt(self.students[0], self.quiz, correct=False)
+        incremental = self.entries()
+        
+        self.assertEqual(rebuild_leaderboards(), 2 * len(WINDOWS) * len(self.students))
+        
+        self.assertNotEqual(self.entries(), incremental)
+        self.assertFalse(QuizAttempt.objects.filter(counted_in_leaderboards=False).exists())
+        rebuilt = self.entries()
+        LeaderboardEntry.objects.all().delete()
+        QuizAttempt.objects.update(counted_in_leaderboards=False)
+        for attempt in QuizAttempt.objects.order_by('end_time', 'pk'):
+            record_attempt(attempt)
+        self.assertEqual(self.entries(), rebuilt)
+    
+    def test_quiz_rebuild_leaves_other_quizzes_pending(self):
+        student = self.students[0]
+        record_attempt(complete_attempt(student, self.quiz))
+        other = Quiz.objects.create(title='Other', description='d', creator=self.teacher)
+        add_questions(other, 2)
+        pending = complete_attempt(student, other)
+        
+        rebuild_leaderboards(self.quiz)
+        
+        pending.refresh_from_db()
+        self.assertFalse(pending.counted_in_leaderboards)
+        self.assertTrue(record_attempt(pending))
+        self.assertEqual([entry.user for entry in board(other, 'all')], [student])
+        overall = board(None, 'all').get()
+        self.assertEqual((overall.attempts, overall.quizzes_completed), (2, 2))
+
+
+class QuizStatsTests(TestCase):
+    """The statistics rollup reproduces known distributions"""
+    
+    def rollup(self, scores, seconds=60, passing_score=50):
+        summary = QuizStats()
+        for score in scores:
+            summary.add_attempt(score, seconds, Decimal(score) >= passing_score)
+        return summary
+    
+    def test_small_distribution(self):
+        summary = self.rollup([0, 50, 50, 100])
+        
+        self.assertEqual(summary.mean_score, Decimal('50.00'))
+        # sqrt((50² + 0 + 0 + 50²) / 4)
+        self.assertEqual(summary.score_stddev, Decimal('35.36'))
+        self.assertEqual(summary.pass_rate, Decimal('75.0'))
+        self.assertEqual(summary.mean_duration, 60)
+        self.assertEqual([summary.percentile_rank(score) for score in (0, 50, 52.5, 100)], [0, 25, 50, 100])
+        self.assertEqual(summary.score_histogram[0], 1)
+        self.assertEqual(summary.score_histogram[10], 2)
+        self.assertEqual(summary.score_histogram[-1], 1)
+    
+    def test_uniform_distribution(self):
+        summary = self.rollup([Decimal(score) + Decimal('0.5') for score in range(100)])
+        
+        self.assertEqual(summary.mean_score, Decimal('50.00'))
+        # Population variance of 100 evenly spaced scores is (100² - 1) / 12
+        self.assertEqual(summary.score_stddev, Decimal('28.87'))
+        for score in (5, 37, 62.5, 99):
+            self.assertEqual(summary.percentile_rank(score), round(Decimal(str(score)), 1))
+    
+    def test_rebuild_matches_incremental(self):
+        cache.clear()
+        answer_keys._local_keys.clear()
+        teacher = make_user('teacher', role='teacher')
+        quiz = Quiz.objects.create(title='Counted', description='d', creator=teacher)
+        add_questions(quiz, 4)
+        for index in range(3):
+            stats.record_attempt(complete_attempt(make_user(f'student{index}'), quiz, correct=index != 1))
+        complete_attempt(make_user('late'), quiz)
+        
+        self.assertEqual(stats.rebuild_stats(quiz), 1)
+        
+        rebuilt = QuizStats.objects.get(quiz=quiz)
+        self.assertEqual((rebuilt.attempt_count, rebuilt.mean_score), (4, Decimal('56.25')))
+        self.assertFalse(QuizAttempt.objects.filter(counted_in_stats=False).exists())
+    
+    def test_constant_scores(self):
+        summary = self.rollup([80] * 7)
+        self.assertEqual(summary.score_stddev, Decimal('0.00'))
+        self.assertIsNone(QuizStats().score_stddev)
+        self.assertIsNone(QuizStats().percentile_rank(50))
+
+
+class ItemAnalysisTests(TestCase):
+    """Item statistics match a small matrix computed by hand"""
+    
+    # Correctness of four attempts on three questions
+    MATRIX = [
+        [1, 1, 1],
+        [1, 1, 0],
+        [1, 0, 0],
+        [0, 0, 0],
+    ]
+    DIFFICULTY = [0.75, 0.5, 0.25]
+    # Correlation of each column with the row total minus that column, e.g.
+    # 0.1875 / (sqrt(0.1875) * sqrt(0.6875)) for the first
+    DISCRIMINATION = [0.522, 0.707, 0.522]
+    
+    def setUp(self):
+        if not analysis.available():
+            self.skipTest('NumPy is not installed')
+    
+    def test_corrected_point_biserial(self):
+        import numpy as np
+        
+        correct = np.array(self.MATRIX, dtype=np.float32)
+        discrimination = analysis._corrected_point_biserial(correct, np.ones(3, dtype=np.float32))
+        self.assertEqual([round(float(value), 3) for value in discrimination], self.DISCRIMINATION)
+        self.assertEqual(list(correct.mean(axis=0)), self.DIFFICULTY)
+    
+    def answer(self, quiz, username, row):
+        """An attempt answering the questions right where row has a 1"""
+        answer_key = quiz.answer_key
+        attempt = QuizAttempt.objects.create(user=make_user(username), quiz=quiz)
+        store_responses(attempt, {
+            question.pk: (sorted(answer_key[question.pk].correct_ids) if right else [question.answers.get(order=2).pk], '')
+            for question, right in zip(quiz.questions.order_by('order'), row)
+        })
+        return attempt
+    
+    def analysed_quiz(self):
+        cache.clear()
+        answer_keys._local_keys.clear()
+        teacher = make_user('teacher', role='teacher')
+        quiz = Quiz.objects.create(title='Analysed', description='d', creator=teacher)
+        add_questions(quiz, 3)
+        return quiz
+    
+    def assertMatchesMatrix(self, quiz, result):
+        questions = list(quiz.questions.order_by('order'))
+        self.assertEqual(result.attempt_count, 4)
+        self.assertEqual([item.question_id for item in result.items], [question.pk for question in questions])
+        self.assertEqual([item.difficulty for item in result.items], self.DIFFICULTY)
+        self.assertEqual([item.discrimination for item in result.items], self.DISCRIMINATION)
+        # The wrong choice of the first question was picked by the lowest scoring attempt only
+        wrong = result.items[0].choices[2]
+        self.assertEqual((wrong.selection_rate, wrong.upper_rate, wrong.lower_rate), (0.25, 0.0, 1.0))
+    
+    def test_compute_item_analysis(self):
+        quiz = self.analysed_quiz()
+        for index, row in enumerate(self.MATRIX):
+            grade_attempt(self.answer(quiz, f'student{index}', row), quiz.answer_key)
+        
+        self.assertMatchesMatrix(quiz, analysis.compute_item_analysis(quiz))
+    
+    def test_attempts_completed_during_the_analysis_are_left_out(self):
+        quiz = self.analysed_quiz()
+        attempts = [self.answer(quiz, f'student{index}', row) for index, row in enumerate(self.MATRIX[:2])]
+        # Between the others by primary key, but only completed once the scores are loaded
+        late = self.answer(quiz, 'late', [1, 1, 1])
+        attempts += [self.answer(quiz, f'student{index}', row) for index, row in enumerate(self.MATRIX[2:], 2)]
+        for attempt in attempts:
+            grade_attempt(attempt, quiz.answer_key)
+        load_scores = analysis._load_scores
+        
+        def load_scores_then_complete(quiz):
+            loaded = load_scores(quiz)
+            grade_attempt(late, quiz.answer_key)
+            return loaded
+        
+        with mock.patch.object(analysis, '_load_scores', load_scores_then_complete):
+            result = analysis.compute_item_analysis(quiz)
+        
+        self.assertMatchesMatrix(quiz, result)
+
+
+class MigrationTests(TransactionTestCase):
+    """Data migrations fill new columns and tables of existing rows"""
+    
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([('quizzes', target)])
+        return executor.loader.project_state([('quizzes', target)]).apps
+    
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+    
+    def tearDown(self):
+        self.migrate_to_latest()
+    
+    def test_existing_attempts_fill_leaderboards_and_statistics(self):
+        apps = self.migrate('0006_regraderun')
+        user = apps.get_model('auth', 'User').objects.create(username='student')
+        quiz = apps.get_model('quizzes', 'Quiz').objects.create(title='Old', description='d', creator_id=user.pk)
+        apps.get_model('quizzes', 'QuizAttempt').objects.create(
+            user_id=user.pk, quiz_id=quiz.pk, status='completed', score=Decimal('80'), end_time=timezone.now(),
+        )
+        
+        self.migrate('0008_quizstats')
+        self.migrate_to_latest()
+        
+        self.assertEqual(sorted(Job.objects.values_list('task', flat=True)), ['rebuild_quiz_leaderboards', 'rebuild_quiz_stats'])
+        work(burst=True)
+        self.assertEqual(board(None, 'all').get().best_score, Decimal('80'))
+        self.assertEqual(QuizStats.objects.get(quiz_id=quiz.pk).attempt_count, 1)
+        self.assertFalse(QuizAttempt.objects.filter(counted_in_leaderboards=False).exists())
+    
+    def test_existing_attempts_get_their_own_shuffle_seed(self):
+        apps = self.migrate('0010_category_updated_at')
+        user = apps.get_model('auth', 'User').objects.create(username='student')
+        quiz = apps.get_model('quizzes', 'Quiz').objects.create(title='Old', description='d', creator_id=user.pk)
+        apps.get_model('quizzes', 'QuizAttempt').objects.bulk_create([
+            apps.get_model('quizzes', 'QuizAttempt')(user_id=user.pk, quiz_id=quiz.pk) for _ in range(20)
+        ])
+        
+        apps = self.migrate('0011_quizattempt_shuffle_seed')
+        
+        seeds = list(apps.get_model('quizzes', 'QuizAttempt').objects.values_list('shuffle_seed', flat=True))
+        self.assertEqual(len(seeds), 20)
+        self.assertNotIn(None, seeds)
+        self.assertGreater(len(set(seeds)), 1)
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """Every page runs a fixed number of queries, however much data there is"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.student = make_user('student')
+        cls.quiz, cls.paged_quiz = seed(cls.teacher, quizzes=2, questions=4, students=2, categories=1)
+        cls.paged_quiz.questions_per_page = 2
+        cls.paged_quiz.save()
+        cls.attempt = complete_attempt(cls.student, cls.quiz)
+        cls.question = cls.quiz.questions.first()
+        work(burst=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def grow(self):
+        """Multiply the data behind every page"""
+        add_questions(self.quiz, 16)
+        add_questions(self.paged_quiz, 16)
+        complete_attempt(self.student, self.quiz, correct=False)
+        seed(self.teacher, quizzes=8, questions=12, students=6, categories=4)
+        work(burst=True)
+        self.quiz.refresh_from_db()
+
+    def pages(self):
+        """(user, method, url, data) of every page in quizzes/urls.py"""
+        quiz, attempt = self.quiz, self.attempt
+        # A fresh attempt every time, so autosaves of the last round do not add queries
+        QuizAttempt.objects.filter(user=self.student, status='in_progress').delete()
+        in_progress = QuizAttempt.objects.create(user=self.student, quiz=quiz)
+        paged = QuizAttempt.objects.create(user=self.student, quiz=self.paged_quiz, page_size=2)
+        autosave = json.dumps({'seq': 1, 'answers': {str(self.question.pk): []}})
+        page = json.dumps({'answers': {}})
+        pages = [
+            (None, 'get', reverse('quizzes:home'), None),
+            (None, 'get', reverse('quizzes:quiz_list'), None),
+            (None, 'get', reverse('quizzes:quiz_list') + '?search=qui', None),
+            (None, 'get', reverse('quizzes:quiz_detail', args=[quiz.pk]), None),
+            (None, 'get', reverse('quizzes:leaderboard'), None),
+            (None, 'get', reverse('quizzes:quiz_leaderboard', args=[quiz.pk]), None),
+            (self.student, 'get', reverse('quizzes:home'), None),
+            (self.student, 'get', reverse('quizzes:quiz_list'), None),
+            (self.student, 'get', reverse('quizzes:quiz_list') + f'?category={quiz.category_id}&search=qui', None),
+            (self.student, 'get', reverse('quizzes:leaderboard') + '?window=week', None),
+            (self.student, 'get', reverse('quizzes:quiz_leaderboard', args=[quiz.pk]), None),
+            (self.student, 'get', reverse('quizzes:dashboard'), None),
+            (self.teacher, 'get', reverse('quizzes:dashboard'), None),
+            (self.student, 'get', reverse('quizzes:quiz_detail', args=[quiz.pk]), None),
+            (self.student, 'get', reverse('quizzes:quiz_take', args=[quiz.pk]), None),
+            (self.student, 'post', reverse('quizzes:attempt_autosave', args=[quiz.pk, in_progress.pk]), autosave),
+            (self.student, 'get', reverse('quizzes:quiz_take', args=[self.paged_quiz.pk]) + '?page=2', None),
+            (self.student, 'get', reverse('quizzes:attempt_page', args=[self.paged_quiz.pk, paged.pk, 2]), None),
+            (self.student, 'post', reverse('quizzes:attempt_page', args=[self.paged_quiz.pk, paged.pk, 2]), page),
+            (self.student, 'get', reverse('quizzes:quiz_result', args=[quiz.pk, attempt.pk]), None),
+            (self.teacher, 'get', reverse('quizzes:quiz_result', args=[quiz.pk, attempt.pk]), None),
+            (self.student, 'get', reverse('quizzes:quiz_history'), None),
+            (self.teacher, 'get', reverse('quizzes:quiz_create'), None),
+            (self.teacher, 'get', reverse('quizzes:quiz_edit', args=[quiz.pk]), None),
+            (self.teacher, 'get', reverse('quizzes:quiz_delete', args=[quiz.pk]), None),
+            (self.teacher, 'get', reverse('quizzes:quiz_manage_questions', args=[quiz.pk]), None),
+            (self.teacher, 'get', reverse('quizzes:quiz_reports', args=[quiz.pk]), None),
+            (self.teacher, 'post', reverse('quizzes:quiz_regrade', args=[quiz.pk]), None),
+            (self.teacher, 'get', reverse('quizzes:question_create', args=[quiz.pk]), None),
+            (self.teacher, 'get', reverse('quizzes:question_edit', args=[self.question.pk]), None),
+            (self.teacher, 'get', reverse('quizzes:question_delete', args=[self.question.pk]), None),
+            (self.student, 'get', reverse('quizzes:api_category_list'), None),
+            (self.student, 'get', reverse('quizzes:api_quiz_list'), None),
+            (self.student, 'get', reverse('quizzes:api_attempt_list'), None),
+            (self.teacher, 'get', reverse('quizzes:api_attempt_list') + f'?quiz={quiz.pk}', None),
+            (self.teacher, 'get', reverse('quizzes:api_result_list') + f'?quiz={quiz.pk}&limit=5', None),
+        ]
+        if analysis.available():
+            pages.append((self.teacher, 'get', reverse('quizzes:quiz_item_analysis_csv', args=[quiz.pk]), None))
+        return pages
+
+    def measure(self):
+        """Query count of every page, failing for pages over their budget"""
+        counts = {}
+        for index, (user, method, url, data) in enumerate(self.pages()):
+            cache.clear()
+            if user:
+                self.client.force_login(user)
+            else:
+                self.client.logout()
+            if method == 'post' and data:
+                response = self.client.post(url, data, content_type='application/json')
+            else:
+                response = getattr(self.client, method)(url)
+            self.assertIn(response.status_code, (200, 302), url)
+            self.assertIsNotNone(getattr(resolve(url.split('?')[0]).func, 'query_budget', None), f'{url} has no query budget')
+            # Keyed by position, the URL of the fresh in-progress attempt changes
+            name = resolve(url.split('?')[0]).url_name
+            counts[(index, user.username if user else None, method, name)] = int(response['X-Query-Count'])
+        return counts
+
+    def test_query_counts_do_not_grow_with_data(self):
+        before = self.measure()
+        self.grow()
+        after = self.measure()
+        self.assertEqual(before, after)
+
+    def test_submission_does_not_grow_with_questions(self):
+        counts = []
+        for questions in (4, 40):
+            quiz = Quiz.objects.create(title=f'Submit {questions}', description='d', creator=self.teacher)
+            add_questions(quiz, questions)
+            self.client.force_login(self.student)
+            url = reverse('quizzes:quiz_take', args=[quiz.pk])
+            self.client.get(url)
+            cache.clear()
+            data = {f'question_{question.pk}': [question.answers.first().pk] for question in quiz.questions.all()}
+            response = self.client.post(url, data)
+            self.assertEqual(response.status_code, 302)
+            counts.append(int(response['X-Query-Count']))
+        self.assertEqual(counts[0], counts[1])
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_over_budget_is_logged(self):
+        view = resolve(reverse('quizzes:home')).func
+        budget = view.query_budget
+        view.query_budget = 0
+        try:
+            with self.assertLogs('quiz_platform.query_budget', level='WARNING'):
+                self.client.get(reverse('quizzes:home'))
+        finally:
+            view.query_budget = budget
+
+
+class QueryPlanTests(TestCase):
+    """The hot queries are answered from an index, without scanning or sorting a large table"""
+
+    LARGE_TABLES = ('quizzes_quiz', 'quizzes_quizattempt')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.student = make_user('student')
+        cls.quiz = seed(cls.teacher, quizzes=3, questions=2, students=2, categories=2)[0]
+        complete_attempt(cls.student, cls.quiz)
+
+    def problems(self, queryset):
+        """Lines of the query plan that scan or sort one of the large tables"""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Scanning the tiny test tables is cheaper, so make any avoidable scan or sort lose
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_sort = off')
+            patterns = [rf'Seq Scan on {table}\b' for table in self.LARGE_TABLES] + [r'\bSort\b']
+        elif connection.vendor == 'sqlite':
+            patterns = [rf'\bSCAN {table}\b(?!.*USING)' for table in self.LARGE_TABLES] + [r'USE TEMP B-TREE']
+        else:
+            self.skipTest(f'No plan checks for {connection.vendor}')
+        return [
+            line for line in queryset.explain().splitlines()
+            if any(re.search(pattern, line) for pattern in patterns)
+        ]
+
+    def queries(self):
+        """The queries behind the busiest pages, named after them"""
+        quizzes = Quiz.objects.filter(is_active=True, is_public=True)
+        newest = self.quiz.created_at
+        attempts = QuizAttempt.objects.filter(user=self.student)
+        return {
+            'home': quizzes.select_related('category')[:6],
+            'catalog': quizzes.order_by('-created_at', '-id')[:PAGE_SIZE + 1],
+            'catalog next page': quizzes.filter(
+                Q(created_at__lt=newest) | Q(created_at=newest, id__lt=self.quiz.pk)
+            ).order_by('-created_at', '-id')[:PAGE_SIZE + 1],
+            'catalog by category': quizzes.filter(category=self.quiz.category).order_by('-created_at', '-id')[:PAGE_SIZE + 1],
+            'teacher dashboard': Quiz.objects.filter(creator=self.teacher).order_by('-created_at', '-id')[:PAGE_SIZE + 1],
+            'detail and take': attempts.filter(quiz=self.quiz, status='completed'),
+            'in-progress attempt': attempts.filter(quiz=self.quiz, status='in_progress'),
+            'student dashboard': attempts.order_by('-start_time')[:5],
+            'history': attempts.filter(status='completed').order_by('-start_time', '-id')[:PAGE_SIZE + 1],
+            'reports': QuizAttempt.objects.filter(quiz=self.quiz, status='completed').order_by('-end_time', '-id')[:11],
+        }
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.queries().items():
+            with self.subTest(name):
+                self.assertEqual(self.problems(queryset), [])
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_STRICT=True)
+class AsyncViewTests(TestCase):
+    """The async versions of the read-heavy pages render what the sync ones do"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.student = make_user('student')
+        cls.quiz = seed(cls.teacher, quizzes=2, questions=4, students=2, categories=2)[0]
+        cls.attempt = complete_attempt(cls.student, cls.quiz)
+        work(burst=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def urls(self):
+        quiz, attempt = self.quiz, self.attempt
+        return [
+            (None, reverse('quizzes:home')),
+            (self.student, reverse('quizzes:home')),
+            (self.student, reverse('quizzes:quiz_list')),
+            (self.student, reverse('quizzes:quiz_list') + f'?category={quiz.category_id}&search=quiz'),
+            (None, reverse('quizzes:quiz_detail', args=[quiz.pk])),
+            (self.student, reverse('quizzes:quiz_detail', args=[quiz.pk])),
+            (self.student, reverse('quizzes:leaderboard') + '?window=week'),
+            (self.student, reverse('quizzes:quiz_leaderboard', args=[quiz.pk])),
+            (self.student, reverse('quizzes:quiz_result', args=[quiz.pk, attempt.pk])),
+            (self.teacher, reverse('quizzes:quiz_result', args=[quiz.pk, attempt.pk])),
+            (None, reverse('quizzes:quiz_result', args=[quiz.pk, attempt.pk])),
+        ]
+
+    def responses(self):
+        responses = []
+        for user, url in self.urls():
+            if user:
+                self.client.force_login(user)
+            else:
+                self.client.logout()
+            response = self.client.get(url)
+            # CSRF tokens are masked differently on every request
+            responses.append((response.status_code, re.sub(r'value="[^"]{64}"', '', response.content.decode())))
+        return responses
+
+    def test_async_views_match_sync_views(self):
+        expected = self.responses()
+        with serving(async_views.ASYNC_URL_NAMES):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(reverse('quizzes:home')).func))
+            self.assertEqual(self.responses(), expected)
+        self.assertFalse(asyncio.iscoroutinefunction(resolve(reverse('quizzes:home')).func))
+
+    async def test_async_client(self):
+        await self.async_client.aforce_login(self.student)
+        with serving(['quiz_result']):
+            url = reverse('quizzes:quiz_result', args=[self.quiz.pk, self.attempt.pk])
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func))
+            response = await self.async_client.get(url)
+        self.assertContains(response, self.quiz.title)
+
+
+@override_settings(QUIZ_READ_REPLICAS=['replica'], QUIZ_REPLICA_MAX_LAG=5)
+class ReplicaRoutingTests(TestCase):
+    """Reads of read_replica views go to a replica, unless it lags or the visitor just wrote"""
+
+    def setUp(self):
+        # There is no replica database here, so its lag is given instead of measured
+        replicas._lag_checks['replica'] = (time.monotonic(), 0.0)
+
+    def tearDown(self):
+        replicas._lag_checks.clear()
+
+    def test_reads_in_replica_reads_go_to_the_replica(self):
+        self.assertEqual(router.db_for_read(Quiz), 'default')
+        with replicas.replica_reads():
+            self.assertEqual(router.db_for_read(Quiz), 'replica')
+            for model in (Session, User, UserProfile):
+                self.assertEqual(router.db_for_read(model), 'default')
+            self.assertEqual(router.db_for_write(Quiz), 'default')
+        self.assertEqual(router.db_for_read(Quiz), 'default')
+
+        with override_settings(QUIZ_READ_REPLICAS=[]), replicas.replica_reads():
+            self.assertEqual(router.db_for_read(Quiz), 'default')
+
+    def test_lagging_replica_is_skipped(self):
+        replicas._lag_checks['replica'] = (time.monotonic(), 30.0)
+        with replicas.replica_reads():
+            self.assertEqual(router.db_for_read(Quiz), 'default')
+        with override_settings(QUIZ_REPLICA_MAX_LAG=60), replicas.replica_reads():
+            self.assertEqual(router.db_for_read(Quiz), 'replica')
+
+    def test_sqlite_lag(self):
+        with tempfile.TemporaryDirectory() as directory:
+            primary, replica = Path(directory, 'db.sqlite3'), Path(directory, 'replica.sqlite3')
+            for path, modified in ((primary, 990), (replica, 1000)):
+                path.touch()
+                os.utime(path, (modified, modified))
+            self.assertEqual(replicas._sqlite_lag(primary, replica), 0)
+
+            wal = Path(directory, 'db.sqlite3-wal')
+            wal.touch()
+            os.utime(wal, (1012, 1012))
+            self.assertEqual(replicas._sqlite_lag(primary, replica), 12)
+
+    def test_recent_writers_read_from_the_primary(self):
+        view = replicas.read_replica(lambda request: HttpResponse(router.db_for_read(Quiz)))
+        request = RequestFactory().get('/')
+        self.assertEqual(view(request).content, b'replica')
+
+        request.COOKIES[replicas.RECENT_WRITE_COOKIE] = str(time.time())
+        self.assertEqual(view(request).content, b'default')
+
+        request.COOKIES[replicas.RECENT_WRITE_COOKIE] = str(time.time() - 60)
+        self.assertEqual(view(request).content, b'replica')
+
+    def test_request_user_is_read_from_the_primary(self):
+        user = make_user('student')
+        request = RequestFactory().get('/')
+        request.user = SimpleLazyObject(lambda: User.objects.select_related('profile').get(pk=user.pk))
+        view = replicas.read_replica(lambda request: HttpResponse(
+            f'{router.db_for_read(Quiz)} {request.user._state.db} {request.user.profile._state.db}'
+        ))
+        self.assertEqual(view(request).content, b'replica default default')
+
+    async def test_async_view(self):
+        async def view(request):
+            return HttpResponse(await sync_to_async(router.db_for_read)(Quiz))
+
+        response = await replicas.read_replica(view)(RequestFactory().get('/'))
+        self.assertEqual(response.content, b'replica')
+
+    def test_writes_mark_the_visitor(self):
+        response = self.client.get(reverse('accounts:login'))
+        self.assertNotIn(replicas.RECENT_WRITE_COOKIE, response.cookies)
+
+        response = self.client.post(reverse('accounts:login'), {'username': 'nobody', 'password': 'wrong'})
+        self.assertIn(replicas.RECENT_WRITE_COOKIE, response.cookies)
+
+        # The next report is read from the primary, the only database there is here
+        response = self.client.get(reverse('quizzes:leaderboard'))
+        self.assertEqual(response.status_code, 200)
+
+
+class LockRetryTests(TestCase):
+    """Submissions survive a locked database"""
+
+    def flaky(self, failures, message='database is locked'):
+        calls = []
+
+        @retry_on_lock
+        def write():
+            calls.append(None)
+            if len(calls) <= failures:
+                raise OperationalError(message)
+            return len(calls)
+        return write, calls
+
+    def test_retries_until_the_lock_is_free(self):
+        write, calls = self.flaky(failures=2)
+        with self.assertLogs('quiz_platform.locking', 'WARNING') as logs:
+            self.assertEqual(write(), 3)
+        self.assertEqual(len(logs.output), 2)
+
+    def test_gives_up_after_the_last_try(self):
+        write, calls = self.flaky(failures=LOCK_RETRY_ATTEMPTS)
+        with self.assertLogs('quiz_platform.locking', 'WARNING'), self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), LOCK_RETRY_ATTEMPTS)
+
+    def test_other_errors_are_not_retried(self):
+        write, calls = self.flaky(failures=1, message='no such table: quizzes_quiz')
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 1)
+
+    def test_sqlite_profile(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest(f'No SQLite profile for {connection.vendor}')
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            # NORMAL
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.science = Category.objects.create(name='Science')
+        cls.quizzes = {
+            title: Quiz.objects.create(
+                title=title, description=description, creator=cls.teacher, category=category, difficulty=difficulty
+            )
+            for title, description, category, difficulty in [
+                ('Photosynthesis basics', 'Plants and light', cls.science, 'easy'),
+                ('Cell biology', 'Covers photosynthesis in one question', cls.science, 'hard'),
+                ('Photography', 'Cameras and lenses', None, 'easy'),
+            ]
+        }
+    
+    def find(self, text, **filters):
+        titles = {quiz.pk: title for title, quiz in self.quizzes.items()}
+        return [titles[pk] for pk in search.find(text, **filters)]
+    
+    def test_ranked_prefix_matches(self):
+        self.assertEqual(self.find('photosynth'), ['Photosynthesis basics', 'Cell biology'])
+        self.assertCountEqual(self.find('photo'), ['Photosynthesis basics', 'Cell biology', 'Photography'])
+        self.assertEqual(self.find('photo cam'), ['Photography'])
+        self.assertEqual(self.find('"*:-'), [])
+    
+    def test_filters(self):
+        self.assertEqual(self.find('photo', category=self.science, difficulty='hard'), ['Cell biology'])
+        self.assertCountEqual(self.find('photo', difficulty='easy'), ['Photosynthesis basics', 'Photography'])
+    
+    def test_index_follows_saves_and_deletes(self):
+        quiz = self.quizzes['Photography']
+        quiz.is_public = False
+        quiz.save()
+        self.assertNotIn('Photography', self.find('photo'))
+        
+        quiz = self.quizzes['Cell biology']
+        quiz.title = 'Genetics'
+        quiz.description = 'Genes'
+        quiz.save()
+        self.assertEqual(self.find('photo'), ['Photosynthesis basics'])
+        
+        self.quizzes['Photosynthesis basics'].delete()
+        self.assertEqual(search.find('photo'), [])
+        
+        Quiz.objects.filter(pk=quiz.pk).update(title='Photons')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.find('photon'), ['Cell biology'])
+    
+    def test_migration_backfills_the_index_like_rebuild(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Compares the SQLite index')
+        migration = import_module('quizzes.migrations.0009_quiz_search')
+        Quiz.objects.filter(title='Photography').update(is_active=False)
+        
+        def index():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT rowid, title, description, facets FROM {search.TABLE} ORDER BY rowid')
+                return cursor.fetchall()
+        
+        search.rebuild(Quiz.objects.all())
+        rebuilt = index()
+        schema_editor = mock.Mock(connection=connection, execute=lambda sql: connection.cursor().execute(sql))
+        migration.drop_index(None, schema_editor)
+        migration.create_index(None, schema_editor)
+        self.assertEqual(index(), rebuilt)
+        self.assertEqual(len(rebuilt), 3)
+    
+    def test_quiz_list(self):
+        response = self.client.get(reverse('quizzes:quiz_list'), {'search': 'photosynthesis'})
+        self.assertEqual(
+            [quiz.title for quiz in response.context['quizzes']], ['Photosynthesis basics', 'Cell biology']
+        )
+
+
+class PaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.category = Category.objects.create(name='Science')
+        # Quizzes with equal timestamps are ordered by id
+        quizzes = Quiz.objects.bulk_create([
+            Quiz(title=f'Quiz {index}', description='d', creator=cls.teacher,
+                 category=cls.category if index % 2 else None)
+            for index in range(PAGE_SIZE * 3)
+        ])
+        Quiz.objects.filter(pk__in=[quiz.pk for quiz in quizzes[:10]]).update(created_at='2020-01-01T00:00:00Z')
+        search.index_quizzes(Quiz.objects.all())
+    
+    def walk(self, params):
+        """Titles of every page following the next links, then of the pages back following the previous links"""
+        forward, backward, pages = [], [], []
+        response = self.client.get(reverse('quizzes:quiz_list'), params)
+        while True:
+            pages.append(response.context['page'])
+            forward.append([quiz.title for quiz in response.context['quizzes']])
+            if not pages[-1].next_query:
+                break
+            response = self.client.get(reverse('quizzes:quiz_list') + '?' + pages[-1].next_query)
+        while pages[-1].previous_query:
+            response = self.client.get(reverse('quizzes:quiz_list') + '?' + pages[-1].previous_query)
+            pages.append(response.context['page'])
+            backward.append([quiz.title for quiz in response.context['quizzes']])
+        return forward, backward
+    
+    def test_pages_cover_the_list_once(self):
+        expected = [quiz.title for quiz in Quiz.objects.order_by('-created_at', '-id')]
+        forward, backward = self.walk({})
+        self.assertEqual([len(page) for page in forward], [PAGE_SIZE] * 3)
+        self.assertEqual(sum(forward, []), expected)
+        self.assertEqual(backward, forward[-2::-1])
+    
+    def test_filters_are_kept(self):
+        expected = [quiz.title for quiz in Quiz.objects.filter(category=self.category).order_by('-created_at', '-id')]
+        forward, _ = self.walk({'category': self.category.pk})
+        self.assertEqual(sum(forward, []), expected)
+        
+        forward, backward = self.walk({'search': 'quiz'})
+        self.assertEqual(len(sum(forward, [])), PAGE_SIZE * 3)
+        self.assertEqual(backward, forward[-2::-1])
+    
+    def test_search_pages_past_one_index_query(self):
+        Quiz.objects.bulk_create([
+            Quiz(title=f'Extra quiz {index}', description='d', creator=self.teacher)
+            for index in range(search.MAX_RESULTS - PAGE_SIZE * 3 + 5)
+        ])
+        search.index_quizzes(Quiz.objects.filter(title__startswith='Extra'))
+        
+        forward, backward = self.walk({'search': 'quiz'})
+        
+        titles = sum(forward, [])
+        self.assertEqual(len(titles), search.MAX_RESULTS + 5)
+        self.assertEqual(set(titles), set(Quiz.objects.values_list('title', flat=True)))
+        self.assertEqual(backward, forward[-2::-1])
+    
+    def test_cursor_of_other_filters_starts_over(self):
+        page = self.client.get(reverse('quizzes:quiz_list')).context['page']
+        cursor = page.next_query.split('cursor=')[1]
+        response = self.client.get(reverse('quizzes:quiz_list'), {'category': self.category.pk, 'cursor': cursor})
+        self.assertFalse(response.context['page'].previous_query)
+        response = self.client.get(reverse('quizzes:quiz_list'), {'cursor': 'garbage'})
+        self.assertFalse(response.context['page'].previous_query)
+    
+    def test_deep_pages_do_not_offset(self):
+        page = self.client.get(reverse('quizzes:quiz_list')).context['page']
+        page = self.client.get(reverse('quizzes:quiz_list') + '?' + page.next_query).context['page']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('quizzes:quiz_list') + '?' + page.next_query)
+        self.assertFalse([query for query in queries if 'OFFSET' in query['sql']])
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.student = make_user('student')
+        cls.other = make_user('other')
+        cls.quiz = Quiz.objects.create(title='Public', description='d', creator=cls.teacher)
+        cls.private = Quiz.objects.create(title='Private', description='d', creator=cls.teacher, is_public=False)
+        add_questions(cls.quiz, 4)
+        cls.attempts = [complete_attempt(cls.student, cls.quiz, correct=index % 2 == 0) for index in range(3)]
+        complete_attempt(cls.other, cls.quiz)
+    
+    def get(self, name, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse(f'quizzes:{name}'), params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+    
+    def test_access(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('quizzes:api_quiz_list')).status_code, 401)
+        
+        titles = [quiz['title'] for quiz in self.get('api_quiz_list', self.student)['results']]
+        self.assertEqual(titles, ['Public'])
+        titles = [quiz['title'] for quiz in self.get('api_quiz_list', self.teacher)['results']]
+        self.assertEqual(titles, ['Public', 'Private'])
+        
+        users = {attempt['user'] for attempt in self.get('api_attempt_list', self.student)['results']}
+        self.assertEqual(users, {'student'})
+        users = {attempt['user'] for attempt in self.get('api_attempt_list', self.teacher)['results']}
+        self.assertEqual(users, {'student', 'other'})
+    
+    def test_sparse_fields_and_bulk_ids(self):
+        data = self.get('api_result_list', self.student, fields='score,answers',
+                        ids=f'{self.attempts[0].pk},{self.attempts[2].pk}')
+        self.assertEqual([set(result) for result in data['results']], [{'id', 'score', 'answers'}] * 2)
+        self.assertEqual([result['id'] for result in data['results']], [self.attempts[0].pk, self.attempts[2].pk])
+        self.assertEqual(data['results'][0]['score'], float(self.attempts[0].score))
+        self.assertEqual(len(data['results'][0]['answers']), 4)
+        self.assertIsNone(data['next'])
+        
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('quizzes:api_quiz_list'), {'fields': 'title,secret'})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_cursor_pagination(self):
+        data = self.get('api_result_list', self.teacher, limit=3, fields='user')
+        self.assertEqual(len(data['results']), 3)
+        response = self.client.get(data['next'])
+        rest = json.loads(response.content)
+        self.assertEqual([set(result) for result in rest['results']], [{'id', 'user'}])
+        self.assertIsNone(rest['next'])
+    
+    def test_gzip(self):
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('quizzes:api_result_list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.category = Category.objects.create(name='Science')
+        cls.quiz = Quiz.objects.create(title='Cells', description='d', creator=cls.teacher, category=cls.category)
+        Quiz.objects.create(title='Atoms', description='d', creator=cls.teacher)
+    
+    def setUp(self):
+        cache.clear()
+    
+    def list_page(self):
+        return self.client.get(reverse('quizzes:quiz_list')).content.decode()
+    
+    def test_fragments_are_reused(self):
+        first = self.list_page()
+        self.assertEqual(fragments.stats(), (0, 2, 0.0))
+        self.assertEqual(self.list_page(), first)
+        self.assertEqual(fragments.stats(), (2, 2, 0.5))
+        
+        call_command('fragment_cache_stats', reset=True, stdout=StringIO())
+        self.assertEqual(fragments.stats(), (0, 0, None))
+    
+    def test_changes_invalidate_fragments(self):
+        self.list_page()
+        self.client.get(reverse('quizzes:quiz_detail', args=[self.quiz.pk]))
+        
+        self.category.name = 'Biology'
+        self.category.save()
+        self.assertIn('Biology', self.list_page())
+        
+        add_questions(self.quiz, 3)
+        self.assertIn('3 questions', self.list_page())
+        
+        quiz = Quiz.objects.get(pk=self.quiz.pk)
+        quiz.description = 'All about membranes'
+        quiz.save()
+        self.assertIn('All about membranes', self.client.get(reverse('quizzes:quiz_detail', args=[quiz.pk])).content.decode())
+
+
+class TakeBundleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.student = make_user('student')
+        cls.quiz = Quiz.objects.create(
+            title='Shuffled', description='d', creator=cls.teacher, randomize_questions=True, randomize_answers=True
+        )
+        add_questions(cls.quiz, 12)
+    
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+    
+    def order(self, questions):
+        return [(question['id'], [answer['id'] for answer in question['answers']]) for question in questions]
+    
+    def take(self):
+        return self.order(self.client.get(reverse('quizzes:quiz_take', args=[self.quiz.pk])).context['questions'])
+    
+    def test_order_is_fixed_per_attempt(self):
+        first = self.take()
+        self.assertEqual(self.take(), first)
+        self.assertNotEqual([question for question, _ in first], sorted(question for question, _ in first))
+        
+        attempt = QuizAttempt.objects.get(user=self.student, quiz=self.quiz)
+        other = QuizAttempt(shuffle_seed=attempt.shuffle_seed + 1)
+        self.assertNotEqual(self.order(arrange(self.quiz, other)), first)
+    
+    def test_warm_page_loads_no_questions(self):
+        self.take()
+        with CaptureQueriesContext(connection) as queries:
+            self.take()
+        tables = [query['sql'] for query in queries if 'quizzes_question' in query['sql'] or 'quizzes_answer' in query['sql']]
+        self.assertEqual(tables, [])
+    
+    def test_bundle_follows_question_changes(self):
+        self.take()
+        question = self.quiz.questions.first()
+        question.text = 'Reworded'
+        question.save()
+        response = self.client.get(reverse('quizzes:quiz_take', args=[self.quiz.pk]))
+        self.assertContains(response, 'Reworded')
+
+
+class PagedTakeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('teacher', role='teacher')
+        cls.student = make_user('student')
+        cls.quiz = Quiz.objects.create(
+            title='Long', description='d', creator=cls.teacher, randomize_questions=True, questions_per_page=5
+        )
+        add_questions(cls.quiz, 12)
+    
+    def setUp(self):
+        # Quiz ids of other tests are reused after their rollback, drop their bundles and keys
+        cache.clear()
+        answer_keys._local_keys.clear()
+        bundles._local_bundles.clear()
+        self.client.force_login(self.student)
+        self.url = reverse('quizzes:quiz_take', args=[self.quiz.pk])
+    
+    def page(self, number):
+        response = self.client.get(f'{self.url}?page={number}')
+        return [question['id'] for question in response.context['questions']]
+    
+    def test_pages_split_the_attempt_order(self):
+        pages = [self.page(number) for number in (1, 2, 3)]
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        attempt = QuizAttempt.objects.get(user=self.student, quiz=self.quiz)
+        self.assertEqual(attempt.page_size, 5)
+        self.assertEqual(sum(pages, []), [question['id'] for question in arrange(self.quiz, attempt)])
+        self.assertEqual(self.page(99), pages[2])
+        
+        fragment = self.client.get(reverse('quizzes:attempt_page', args=[self.quiz.pk, attempt.pk, 2]))
+        self.assertEqual(fragment.content.decode().count('class="question-container"'), 5)
+        self.assertNotContains(fragment, '<html')
+    
+    def test_answers_persist_per_page_and_submit_only_finalizes(self):
+        first, second = self.page(1), self.page(2)
+        attempt = QuizAttempt.objects.get(user=self.student, quiz=self.quiz)
+        answer_key = self.quiz.answer_key
+        
+        def correct(question_id):
+            return sorted(answer_key[question_id].correct_ids)
+        
+        data = {'page': 1, 'action': 'next'}
+        data.update({f'question_{question_id}': correct(question_id) for question_id in first})
+        response = self.client.post(self.url, data)
+        self.assertRedirects(response, f'{self.url}?page=2')
+        self.assertEqual(UserAnswer.objects.filter(attempt=attempt).count(), 5)
+        
+        payload = json.dumps({'answers': {str(question_id): correct(question_id) for question_id in second}})
+        response = self.client.post(
+            reverse('quizzes:attempt_page', args=[self.quiz.pk, attempt.pk, 2]), payload, content_type='application/json'
+        )
+        self.assertEqual(response.json(), {'saved': 2})
+        saved = self.client.get(f'{self.url}?page=2').context['questions'][0]['saved_answer_ids']
+        self.assertEqual(sorted(saved), correct(second[0]) if answer_key[second[0]].question_type != 'text' else [])
+        
+        # The last page is submitted empty, the earlier pages are kept and graded
+        response = self.client.post(self.url, {'page': 3, 'action': 'submit'})
+        self.assertRedirects(response, reverse('quizzes:quiz_result', args=[self.quiz.pk, attempt.pk]), fetch_redirect_response=False)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.status, 'completed')
+        text_questions = sum(1 for question_id in first + second if answer_key[question_id].question_type == 'text')
+        self.assertEqual(attempt.points_earned, 2 * (10 - text_questions))
+        self.assertEqual(UserAnswer.objects.filter(attempt=attempt).count(), 12)
+    
+    def test_page_cost_does_not_grow_with_the_quiz(self):
+        counts = []
+        for questions in (12, 60):
+            add_questions(self.quiz, questions - self.quiz.questions.count())
+            QuizAttempt.objects.filter(quiz=self.quiz).delete()
+            self.quiz.refresh_from_db()
+            self.page(1)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'{self.url}?page=2')
+            counts.append((len(queries), len(response.context['questions'])))
+        self.assertEqual(counts[0], counts[1])
+    
+    def test_large_quizzes_are_paged_by_default(self):
+        self.assertIsNone(page_size_for(Quiz(question_count=PAGED_TAKE_THRESHOLD)))
+        self.assertEqual(page_size_for(Quiz(question_count=PAGED_TAKE_THRESHOLD + 1)), DEFAULT_QUESTIONS_PER_PAGE)
+        self.assertEqual(page_size_for(Quiz(question_count=3, questions_per_page=1)), 1)
+
+
+class LoadSampleDataTests(TestCase):
+    def generated(self):
+        return list(
+            QuizAttempt.objects.filter(user__username__startswith='s7_')
+            .order_by('end_time').values_list('user__username', 'quiz__title', 'score', 'points_earned')
+        )
+
+    def test_generated_dataset_is_deterministic(self):
+        call_command('load_sample_data', users=60, quizzes=3, attempts=200, seed=7, batch_size=50, stdout=StringIO())
+        first = self.generated()
+        self.assertEqual(len(first), 200)
+        self.assertEqual(User.objects.filter(username__startswith='s7_', profile__role='teacher').count(), 2)
+        self.assertEqual(QuizStats.objects.filter(quiz__title__startswith='Sample quiz s7-').count(), 3)
+        for quiz in Quiz.objects.filter(title__startswith='Sample quiz s7-'):
+            self.assertEqual(quiz.question_count, quiz.questions.count())
+        
+        # Stored results agree with grading the stored answers
+        attempt = QuizAttempt.objects.filter(user__username__startswith='s7_').first()
+        points = attempt.points_earned
+        attempt.calculate_score()
+        self.assertEqual(attempt.points_earned, points)
+        
+        # Generated start times are kept, other saves still get the current time
+        generated = QuizAttempt.objects.filter(user__username__startswith='s7_')
+        self.assertFalse(generated.filter(start_time__gte=F('end_time')).exists())
+        self.assertGreater(generated.values('start_time').distinct().count(), 190)
+        started = timezone.now()
+        self.assertGreaterEqual(QuizAttempt.objects.create(user=attempt.user, quiz=attempt.quiz).start_time, started)
+        
+        with self.assertRaises(CommandError):
+            call_command('load_sample_data', users=1, seed=7, stdout=StringIO())
+        
+        User.objects.filter(username__startswith='s7_').delete()
+        call_command('load_sample_data', users=60, quizzes=3, attempts=200, seed=7, batch_size=50, stdout=StringIO())
+        self.assertEqual(first, self.generated())
+
+
+class LoadTestTests(LiveServerTestCase):
+    def test_students_complete_sessions(self):
+        teacher = make_user('teacher', role='teacher')
+        quiz = Quiz.objects.create(title='Exam', description='d', creator=teacher)
+        add_questions(quiz, 4)
+        students = [make_user(f'student{index}') for index in range(3)]
+        
+        load_test = LoadTest(
+            self.live_server_url, reverse('accounts:login'), reverse('quizzes:quiz_take', args=[quiz.pk]),
+            [(student.username, 'secret-pass-123') for student in students],
+            pattern='deadline', duration=0.5, think=0.5, burst=0.2,
+        )
+        summary = asyncio.run(load_test.run()).summary()
+        
+        self.assertEqual(summary['completed_sessions'], 3)
+        self.assertEqual(summary['total']['errors'], {})
+        self.assertEqual(summary['steps']['submit']['requests'], 3)
+        self.assertEqual(QuizAttempt.objects.filter(quiz=quiz, status='completed').count(), 3)
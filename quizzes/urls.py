@@ -1,20 +1,36 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
 
 app_name = 'quizzes'
 
+
+def page(route, view, name):
+    """
+    path() serving the async version of view instead when QUIZ_ASYNC_VIEWS lists name.
+
+    The setting is read once, when the URLconf is imported, so changing it
+    takes a restart.
+    """
+    if name in getattr(settings, 'QUIZ_ASYNC_VIEWS', ()):
+        view = getattr(async_views, view.__name__)
+    return path(route, view, name=name)
+
+
 urlpatterns = [
     # Public views
-    path('', views.home_view, name='home'),
-    path('quizzes/', views.quiz_list_view, name='quiz_list'),
-    path('quiz/<int:pk>/', views.quiz_detail_view, name='quiz_detail'),
-    path('leaderboard/', views.leaderboard_view, name='leaderboard'),
-    path('leaderboard/<int:pk>/', views.leaderboard_view, name='quiz_leaderboard'),
+    page('', views.home_view, 'home'),
+    page('quizzes/', views.quiz_list_view, 'quiz_list'),
+    page('quiz/<int:pk>/', views.quiz_detail_view, 'quiz_detail'),
+    page('leaderboard/', views.leaderboard_view, 'leaderboard'),
+    page('leaderboard/<int:pk>/', views.leaderboard_view, 'quiz_leaderboard'),
     
     # Student views
     path('dashboard/', views.dashboard_view, name='dashboard'),
     path('quiz/<int:pk>/take/', views.quiz_take_view, name='quiz_take'),
-    path('quiz/<int:pk>/result/<int:attempt_pk>/', views.quiz_result_view, name='quiz_result'),
+    path('quiz/<int:pk>/attempt/<int:attempt_pk>/autosave/', views.attempt_autosave_view, name='attempt_autosave'),
+    path('quiz/<int:pk>/attempt/<int:attempt_pk>/page/<int:number>/', views.attempt_page_view, name='attempt_page'),
+    page('quiz/<int:pk>/result/<int:attempt_pk>/', views.quiz_result_view, 'quiz_result'),
     path('history/', views.quiz_history_view, name='quiz_history'),
     
     # Teacher views - Quiz management
@@ -23,9 +39,17 @@ urlpatterns = [
     path('quiz/<int:pk>/delete/', views.quiz_delete_view, name='quiz_delete'),
     path('quiz/<int:pk>/questions/', views.quiz_manage_questions_view, name='quiz_manage_questions'),
     path('quiz/<int:pk>/reports/', views.quiz_reports_view, name='quiz_reports'),
+    path('quiz/<int:pk>/reports/items.csv', views.quiz_item_analysis_csv_view, name='quiz_item_analysis_csv'),
+    path('quiz/<int:pk>/regrade/', views.quiz_regrade_view, name='quiz_regrade'),
     
     # Teacher views - Question management
     path('quiz/<int:quiz_pk>/question/create/', views.question_create_view, name='question_create'),
     path('question/<int:pk>/edit/', views.question_edit_view, name='question_edit'),
     path('question/<int:pk>/delete/', views.question_delete_view, name='question_delete'),
+    
+    # Read-only JSON API
+    path('api/categories/', api.category_list_view, name='api_category_list'),
+    path('api/quizzes/', api.quiz_list_view, name='api_quiz_list'),
+    path('api/attempts/', api.attempt_list_view, name='api_attempt_list'),
+    path('api/results/', api.result_list_view, name='api_result_list'),
 ]
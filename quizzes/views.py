@@ -1,17 +1,39 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Avg, Count
+from django.db import transaction
+from django.db.models import Q, Avg
 from django.utils import timezone
-from django.http import JsonResponse
-from .models import Quiz, Question, Answer, QuizAttempt, UserAnswer, Category
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from quiz_platform.locking import retry_on_lock
+from quiz_platform.query_budget import query_budget
+from quiz_platform.replicas import read_replica
+from .models import Quiz, Question, Answer, QuizAttempt, UserAnswer, Category, LeaderboardEntry
 from .forms import QuizForm, QuestionForm, AnswerFormSet, CategoryForm, QuizFilterForm
-import random
-
-
+from .bundles import arrange, ordered_questions, page_count, page_size_for
+from .grading import parse_responses, parse_submission, submit_attempt
+from .autosave import flush_autosave, record_autosave, save_page, saved_responses
+from .jobs import enqueue
+from . import analysis
+from . import search as search_index
+from .fragments import render_fragments, with_fragments
+from .leaderboards import board, period_start, rank_of
+from .pagination import PAGE_SIZE, paginate, paginate_ranked, ranked_offset
+from .stats import stats_for
+from .tasks import enqueue_post_submission
+import csv
+import json
+
+
+@query_budget(5)
 def home_view(request):
     """Homepage with featured quizzes"""
-    featured_quizzes = Quiz.objects.filter(is_active=True, is_public=True)[:6]
+    featured_quizzes = with_fragments(
+        'quizzes/fragments/home_card.html',
+        Quiz.objects.filter(is_active=True, is_public=True).select_related('category')[:6],
+    )
     categories = Category.objects.all()
     
     context = {
@@ -22,6 +44,8 @@ def home_view(request):
 
 
 @login_required
+@read_replica
+@query_budget(7)
 def dashboard_view(request):
     """User dashboard"""
     user = request.user
@@ -29,16 +53,19 @@ def dashboard_view(request):
     if user.profile.role == 'teacher':
         # Teacher dashboard
         created_quizzes = Quiz.objects.filter(creator=user)
+        page = paginate(request, created_quizzes.select_related('category'), ('-created_at', '-id'))
         total_attempts = QuizAttempt.objects.filter(quiz__creator=user).count()
         
         context = {
             'is_teacher': True,
-            'created_quizzes': created_quizzes,
+            'created_quizzes': page.items,
+            'page': page,
+            'quiz_count': created_quizzes.count(),
             'total_attempts': total_attempts,
         }
     else:
         # Student dashboard
-        recent_attempts = QuizAttempt.objects.filter(user=user).order_by('-start_time')[:5]
+        recent_attempts = QuizAttempt.objects.filter(user=user).select_related('quiz').order_by('-start_time')[:5]
         available_quizzes = Quiz.objects.filter(is_active=True, is_public=True).exclude(
             attempts__user=user, attempts__status='completed'
         )[:6]
@@ -58,9 +85,11 @@ def dashboard_view(request):
     return render(request, 'quizzes/dashboard.html', context)
 
 
+@query_budget(7)
 def quiz_list_view(request):
     """Browse all available quizzes"""
-    quizzes = Quiz.objects.filter(is_active=True, is_public=True)
+    quizzes = Quiz.objects.filter(is_active=True, is_public=True).select_related('category')
+    ranked = None
     
     # Apply filters
     filter_form = QuizFilterForm(request.GET)
@@ -73,27 +102,42 @@ def quiz_list_view(request):
             quizzes = quizzes.filter(category=category)
         if difficulty:
             quizzes = quizzes.filter(difficulty=difficulty)
-        if search:
+        if search and search_index.available():
+            # One page of ranked matches from the full-text index, best first
+            ids = search_index.find(search, category, difficulty, limit=PAGE_SIZE + 1, offset=ranked_offset(request))
+            positions = {pk: position for position, pk in enumerate(ids)}
+            ranked = sorted(quizzes.filter(pk__in=ids), key=lambda quiz: positions[quiz.pk])
+        elif search:
             quizzes = quizzes.filter(
                 Q(title__icontains=search) | Q(description__icontains=search)
             )
     
+    if ranked is not None:
+        page = paginate_ranked(request, ranked)
+    else:
+        page = paginate(request, quizzes, ('-created_at', '-id'))
+    
     context = {
-        'quizzes': quizzes,
+        'quizzes': with_fragments('quizzes/fragments/list_card.html', page.items),
+        'page': page,
         'filter_form': filter_form,
     }
     return render(request, 'quizzes/quiz_list.html', context)
 
 
+@query_budget(8)
 def quiz_detail_view(request, pk):
     """Quiz detail page"""
-    quiz = get_object_or_404(Quiz, pk=pk)
+    quiz = get_object_or_404(Quiz.objects.select_related('category'), pk=pk)
+    quiz.fragment = render_fragments('quizzes/fragments/detail_summary.html', [quiz])[0]
     
     # Check if user has attempts
     user_attempts = None
     attempts_left = quiz.max_attempts
     if request.user.is_authenticated:
-        user_attempts = QuizAttempt.objects.filter(user=request.user, quiz=quiz, status='completed')
+        user_attempts = QuizAttempt.objects.filter(
+            user=request.user, quiz=quiz, status='completed'
+        ).select_related('quiz')
         attempts_left = quiz.max_attempts - user_attempts.count()
     
     context = {
@@ -106,6 +150,7 @@ def quiz_detail_view(request, pk):
 
 
 @login_required
+@query_budget(23)
 def quiz_take_view(request, pk):
     """Take a quiz"""
     quiz = get_object_or_404(Quiz, pk=pk)
@@ -129,46 +174,23 @@ def quiz_take_view(request, pk):
         user=request.user,
         quiz=quiz,
         status='in_progress',
-        defaults={'total_points': quiz.total_points}
+        defaults={'total_points': quiz.total_points, 'page_size': page_size_for(quiz)}
     )
     
-    # Get questions
-    questions = list(quiz.questions.all())
-    if quiz.randomize_questions:
-        random.shuffle(questions)
+    # Anything still buffered by autosave goes to the database first
+    if not created:
+        flush_autosave(attempt)
+    
+    if attempt.page_size:
+        return _take_paged(request, quiz, attempt)
     
     if request.method == 'POST':
-        # Process answers
-        for question in questions:
-            answer_key = f'question_{question.id}'
-            
-            # Get or create user answer
-            user_answer, _ = UserAnswer.objects.get_or_create(
-                attempt=attempt,
-                question=question
-            )
-            
-            if question.question_type == 'text':
-                user_answer.text_answer = request.POST.get(answer_key, '')
-            elif question.question_type == 'multiple':
-                # Multiple choice - get list of selected answers
-                selected_ids = request.POST.getlist(answer_key)
-                user_answer.selected_answers.set(Answer.objects.filter(id__in=selected_ids))
-            else:
-                # Single choice or true/false
-                selected_id = request.POST.get(answer_key)
-                if selected_id:
-                    user_answer.selected_answers.set([Answer.objects.get(id=selected_id)])
-            
-            user_answer.check_answer()
-        
-        # Complete the attempt
-        attempt.status = 'completed'
-        attempt.end_time = timezone.now()
-        attempt.calculate_score()
-        
-        messages.success(request, f'Quiz completed! Your score: {attempt.score:.1f}%')
-        return redirect('quizzes:quiz_result', pk=pk, attempt_pk=attempt.pk)
+        return _finish_attempt(request, quiz, attempt, request.POST)
+    
+    # Questions come from the cached bundle, in this attempt's order, with
+    # autosaved answers restored, e.g. after a browser crash
+    saved = saved_responses(attempt) if attempt.last_saved_at else {}
+    questions = arrange(quiz, attempt, saved)
     
     context = {
         'quiz': quiz,
@@ -178,7 +200,124 @@ def quiz_take_view(request, pk):
     return render(request, 'quizzes/quiz_take.html', context)
 
 
+@retry_on_lock
+def _finish_attempt(request, quiz, attempt, data=None):
+    """Grade and store all answers in one transaction, the rest runs in the worker"""
+    answer_key = quiz.answer_key
+    with transaction.atomic():
+        submit_attempt(attempt, answer_key, data)
+        enqueue_post_submission(attempt, answer_key)
+    
+    messages.success(request, f'Quiz completed! Your score: {attempt.score:.1f}%')
+    return redirect('quizzes:quiz_result', pk=quiz.pk, attempt_pk=attempt.pk)
+
+
+def _page_number(value, pages):
+    """A requested page number clamped to 1..pages"""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return min(max(number, 1), pages)
+
+
+def _take_page_context(quiz, attempt, number):
+    """Context of one page of a paged attempt, with the page's saved answers"""
+    pages = page_count(quiz, attempt)
+    number = _page_number(number, pages)
+    questions = ordered_questions(quiz, attempt, number)
+    saved = saved_responses(attempt, [question['id'] for question in questions])
+    return {
+        'quiz': quiz,
+        'attempt': attempt,
+        'questions': arrange(quiz, attempt, saved, questions),
+        'page_number': number,
+        'page_count': pages,
+        'first_number': (number - 1) * attempt.page_size,
+        'total_questions': quiz.question_count,
+    }
+
+
+def _take_paged(request, quiz, attempt):
+    """
+    Paged take mode: every request shows or stores one page of questions,
+    so its cost does not depend on the size of the quiz.
+    
+    Each POST stores the answers of its page. Previous and Next move on to
+    another page, the final submit only grades what is stored.
+    """
+    if request.method == 'POST':
+        context = _take_page_context(quiz, attempt, request.POST.get('page'))
+        page_ids = [question['id'] for question in context['questions']]
+        save_page(attempt, parse_submission(quiz.answer_key, request.POST, page_ids))
+        
+        action = request.POST.get('action', 'submit')
+        if action in ('previous', 'next'):
+            number = context['page_number'] + (1 if action == 'next' else -1)
+            return redirect(f"{reverse('quizzes:quiz_take', args=[quiz.pk])}?page={number}")
+        return _finish_attempt(request, quiz, attempt)
+    
+    context = _take_page_context(quiz, attempt, request.GET.get('page'))
+    return render(request, 'quizzes/quiz_take_paged.html', context)
+
+
+@login_required
+@require_POST
+@query_budget(10)
+def attempt_autosave_view(request, pk, attempt_pk):
+    """Save changed answers of an in-progress attempt (AJAX)"""
+    attempt = get_object_or_404(
+        QuizAttempt.objects.select_related('quiz'), pk=attempt_pk, quiz_id=pk, user=request.user
+    )
+    if attempt.status != 'in_progress':
+        return JsonResponse({'error': 'This attempt is no longer in progress.'}, status=409)
+    
+    try:
+        payload = json.loads(request.body)
+        answers = payload['answers']
+        seq = payload.get('seq')
+        if not isinstance(answers, dict) or not (seq is None or isinstance(seq, int)):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Invalid autosave payload.'}, status=400)
+    
+    accepted, flushed = record_autosave(attempt, attempt.quiz.answer_key, answers, seq)
+    return JsonResponse({'accepted': accepted, 'flushed': flushed, 'seq': seq})
+
+
+@login_required
+@query_budget(10)
+def attempt_page_view(request, pk, attempt_pk, number):
+    """
+    One page of a paged attempt (AJAX): GET renders its questions for
+    prefetching, POST stores its answers.
+    """
+    attempt = get_object_or_404(
+        QuizAttempt.objects.select_related('quiz'), pk=attempt_pk, quiz_id=pk, user=request.user
+    )
+    if attempt.status != 'in_progress' or not attempt.page_size:
+        return JsonResponse({'error': 'This attempt is not being taken page by page.'}, status=409)
+    
+    context = _take_page_context(attempt.quiz, attempt, number)
+    if request.method != 'POST':
+        return render(request, 'quizzes/take_page.html', context)
+    
+    try:
+        answers = json.loads(request.body)['answers']
+        if not isinstance(answers, dict):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Invalid page payload.'}, status=400)
+    
+    # Questions of the page missing from the payload are cleared, like in a form
+    page_ids = [question['id'] for question in context['questions']]
+    raw_answers = {question_id: answers.get(str(question_id), []) for question_id in page_ids}
+    save_page(attempt, parse_responses(attempt.quiz.answer_key, raw_answers))
+    return JsonResponse({'saved': context['page_number']})
+
+
 @login_required
+@query_budget(12)
 def quiz_result_view(request, pk, attempt_pk):
     """View quiz results"""
     quiz = get_object_or_404(Quiz, pk=pk)
@@ -189,32 +328,52 @@ def quiz_result_view(request, pk, attempt_pk):
         messages.error(request, 'You do not have permission to view this result.')
         return redirect('quizzes:dashboard')
     
-    user_answers = attempt.user_answers.all().select_related('question')
+    user_answers = attempt.user_answers.all().select_related('question').prefetch_related(
+        'selected_answers', 'question__answers'
+    )
+    
+    # Pick the correct answers from the compiled key instead of the is_correct flags
+    answer_key = quiz.answer_key
+    for user_answer in user_answers:
+        correct_ids = answer_key[user_answer.question_id].correct_ids
+        user_answer.correct_answers = [
+            answer for answer in user_answer.question.answers.all() if answer.id in correct_ids
+        ]
+    
+    # Where this score stands among all attempts, read from the rollup
+    stats = stats_for(quiz)
     
     context = {
         'quiz': quiz,
         'attempt': attempt,
         'user_answers': user_answers,
         'show_answers': quiz.show_correct_answers,
+        'stats': stats,
+        'percentile': stats.percentile_rank(attempt.score),
     }
     return render(request, 'quizzes/quiz_result.html', context)
 
 
 @login_required
+@read_replica
+@query_budget(4)
 def quiz_history_view(request):
     """View user's quiz history"""
     attempts = QuizAttempt.objects.filter(
         user=request.user, status='completed'
-    ).select_related('quiz').order_by('-start_time')
+    ).select_related('quiz')
+    page = paginate(request, attempts, ('-start_time', '-id'))
     
     context = {
-        'attempts': attempts,
+        'attempts': page.items,
+        'page': page,
     }
     return render(request, 'quizzes/quiz_history.html', context)
 
 
 # Teacher views
 @login_required
+@query_budget(6)
 def quiz_create_view(request):
     """Create a new quiz (teacher only)"""
     if request.user.profile.role != 'teacher':
@@ -237,6 +396,7 @@ def quiz_create_view(request):
 
 
 @login_required
+@query_budget(9)
 def quiz_edit_view(request, pk):
     """Edit a quiz (teacher only)"""
     quiz = get_object_or_404(Quiz, pk=pk, creator=request.user)
@@ -244,7 +404,11 @@ def quiz_edit_view(request, pk):
     if request.method == 'POST':
         form = QuizForm(request.POST, instance=quiz)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                if 'passing_score' in form.changed_data:
+                    # Pass counts in the statistics depend on the passing score
+                    enqueue('rebuild_quiz_stats', {'quiz_id': quiz.pk})
             messages.success(request, 'Quiz updated successfully!')
             return redirect('quizzes:quiz_detail', pk=pk)
     else:
@@ -255,6 +419,7 @@ def quiz_edit_view(request, pk):
 
 
 @login_required
+@query_budget(9)
 def quiz_delete_view(request, pk):
     """Delete a quiz (teacher only)"""
     quiz = get_object_or_404(Quiz, pk=pk, creator=request.user)
@@ -269,6 +434,7 @@ def quiz_delete_view(request, pk):
 
 
 @login_required
+@query_budget(5)
 def quiz_manage_questions_view(request, pk):
     """Manage questions for a quiz (teacher only)"""
     quiz = get_object_or_404(Quiz, pk=pk, creator=request.user)
@@ -282,6 +448,7 @@ def quiz_manage_questions_view(request, pk):
 
 
 @login_required
+@query_budget(13)
 def question_create_view(request, quiz_pk):
     """Create a question for a quiz (teacher only)"""
     quiz = get_object_or_404(Quiz, pk=quiz_pk, creator=request.user)
@@ -316,6 +483,7 @@ def question_create_view(request, quiz_pk):
 
 
 @login_required
+@query_budget(20)
 def question_edit_view(request, pk):
     """Edit a question (teacher only)"""
     question = get_object_or_404(Question, pk=pk)
@@ -349,6 +517,7 @@ def question_edit_view(request, pk):
 
 
 @login_required
+@query_budget(15)
 def question_delete_view(request, pk):
     """Delete a question (teacher only)"""
     question = get_object_or_404(Question, pk=pk)
@@ -368,46 +537,100 @@ def question_delete_view(request, pk):
 
 
 @login_required
+@read_replica
+@query_budget(13)
 def quiz_reports_view(request, pk):
     """View quiz reports and analytics (teacher only)"""
     quiz = get_object_or_404(Quiz, pk=pk, creator=request.user)
     
     attempts = QuizAttempt.objects.filter(quiz=quiz, status='completed')
     
-    # Calculate statistics
-    stats = attempts.aggregate(
-        total_attempts=Count('id'),
-        avg_score=Avg('score'),
-    )
+    # Statistics come from the rollup kept up to date by the worker
+    stats = stats_for(quiz)
     
-    # Get recent attempts
-    recent_attempts = attempts.order_by('-end_time')[:10]
+    # Most recent attempts first, page by page
+    page = paginate(request, attempts.select_related('user'), ('-end_time', '-id'), per_page=10)
     
     context = {
         'quiz': quiz,
         'stats': stats,
-        'recent_attempts': recent_attempts,
+        'recent_attempts': page.items,
+        'page': page,
+        'last_regrade': quiz.regrade_runs.first(),
+        'item_analysis': analysis.get_item_analysis(quiz) if analysis.available() else None,
     }
     return render(request, 'quizzes/quiz_reports.html', context)
 
 
+@login_required
+@read_replica
+@query_budget(9)
+def quiz_item_analysis_csv_view(request, pk):
+    """Export the item analysis of a quiz as CSV (teacher only)"""
+    quiz = get_object_or_404(Quiz, pk=pk, creator=request.user)
+    if not analysis.available():
+        messages.error(request, 'Item analysis is not available on this server.')
+        return redirect('quizzes:quiz_reports', pk=pk)
+    
+    item_analysis = analysis.get_item_analysis(quiz)
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="quiz-{quiz.pk}-item-analysis.csv"'
+    writer = csv.writer(response)
+    writer.writerow([
+        'question_id', 'question', 'type', 'difficulty', 'discrimination',
+        'answer_id', 'answer', 'correct', 'selection_rate', 'upper_group_rate', 'lower_group_rate',
+    ])
+    for item in item_analysis.items:
+        question = [item.question_id, item.text, item.question_type, item.difficulty, item.discrimination]
+        if not item.choices:
+            writer.writerow(question + [''] * 6)
+        for choice in item.choices:
+            writer.writerow(question + [
+                choice.answer_id, choice.text, choice.is_correct,
+                f'{choice.selection_rate:.3f}', f'{choice.upper_rate:.3f}', f'{choice.lower_rate:.3f}',
+            ])
+    return response
+
+
+@login_required
+@require_POST
+@query_budget(4)
+def quiz_regrade_view(request, pk):
+    """Regrade all attempts after the answer key changed (teacher only)"""
+    quiz = get_object_or_404(Quiz, pk=pk, creator=request.user)
+    
+    enqueue('regrade_quiz', {'quiz_id': quiz.pk, 'requested_by_id': request.user.pk})
+    messages.success(request, 'Regrading has been queued. Scores will update in a moment.')
+    return redirect('quizzes:quiz_reports', pk=pk)
+
+
+@read_replica
+@query_budget(7)
 def leaderboard_view(request, pk=None):
     """View leaderboard for a quiz or overall"""
-    if pk:
-        quiz = get_object_or_404(Quiz, pk=pk)
-        attempts = QuizAttempt.objects.filter(
-            quiz=quiz, status='completed'
-        ).order_by('-score', 'end_time')[:10]
-        context = {'quiz': quiz, 'attempts': attempts}
-    else:
-        # Overall leaderboard - best average score
-        from django.db.models import Avg
-        users_scores = QuizAttempt.objects.filter(
-            status='completed'
-        ).values('user__username').annotate(
-            avg_score=Avg('score'),
-            total_quizzes=Count('quiz', distinct=True)
-        ).order_by('-avg_score')[:10]
-        context = {'users_scores': users_scores}
+    quiz = get_object_or_404(Quiz, pk=pk) if pk else None
+    window = request.GET.get('window', 'all')
+    if window not in dict(LeaderboardEntry.WINDOW_CHOICES):
+        window = 'all'
+    
+    period = period_start(window, timezone.now())
+    entries = board(quiz, window, period)[:10]
+    
+    # Where the current user stands, even outside the top 10
+    my_entry = my_rank = None
+    if request.user.is_authenticated:
+        my_entry = LeaderboardEntry.objects.filter(
+            quiz=quiz, window=window, period_start=period, user=request.user
+        ).first()
+        if my_entry:
+            my_rank = rank_of(my_entry)
     
+    context = {
+        'quiz': quiz,
+        'entries': entries,
+        'window': window,
+        'windows': LeaderboardEntry.WINDOW_CHOICES,
+        'my_entry': my_entry,
+        'my_rank': my_rank,
+    }
     return render(request, 'quizzes/leaderboard.html', context)
@@ -58,10 +58,19 @@ document.addEventListener('DOMContentLoaded', function() {
     const quizForm = document.getElementById('quiz-form');
     if (quizForm && quizForm.dataset.autosave === 'true') {
         let saveTimeout;
-        const inputs = quizForm.querySelectorAll('input, textarea');
+        let saveSeq = Date.now();
+        const changedQuestions = new Set();
         
-        inputs.forEach(function(input) {
-            input.addEventListener('change', function() {
+        // Listen on the form, so questions of pages swapped in later are saved too
+        ['change', 'input'].forEach(function(eventName) {
+            quizForm.addEventListener(eventName, function(e) {
+                const input = e.target;
+                if ((input.tagName === 'TEXTAREA') !== (eventName === 'input')) {
+                    return;
+                }
+                if (input.name.startsWith('question_')) {
+                    changedQuestions.add(input.name);
+                }
                 clearTimeout(saveTimeout);
                 saveTimeout = setTimeout(function() {
                     saveProgress();
@@ -69,6 +78,22 @@ document.addEventListener('DOMContentLoaded', function() {
             });
         });
         
+        function collectAnswers(names) {
+            const answers = {};
+            names.forEach(function(name) {
+                const questionId = name.replace('question_', '');
+                const fields = quizForm.querySelectorAll(`[name="${name}"]`);
+                if (fields.length === 1 && fields[0].tagName === 'TEXTAREA') {
+                    answers[questionId] = fields[0].value;
+                } else {
+                    answers[questionId] = Array.from(fields)
+                        .filter(field => field.checked)
+                        .map(field => field.value);
+                }
+            });
+            return answers;
+        }
+        
         function saveProgress() {
             const formData = new FormData(quizForm);
             const data = {};
@@ -85,6 +110,22 @@ document.addEventListener('DOMContentLoaded', function() {
             
             localStorage.setItem('quiz_progress_' + quizForm.dataset.quizId, JSON.stringify(data));
             
+            // Send only the answers that changed since the last save
+            if (quizForm.dataset.autosaveUrl && changedQuestions.size > 0) {
+                const answers = collectAnswers(Array.from(changedQuestions));
+                changedQuestions.clear();
+                saveSeq += 1;
+                
+                fetchJSON(quizForm.dataset.autosaveUrl, {
+                    method: 'POST',
+                    headers: {'X-CSRFToken': formData.get('csrfmiddlewaretoken')},
+                    body: JSON.stringify({seq: saveSeq, answers: answers})
+                }).catch(function() {
+                    // Retry these answers with the next save
+                    Object.keys(answers).forEach(id => changedQuestions.add('question_' + id));
+                });
+            }
+            
             // Show saved indicator
             const indicator = document.createElement('div');
             indicator.className = 'alert alert-success position-fixed top-0 end-0 m-3';
@@ -97,6 +138,89 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    // Paged take mode: the next page loads while this one is being answered
+    const quizPage = document.getElementById('quiz-page');
+    if (quizForm && quizPage && quizForm.dataset.pageUrl) {
+        const pageCount = parseInt(quizForm.dataset.pageCount);
+        const prefetched = {};
+        
+        function pageUrl(number) {
+            return quizForm.dataset.pageUrl.replace(/0\/$/, number + '/');
+        }
+        
+        function currentPage() {
+            return parseInt(quizPage.querySelector('[name="page"]').value);
+        }
+        
+        function prefetch(number) {
+            if (number < 1 || number > pageCount || prefetched[number]) {
+                return;
+            }
+            prefetched[number] = fetch(pageUrl(number), {
+                headers: {'X-Requested-With': 'XMLHttpRequest'}
+            }).then(function(response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.text();
+            });
+            prefetched[number].catch(function() {
+                delete prefetched[number];
+            });
+        }
+        
+        function savePage() {
+            const answers = {};
+            quizPage.querySelectorAll('[name^="question_"]').forEach(function(field) {
+                const questionId = field.name.replace('question_', '');
+                if (field.tagName === 'TEXTAREA') {
+                    answers[questionId] = field.value;
+                } else {
+                    answers[questionId] = answers[questionId] || [];
+                    if (field.checked) {
+                        answers[questionId].push(field.value);
+                    }
+                }
+            });
+            return fetch(pageUrl(currentPage()), {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-Requested-With': 'XMLHttpRequest',
+                    'X-CSRFToken': quizForm.querySelector('[name="csrfmiddlewaretoken"]').value
+                },
+                body: JSON.stringify({answers: answers})
+            }).then(function(response) {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+            });
+        }
+        
+        quizForm.addEventListener('click', function(e) {
+            const button = e.target.closest('button[name="action"]');
+            if (!button || button.value === 'submit') {
+                return;
+            }
+            const target = currentPage() + (button.value === 'next' ? 1 : -1);
+            prefetch(target);
+            e.preventDefault();
+            
+            // Answers are stored before the page changes; on any error the form posts as usual
+            Promise.all([savePage(), prefetched[target]]).then(function(results) {
+                delete prefetched[target];
+                quizPage.innerHTML = results[1];
+                history.replaceState(null, '', '?page=' + target);
+                window.scrollTo(0, 0);
+                prefetch(target + 1);
+            }).catch(function() {
+                quizForm.requestSubmit(button);
+            });
+        });
+        
+        prefetch(currentPage() + 1);
+    }
+    
     // Live search functionality
     const searchInput = document.getElementById('live-search');
     if (searchInput) {
@@ -197,11 +321,11 @@ document.addEventListener('DOMContentLoaded', function() {
 // Utility function for AJAX requests
 function fetchJSON(url, options = {}) {
     return fetch(url, {
+        ...options,
         headers: {
             'Content-Type': 'application/json',
             'X-Requested-With': 'XMLHttpRequest',
             ...options.headers
-        },
-        ...options
+        }
     }).then(response => response.json());
 }